@@ -1,10 +1,30 @@
 # collect/admin.py
 from django.contrib import admin
-from .models import ThreatAlert, CurrentInformation, NewsSource # ✅ Correct relative import
+from .models import ThreatAlert, CurrentInformation, NewsSource, NewsSourceFeedState, MediaBlob # ✅ Correct relative import
 
-admin.site.register(ThreatAlert)
-admin.site.register(CurrentInformation)
-admin.site.register(NewsSource)
 
+class MediaUploadAdmin(admin.ModelAdmin):
+    """Shows files MediaUploadHandler rejected while streaming as errors on their fields."""
+
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        rejected = getattr(request, 'upload_errors', {})
+        if not rejected:
+            return form
+
+        class RejectedUploadsForm(form):
+            def clean(self):
+                cleaned_data = super().clean()
+                for field_name, message in rejected.items():
+                    if field_name in self.fields:
+                        self.add_error(field_name, message)
+                return cleaned_data
 
+        return RejectedUploadsForm
 
+
+admin.site.register(ThreatAlert, MediaUploadAdmin)
+admin.site.register(CurrentInformation)
+admin.site.register(NewsSource, MediaUploadAdmin)
+admin.site.register(NewsSourceFeedState)
+admin.site.register(MediaBlob)
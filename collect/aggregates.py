@@ -0,0 +1,130 @@
+# collect/aggregates.py
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ThreatAlert, ThreatAlertDailyRollup
+
+SEVERITIES = [value for value, label in ThreatAlert.SEVERITY_CHOICES]
+
+
+def severity_counts(field_name='id', aggregate=Count):
+    """Conditional ``Count(filter=...)`` per severity, keyed by severity value."""
+    return {
+        severity: aggregate(field_name, filter=Q(severity=severity))
+        for severity in SEVERITIES
+    }
+
+
+@dataclass
+class ThreatStats:
+    """Everything the visualization page needs, computed in three grouped queries."""
+    total: int = 0
+    severity: dict = field(default_factory=dict)          # {'high': 12, ...}
+    category: list = field(default_factory=list)          # [('Scam', 40), ...] by count desc
+    sources: list = field(default_factory=list)           # [('tiktok', 9), ...] top N
+    timeline_days: list = field(default_factory=list)     # [date, ...] oldest first
+    timeline: list = field(default_factory=list)          # [int, ...] per day
+    daily_severity: dict = field(default_factory=dict)   # {date: {'high': n, ...}}
+
+    @property
+    def severity_items(self):
+        """
+        (label, count) for every severity that has at least one alert, in the
+        order the chart always had (the old ``ORDER BY severity``: by value).
+        """
+        labels = dict(ThreatAlert.SEVERITY_CHOICES)
+        return [(labels[s], self.severity[s]) for s in sorted(SEVERITIES) if self.severity.get(s)]
+
+    def trend(self, days=7, severities=('high', 'medium', 'low')):
+        """Last ``days`` of the timeline split by severity: (dates, {severity: [counts]})."""
+        dates = self.timeline_days[-days:]
+        series = {s: [self.daily_severity.get(d, {}).get(s, 0) for d in dates] for s in severities}
+        return dates, series
+
+
+def compute_threat_stats(queryset=None, days=30, top_sources=10, today=None):
+    """
+    Aggregate severity, category, source and day×severity counts for ``queryset``.
+
+    Runs exactly three queries regardless of how many alerts or days there are:
+    one grouped by (category, severity), one top-N by source and one grouped by
+    local calendar day over the last ``days`` days.
+    """
+    if queryset is None:
+        queryset = ThreatAlert.objects.all()
+    queryset = queryset.order_by()  # drop default ordering so GROUP BY stays clean
+    today = today or timezone.localdate()
+    window_start = timezone.make_aware(
+        datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+    )
+    daily = queryset.filter(timestamp__gte=window_start).annotate(day=TruncDate('timestamp'))
+    return _build_stats(queryset, daily, Count('id'), severity_counts(), days, top_sources, today)
+
+
+def compute_rollup_stats(days=30, top_sources=10, today=None):
+    """
+    Same result as ``compute_threat_stats()`` for the unfiltered archive, read from
+    ThreatAlertDailyRollup so the cost depends on days × buckets, not on alert count.
+    """
+    today = today or timezone.localdate()
+    rollup = ThreatAlertDailyRollup.objects.order_by()
+    daily = rollup.filter(date__gte=today - timedelta(days=days - 1)).annotate(day=F('date'))
+    return _build_stats(
+        rollup, daily, Sum('count'), severity_counts('count', aggregate=Sum), days, top_sources, today,
+    )
+
+
+def rollup_totals(categories=None):
+    """Total and per-severity counts from the rollup, optionally limited to ``categories``."""
+    rollup = ThreatAlertDailyRollup.objects.all()
+    if categories:
+        rollup = rollup.filter(category__in=categories)
+    row = rollup.aggregate(total=Sum('count'), **severity_counts('count', aggregate=Sum))
+    return {key: value or 0 for key, value in row.items()}
+
+
+def rollup_category_counts(categories=None):
+    """{category: count} from the rollup, optionally limited to ``categories``."""
+    rollup = ThreatAlertDailyRollup.objects.order_by()
+    if categories:
+        rollup = rollup.filter(category__in=categories)
+    return dict(rollup.values_list('category').annotate(n=Sum('count')))
+
+
+def _build_stats(queryset, daily, measure, per_severity, days, top_sources, today):
+    stats = ThreatStats(severity=dict.fromkeys(SEVERITIES, 0))
+
+    # 1️⃣ (category, severity) matrix -> totals, severity split and category split
+    category_totals = {}
+    for row in queryset.values('category', 'severity').annotate(n=measure):
+        stats.total += row['n']
+        if row['severity'] in stats.severity:
+            stats.severity[row['severity']] += row['n']
+        category_totals[row['category']] = category_totals.get(row['category'], 0) + row['n']
+
+    labels = dict(ThreatAlert.CATEGORY_CHOICES)
+    stats.category = sorted(
+        ((labels.get(value, value), count) for value, count in category_totals.items()),
+        key=lambda item: (-item[1], item[0]),
+    )
+
+    # 2️⃣ Top sources
+    sources = queryset.values('source').annotate(n=measure).order_by('-n', 'source')[:top_sources]
+    stats.sources = [(row['source'] or 'Unknown', row['n']) for row in sources]
+
+    # 3️⃣ Daily timeline with per-severity columns, bucketed in the active timezone
+    stats.timeline_days = [today - timedelta(days=i) for i in range(days - 1, -1, -1)]
+    day_totals = {}
+    for row in daily.values('day').annotate(n=measure, **per_severity):
+        day = row['day']
+        if isinstance(day, datetime):
+            day = day.date()
+        day_totals[day] = row['n']
+        stats.daily_severity[day] = {s: row[s] or 0 for s in SEVERITIES}
+
+    stats.timeline = [day_totals.get(day, 0) for day in stats.timeline_days]
+    return stats
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CollectConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'collect'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from . import signals
+
+        post_migrate.connect(signals.install_search_index, sender=self)
+        post_migrate.connect(signals.install_cache_generations, sender=self)
@@ -0,0 +1,430 @@
+# collect/archive.py
+"""
+Time-partitioned archive for old ThreatAlert rows.
+
+``archive_alerts()`` moves alerts older than ``settings.ARCHIVE_AFTER_DAYS``
+out of the live table into one SQLite file per local calendar month under
+``settings.ARCHIVE_ROOT`` (``alerts-2024-03.sqlite3``). Content is stored
+zlib-compressed; a contentless FTS5 index (same tokenizer as
+``collect/search.py``) keeps it searchable without a second plain-text copy.
+Each batch is written to its partition before the live rows are deleted, and
+rows already in a partition are skipped, so an interrupted run can simply be
+repeated.
+
+Leaving the live table is a delete as far as the rest of the app is
+concerned: rollup buckets, live counters and cached aggregates drop the
+archived rows, and a live copy of an archived story becomes its cluster
+leader. Media files stay referenced — the archive keeps its MediaBlob
+references (``dedupe_media`` counts them too).
+
+Hot views keep reading the live table only. Explicit historical queries fan
+out: ``search_history()`` (``/archive_news/``) merges the live table with the
+partitions newest first, and exports with ``archive=1`` stream
+``archived_rows()`` merged with the live rows in time order.
+"""
+import json
+import sqlite3
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import bump_on_commit
+from .dedup import promote_after_delete
+from .live import publish_counts
+from .models import ThreatAlert, ThreatAlertSignatureBand
+from .rollup import apply_alerts
+from .search import build_match_query, filter_matches
+
+BATCH_SIZE = 1000
+DEFAULT_AFTER_DAYS = 180
+SCHEMA_VERSION = 1
+COMPRESS_LEVEL = 6
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Partition columns besides id, ts and content, in model field order
+COLUMNS = [
+    'title', 'category', 'severity', 'source', 'url', 'image', 'video', 'media_status', 'thumbnail',
+    'image_variants', 'video_poster', 'video_duration', 'cluster_id', 'is_duplicate',
+    'predicted_category', 'category_confidence', 'predicted_severity',
+]
+MEDIA_COLUMNS = ('image', 'video')  # content-addressed upload fields
+
+_SCHEMA = [
+    f"""CREATE TABLE IF NOT EXISTS alerts (
+        id INTEGER PRIMARY KEY,
+        ts INTEGER NOT NULL,
+        content BLOB NOT NULL,
+        {', '.join(COLUMNS)}
+    )""",
+    'CREATE INDEX IF NOT EXISTS alerts_ts_idx ON alerts (ts, id)',
+]
+_FTS_SCHEMA = """CREATE VIRTUAL TABLE IF NOT EXISTS alerts_fts USING fts5(
+    title, content, source, content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+)"""
+
+
+def archive_root():
+    return Path(getattr(settings, 'ARCHIVE_ROOT', settings.BASE_DIR / 'archive'))
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = getattr(settings, 'ARCHIVE_AFTER_DAYS', DEFAULT_AFTER_DAYS)
+    return timezone.now() - timedelta(days=days)
+
+
+def to_micros(value):
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(value):
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def month_of(value):
+    """'YYYY-MM' of the local calendar month ``value`` falls in."""
+    return timezone.localtime(value).strftime('%Y-%m')
+
+
+def month_bounds(month):
+    """Aware [start, end) of a 'YYYY-MM' month in the current timezone."""
+    year, number = map(int, month.split('-'))
+    start = datetime(year, number, 1)
+    end = datetime(year + number // 12, number % 12 + 1, 1)
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def partition_path(month):
+    return archive_root() / f'alerts-{month}.sqlite3'
+
+
+def partitions():
+    """[(month, path)] of every archive file, oldest first."""
+    root = archive_root()
+    if not root.is_dir():
+        return []
+    return sorted((path.stem[len('alerts-'):], path) for path in root.glob('alerts-????-??.sqlite3'))
+
+
+def _open(path, create=False):
+    if create:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    elif not path.exists():
+        raise FileNotFoundError(path)
+    db = sqlite3.connect(path)
+    if create:
+        with db:
+            for statement in _SCHEMA:
+                db.execute(statement)
+            try:
+                db.execute(_FTS_SCHEMA)
+            except sqlite3.OperationalError:  # SQLite without FTS5: searches decompress instead
+                pass
+            db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    return db
+
+
+def _has_fts(db):
+    return db.execute("SELECT 1 FROM sqlite_master WHERE name = 'alerts_fts'").fetchone() is not None
+
+
+# ---------------------------------------------------------------------------
+# Moving rows out of the live table
+# ---------------------------------------------------------------------------
+
+def _row(alert):
+    content = (alert.content or '').encode('utf-8')
+    values = {column: getattr(alert, column) for column in COLUMNS}
+    for column in ('image', 'video', 'thumbnail', 'video_poster'):
+        values[column] = values[column].name or ''
+    values['image_variants'] = json.dumps(values['image_variants'] or {})
+    return (alert.pk, to_micros(alert.timestamp), zlib.compress(content, COMPRESS_LEVEL),
+            *(values[column] for column in COLUMNS)), len(content)
+
+
+def write_partition(month, alerts):
+    """Append ``alerts`` to the month's file, skipping ids it already holds. Returns (rows, raw bytes, stored bytes)."""
+    db = _open(partition_path(month), create=True)
+    try:
+        ids = [alert.pk for alert in alerts]
+        present = {
+            row[0] for row in db.execute(f'SELECT id FROM alerts WHERE id IN ({", ".join("?" * len(ids))})', ids)
+        }
+        rows, raw = [], 0
+        for alert in alerts:
+            if alert.pk in present:
+                continue
+            row, size = _row(alert)
+            rows.append((row, alert))
+            raw += size
+        with db:
+            db.executemany(
+                f'INSERT INTO alerts (id, ts, content, {", ".join(COLUMNS)}) '
+                f'VALUES ({", ".join("?" * (len(COLUMNS) + 3))})',
+                [row for row, alert in rows],
+            )
+            if _has_fts(db):
+                db.executemany(
+                    'INSERT INTO alerts_fts (rowid, title, content, source) VALUES (?, ?, ?, ?)',
+                    [(alert.pk, alert.title, alert.content, alert.source) for row, alert in rows],
+                )
+        return len(rows), raw, sum(len(row[2]) for row, alert in rows)
+    finally:
+        db.close()
+
+
+def _remove_live(alerts):
+    """Delete archived alerts from the live table with the bookkeeping post_delete would do, in bulk."""
+    ids = [alert.pk for alert in alerts]
+    severities = Counter(alert.severity for alert in alerts)
+    with transaction.atomic():
+        ThreatAlertSignatureBand.objects.filter(alert_id__in=ids).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {ThreatAlert._meta.db_table} WHERE id IN ({", ".join(["%s"] * len(ids))})', ids,
+            )
+        apply_alerts(alerts, sign=-1)
+        leaders = {alert.pk: alert for alert in alerts if not alert.is_duplicate and alert.cluster_id == alert.pk}
+        with_copies = set(
+            ThreatAlert.objects.filter(is_duplicate=True, cluster_id__in=list(leaders))
+            .values_list('cluster_id', flat=True).distinct()
+        ) if leaders else set()
+        for leader_id in sorted(with_copies):
+            promote_after_delete(leaders[leader_id])
+        bump_on_commit(ThreatAlert)
+        transaction.on_commit(lambda: publish_counts({severity: -n for severity, n in severities.items()}))
+
+
+def archive_alerts(before=None, batch_size=BATCH_SIZE, on_batch=None):
+    """
+    Move every alert with ``timestamp < before`` (default: ``archive_cutoff()``)
+    into its month's partition, oldest first. Returns (rows, raw content bytes,
+    stored content bytes).
+    """
+    before = before or archive_cutoff()
+    live = ThreatAlert.objects.filter(timestamp__lt=before).defer('minhash').order_by('timestamp', 'id')
+    moved = raw = stored = 0
+    while True:
+        alerts = list(live[:batch_size])
+        if not alerts:
+            return moved, raw, stored
+        by_month = defaultdict(list)
+        for alert in alerts:
+            by_month[month_of(alert.timestamp)].append(alert)
+        for month, group in sorted(by_month.items()):
+            rows, raw_bytes, stored_bytes = write_partition(month, group)
+            raw += raw_bytes
+            stored += stored_bytes
+        _remove_live(alerts)
+        moved += len(alerts)
+        if on_batch:
+            on_batch(moved)
+
+
+# ---------------------------------------------------------------------------
+# Reading partitions
+# ---------------------------------------------------------------------------
+
+def _where(categories=(), severities=(), start=None, end=None, query='', fts=True):
+    """SQL conditions and params for a partition query (without the keyset bound)."""
+    clauses, params = [], []
+    if categories:
+        clauses.append(f'category IN ({", ".join("?" * len(categories))})')
+        params.extend(categories)
+    if severities:
+        clauses.append(f'severity IN ({", ".join("?" * len(severities))})')
+        params.extend(severities)
+    if start:
+        clauses.append('ts >= ?')
+        params.append(to_micros(start))
+    if end:
+        clauses.append('ts < ?')
+        params.append(to_micros(end))
+    match = build_match_query(query) if query else ''
+    if match and fts:
+        clauses.append('id IN (SELECT rowid FROM alerts_fts WHERE alerts_fts MATCH ?)')
+        params.append(match)
+    return clauses, params
+
+
+def _matches(query, fields):
+    """Fallback for partitions without FTS5: the live search's ``icontains`` rule."""
+    query = query.lower()
+    return any(query in (value or '').lower() for value in fields)
+
+
+def _select(db, clauses, params, order, limit):
+    where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+    return db.execute(
+        f'SELECT id, ts, content, {", ".join(COLUMNS)} FROM alerts {where} ORDER BY {order} LIMIT ?',
+        [*params, limit],
+    ).fetchall()
+
+
+def _in_range(month, start=None, end=None):
+    month_start, month_end = month_bounds(month)
+    return not (start and month_end <= start) and not (end and month_start >= end)
+
+
+def _scan(path, filters, order, bound, limit):
+    """Up to ``limit`` decoded rows of one partition strictly past the keyset ``bound`` (ts, id) in ``order``."""
+    query = filters.get('query', '')
+    op, sql_order = ('<', 'ts DESC, id DESC') if order == 'desc' else ('>', 'ts, id')
+    db = _open(path)
+    try:
+        fts = _has_fts(db)
+        clauses, params = _where(**filters, fts=fts)
+        rows = []
+        while len(rows) < limit:
+            keyset = [f'(ts {op} ? OR (ts = ? AND id {op} ?))'] if bound else []
+            batch = _select(db, clauses + keyset, params + ([bound[0], bound[0], bound[1]] if bound else []),
+                            sql_order, limit)
+            for row in batch:
+                record = _decode(row)
+                if fts or not query or _matches(query, (record['title'], record['content'], record['source'])):
+                    rows.append(record)
+            if len(batch) < limit:
+                break
+            bound = (batch[-1][1], batch[-1][0])  # without FTS5 the text filter runs here; read on
+        return rows[:limit]
+    finally:
+        db.close()
+
+
+def _decode(row):
+    record = dict(zip(['id', 'ts', 'content', *COLUMNS], row))
+    record['content'] = zlib.decompress(record['content']).decode('utf-8')
+    record['timestamp'] = from_micros(record.pop('ts'))
+    record['image_variants'] = json.loads(record['image_variants'] or '{}')
+    record['is_duplicate'] = bool(record['is_duplicate'])
+    return record
+
+
+def to_alert(record):
+    """Read-only ThreatAlert instance for an archived row (templates render it like a live one)."""
+    alert = ThreatAlert(**record)
+    alert._state.adding = False
+    alert.archived = True
+    return alert
+
+
+def search_history(query='', categories=(), severities=(), start=None, end=None, before=None, limit=25):
+    """
+    Newest-first alerts across the live table and every partition, strictly
+    after the ``before`` position (timestamp, id). Returns (alerts, has_more).
+
+    The live table is always asked for ``limit`` rows; partitions are read newest
+    month first and the walk stops once ``limit`` archived rows are in hand,
+    since every older partition only holds older rows.
+    """
+    filters = {'categories': categories, 'severities': severities, 'start': start, 'end': end, 'query': query}
+    live = filter_live(ThreatAlert.objects.all(), **filters)
+    if before:
+        stamp, last_id = before
+        live = live.filter(Q(timestamp__lt=stamp) | Q(timestamp=stamp, id__lt=last_id), timestamp__lte=stamp)
+    results = [(alert.timestamp, alert.id, alert) for alert in live.order_by('-timestamp', '-id')[:limit + 1]]
+
+    live_ids = {alert_id for stamp, alert_id, alert in results}
+    archived = []
+    bound = (to_micros(before[0]), before[1]) if before else None
+    for month, path in reversed(partitions()):
+        if len(archived) > limit:
+            break
+        if not _in_range(month, start, end) or (before and month_bounds(month)[0] > before[0]):
+            continue
+        archived.extend(_scan(path, filters, 'desc', bound, limit + 1 - len(archived)))
+    results.extend(
+        (record['timestamp'], record['id'], to_alert(record))
+        for record in archived if record['id'] not in live_ids  # a run interrupted mid-batch
+    )
+    results.sort(key=lambda item: item[:2], reverse=True)
+    return [alert for stamp, alert_id, alert in results[:limit]], len(results) > limit
+
+
+def filter_live(queryset, categories=(), severities=(), start=None, end=None, query=''):
+    """The live-table side of the archive filters (same meaning as ``_where``)."""
+    if categories:
+        queryset = queryset.filter(category__in=categories)
+    if severities:
+        queryset = queryset.filter(severity__in=severities)
+    if start:
+        queryset = queryset.filter(timestamp__gte=start)
+    if end:
+        queryset = queryset.filter(timestamp__lt=end)
+    if query:
+        queryset = filter_matches(queryset, query)
+    return queryset
+
+
+def archived_rows(fields, chunk_size=BATCH_SIZE, **filters):
+    """
+    Tuples of ``fields`` for every archived alert matching ``filters``, oldest
+    first; partitions are read one at a time in keyset chunks.
+    """
+    for month, path in partitions():
+        if not _in_range(month, filters.get('start'), filters.get('end')):
+            continue
+        bound = None
+        while True:
+            records = _scan(path, filters, 'asc', bound, chunk_size)
+            for record in records:
+                yield tuple(record[field] for field in fields)
+            if len(records) < chunk_size:
+                break
+            bound = (to_micros(records[-1]['timestamp']), records[-1]['id'])
+
+
+# ---------------------------------------------------------------------------
+# Bookkeeping
+# ---------------------------------------------------------------------------
+
+def partition_stats():
+    """[(month, rows, bytes on disk)] per partition, oldest first."""
+    stats = []
+    for month, path in partitions():
+        db = _open(path)
+        try:
+            rows = db.execute('SELECT count(*) FROM alerts').fetchone()[0]
+        finally:
+            db.close()
+        stats.append((month, rows, path.stat().st_size))
+    return stats
+
+
+def archived_media():
+    """Counter of media names (image/video) still referenced by archived rows."""
+    references = Counter()
+    for month, path in partitions():
+        db = _open(path)
+        try:
+            for column in MEDIA_COLUMNS:
+                references.update(
+                    name for (name,) in db.execute(f"SELECT {column} FROM alerts WHERE {column} != ''")
+                )
+        finally:
+            db.close()
+    return references
+
+
+def rename_media(mapping):
+    """Point archived rows at new media names (``dedupe_media`` moving legacy files into blobs)."""
+    if not mapping:
+        return
+    for month, path in partitions():
+        db = _open(path)
+        try:
+            with db:
+                for column in MEDIA_COLUMNS:
+                    db.executemany(
+                        f'UPDATE alerts SET {column} = ? WHERE {column} = ?',
+                        [(new, old) for old, new in mapping.items()],
+                    )
+        finally:
+            db.close()
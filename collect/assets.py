@@ -0,0 +1,285 @@
+# collect/assets.py
+"""
+Self-hosted, fingerprinted and precompressed CSS/JS.
+
+Sources live under ``collect/static/collect/``: the page styles and scripts
+that used to be inlined in the templates (``css/``, ``js/``) and the
+third-party libraries in ``vendor/``. The vendor files are not in the
+repository; the build downloads whichever are missing from the pinned CDN
+URLs in ``VENDOR``. ``build_assets`` therefore has to run at deploy time on a
+machine with network access, or with ``--offline`` once ``vendor/`` has been
+filled (by an earlier build, or copied in).
+
+``build()`` (``manage.py build_assets``) concatenates each entry of
+``BUNDLES`` and names the result after its content hash
+(``bundles/layout.3f9a0c1d2b4e.css``). Relative ``url()`` references in CSS
+(Font Awesome's webfonts) are copied under their own hashed names and
+rewritten. Text bundles get ``.gz`` and, when the optional ``brotli``
+package is installed, ``.br`` siblings. ``assets.json`` in ``STATIC_ROOT``
+maps bundle names to the current files. Because a new build produces new
+names, ``serve_static`` (collect/serving.py) can send them with
+``immutable`` one-year cache headers.
+
+Until a build exists, ``{% asset %}`` falls back to the CDN URLs and the
+unbundled sources, so a fresh checkout still renders.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+import urllib.request
+from pathlib import Path, PurePosixPath
+
+from django.conf import settings
+from django.templatetags.static import static
+
+try:
+    import brotli
+except ImportError:  # .br variants are optional
+    brotli = None
+
+SOURCE_ROOT = Path(__file__).resolve().parent / 'static' / 'collect'
+OUTPUT_DIR = 'bundles'
+MANIFEST_NAME = 'assets.json'
+HASH_LENGTH = 12
+USER_AGENT = 'CyberPulse-assets/1.0'
+COMPRESSIBLE = {'.css', '.js', '.svg', '.ttf', '.json'}
+MIN_COMPRESS_BYTES = 256
+
+_BOOTSTRAP = 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/'
+_FONT_AWESOME = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.0/'
+
+# vendor/<path> -> pinned CDN URL
+VENDOR = {
+    'bootstrap.min.css': _BOOTSTRAP + 'css/bootstrap.min.css',
+    'bootstrap.bundle.min.js': _BOOTSTRAP + 'js/bootstrap.bundle.min.js',
+    'fontawesome/css/all.min.css': _FONT_AWESOME + 'css/all.min.css',
+    **{
+        f'fontawesome/webfonts/{font}.{ext}': f'{_FONT_AWESOME}webfonts/{font}.{ext}'
+        for font in ('fa-solid-900', 'fa-regular-400', 'fa-brands-400', 'fa-v4compatibility')
+        for ext in ('woff2', 'ttf')
+    },
+    'chart.umd.js': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.js',
+    'sweetalert2.all.min.js': 'https://cdn.jsdelivr.net/npm/sweetalert2@11.10.5/dist/sweetalert2.all.min.js',
+}
+
+# Bundle name -> sources relative to SOURCE_ROOT, concatenated in order
+BUNDLES = {
+    'vendor.css': ['vendor/bootstrap.min.css', 'vendor/fontawesome/css/all.min.css'],
+    'vendor.js': ['vendor/bootstrap.bundle.min.js', 'vendor/sweetalert2.all.min.js'],
+    'charts.js': ['vendor/chart.umd.js'],
+    'layout.css': ['css/layout.css'],
+    'layout.js': ['js/layout.js'],
+    **{
+        f'{page}.{ext}': [f'{ext}/{page}.{ext}']
+        for page, exts in {
+            'dashboard': ('css', 'js'), 'current': ('css',), 'source': ('css',), 'spy': ('css', 'js'),
+            'trending': ('css', 'js'), 'visualization': ('css', 'js'), 'news_add': ('css', 'js'),
+            'report': ('css', 'js'), 'search': ('css', 'js'), 'login': ('css', 'js'),
+        }.items()
+        for ext in exts
+    },
+}
+
+_CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_SOURCE_MAP_RE = re.compile(r'^[ \t]*(?://|/\*)# sourceMappingURL=.*$', re.M)
+
+
+class AssetError(Exception):
+    """A source is missing or could not be downloaded."""
+
+
+def brotli_available():
+    return brotli is not None
+
+
+def output_root():
+    return Path(settings.STATIC_ROOT)
+
+
+def fingerprint(name, data):
+    """``dir/name.<hash>.ext`` for ``data``."""
+    path = PurePosixPath(name)
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    return str(path.with_name(f'{path.stem}.{digest}{path.suffix}'))
+
+
+# ---------------------------------------------------------------------------
+# Vendored libraries
+# ---------------------------------------------------------------------------
+
+def missing_vendor(names=None):
+    return [name for name in (names or VENDOR) if not (SOURCE_ROOT / 'vendor' / name).is_file()]
+
+
+def fetch_vendor(names=None, refresh=False, timeout=30, opener=urllib.request.urlopen):
+    """Download ``VENDOR`` files that are missing (or all with ``refresh``). Returns the names fetched."""
+    fetched = []
+    for name in names or VENDOR:
+        target = SOURCE_ROOT / 'vendor' / name
+        if target.is_file() and not refresh:
+            continue
+        request = urllib.request.Request(VENDOR[name], headers={'User-Agent': USER_AGENT})
+        try:
+            with opener(request, timeout=timeout) as response:
+                data = response.read()
+        except OSError as exc:
+            raise AssetError(f'{VENDOR[name]}: {exc}') from exc
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + '.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, target)
+        fetched.append(name)
+    return fetched
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def _write(root, name, data, compress):
+    """Write ``data`` (and its precompressed variants) under ``root``; returns bytes written per encoding."""
+    target = root / name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(data)
+    sizes = {'identity': len(data)}
+    if not compress or target.suffix not in COMPRESSIBLE or len(data) < MIN_COMPRESS_BYTES:
+        return sizes
+    variants = {'gzip': ('.gz', lambda: gzip.compress(data, 9, mtime=0))}
+    if brotli is not None:
+        variants['br'] = ('.br', lambda: brotli.compress(data, quality=11))
+    for encoding, (suffix, encode) in variants.items():
+        encoded = encode()
+        if len(encoded) < len(data):
+            target.with_name(target.name + suffix).write_bytes(encoded)
+            sizes[encoding] = len(encoded)
+    return sizes
+
+
+def _rewrite_css(source, text, root, compress, copied):
+    """Copy files referenced by relative ``url()`` to hashed names and point ``text`` at them."""
+    def replace(match):
+        reference = match.group(2).strip()
+        if reference.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        reference, _, fragment = reference.partition('#')
+        path = reference.partition('?')[0]
+        target = (source.parent / path).resolve()
+        if not target.is_file():
+            raise AssetError(f'{source.relative_to(SOURCE_ROOT)}: url({path}) not found')
+        if target not in copied:
+            data = target.read_bytes()
+            name = fingerprint(f'{OUTPUT_DIR}/files/{target.name}', data)
+            _write(root, name, data, compress)
+            copied[target] = PurePosixPath(name).name
+        return f'url("files/{copied[target]}{"#" + fragment if fragment else ""}")'
+
+    return _CSS_URL_RE.sub(replace, text)
+
+
+def build_bundle(name, sources, root, compress=True, copied=None):
+    """Concatenate ``sources`` into ``root``; returns (hashed path, sizes)."""
+    parts = []
+    for source in sources:
+        path = SOURCE_ROOT / source
+        if not path.is_file():
+            raise AssetError(f'{source} is missing; run `manage.py build_assets` with network access to fetch it')
+        text = _SOURCE_MAP_RE.sub('', path.read_text(encoding='utf-8'))
+        if name.endswith('.css'):
+            text = _rewrite_css(path, text, root, compress, copied if copied is not None else {})
+        parts.append(text.strip())
+    # ';' keeps a script without a trailing semicolon from running into the next one
+    data = (('\n' if name.endswith('.css') else '\n;\n').join(parts) + '\n').encode()
+    hashed = fingerprint(f'{OUTPUT_DIR}/{name}', data)
+    return hashed, _write(root, hashed, data, compress)
+
+
+def build(bundles=None, root=None, compress=True, fetch=True, on_bundle=None):
+    """
+    Build every bundle into ``root`` (STATIC_ROOT) and write the manifest.
+    Missing vendor files are downloaded first unless ``fetch`` is False.
+    Returns the manifest.
+    """
+    bundles = BUNDLES if bundles is None else bundles
+    root = Path(root) if root else output_root()
+    needed = sorted({source[len('vendor/'):] for sources in bundles.values() for source in sources
+                     if source.startswith('vendor/')})
+    missing = missing_vendor(needed)
+    if missing and fetch:
+        fetch_vendor(missing)
+
+    manifest = {'version': 1, 'built_at': int(time.time()), 'bundles': {}, 'sizes': {}}
+    copied = {}
+    for name, sources in bundles.items():
+        hashed, sizes = build_bundle(name, sources, root, compress, copied)
+        manifest['bundles'][name] = hashed
+        manifest['sizes'][name] = sizes
+        if on_bundle:
+            on_bundle(name, hashed, sizes)
+
+    root.mkdir(parents=True, exist_ok=True)
+    tmp = root / (MANIFEST_NAME + '.tmp')
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, root / MANIFEST_NAME)
+    _loaded['key'] = None
+    return manifest
+
+
+def prune(root=None, keep=None):
+    """Delete built files no longer named by the manifest (or ``keep``). Returns the count removed."""
+    root = Path(root) if root else output_root()
+    manifest = load_manifest(root) or {}
+    keep = set(keep or ()) | set(manifest.get('bundles', {}).values())
+    # Fonts and images are kept while any current stylesheet refers to them
+    for name in list(keep):
+        if name.endswith('.css') and (root / name).is_file():
+            keep.update(f'{OUTPUT_DIR}/{ref}' for ref in re.findall(r'url\("(files/[^"#]+)', (root / name).read_text()))
+    removed = 0
+    for path in (root / OUTPUT_DIR).rglob('*'):
+        if not path.is_file():
+            continue
+        name = path.relative_to(root).as_posix()
+        base = name[:-3] if name.endswith(('.gz', '.br')) else name
+        if base not in keep:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+# ---------------------------------------------------------------------------
+# Lookup (used by the {% asset %} tag)
+# ---------------------------------------------------------------------------
+
+_loaded = {'key': None, 'manifest': None}
+
+
+def load_manifest(root=None):
+    """The manifest in ``root`` (reloaded when the file changes), or None before the first build."""
+    root = root or settings.STATIC_ROOT
+    if not root:
+        return None
+    path = Path(root) / MANIFEST_NAME
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    if _loaded['key'] != key:
+        _loaded['manifest'] = json.loads(path.read_text())
+        _loaded['key'] = key
+    return _loaded['manifest']
+
+
+def asset_urls(name):
+    """URLs to load for bundle ``name``: the built file, or the CDN/unbundled sources before a build."""
+    manifest = load_manifest()
+    if manifest and name in manifest['bundles']:
+        return [static(manifest['bundles'][name])]
+    if name not in BUNDLES:
+        raise AssetError(f'Unknown asset bundle {name!r}')
+    return [
+        VENDOR[source[len('vendor/'):]] if source.startswith('vendor/') else static(f'collect/{source}')
+        for source in BUNDLES[name]
+    ]
@@ -0,0 +1,258 @@
+# collect/benchmark.py
+"""
+Request benchmark for every page route in ``threatwatch/urls.py``.
+
+``run_routes`` drives each GET route through the test client and reports
+p50/p95/mean latency, SQL query count (from RequestMetricsMiddleware), response
+size and peak Python memory. ``manage.py benchmark_views`` runs it against a
+throwaway database per data size filled by ``collect.synthetic`` and writes
+the results as JSON so runs can be compared with ``--compare``.
+
+``run_concurrency`` is the write-contention stress test behind
+``manage.py stress_db``: writer threads post the news and intel forms while
+reader threads load the list pages, and every "database is locked" failure
+is counted.
+
+``run_render`` isolates template rendering: it compares the template time of
+the heavy pages, first with fragment caching off and a non-caching template
+loader, then with the configured cached loader and ``{% cache %}`` fragments
+(``manage.py benchmark_views --render``).
+"""
+import gc
+import itertools
+import platform
+import sqlite3
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.db import OperationalError, connections
+from django.test import Client, override_settings
+from django.urls import URLPattern, get_resolver
+
+# Extra query strings worth timing separately, by url name
+VARIANTS = {
+    'dashboard': ['?q=phishing'],
+    'news_search': ['?category=Scam'],
+}
+# Routes that are not GET pages (admin, media and static files, write/JSON endpoints, event streams)
+SKIP = {'media', 'static', 'ingest_alerts', 'request_stats', 'live_events', 'video_uploads'}
+
+# Pages loaded by the reader threads of run_concurrency
+READ_PATHS = ['/dashboard/', '/current_news/', '/spy_news/', '/search_news/', '/trending_news/']
+LOCKED = 'database is locked'
+
+# Pages timed by run_render (the largest templates)
+RENDER_PATHS = ['/dashboard/', '/trending_news/', '/current_news/', '/visualize_news/', '/login/']
+
+
+def page_routes(variants=VARIANTS, skip=SKIP):
+    """``(label, path)`` for every named, argument-free route plus its VARIANTS."""
+    routes = []
+    for pattern in get_resolver().url_patterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in skip:
+            continue
+        if pattern.pattern.regex.groups:
+            continue
+        path = '/' + str(pattern.pattern)
+        routes.append((pattern.name, path))
+        for query in variants.get(pattern.name, []):
+            routes.append((f'{pattern.name}{query}', path + query))
+    return routes
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def measure(client, path, repeat=20, warmup=2):
+    for _ in range(warmup):
+        client.get(path)
+
+    timings = []
+    response = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # Memory in a separate pass: tracemalloc would distort the timings
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        client.get(path)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    metrics = getattr(response, 'metrics', None)
+    return {
+        'path': path,
+        'status': response.status_code,
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'mean_ms': round(statistics.fmean(timings), 2),
+        'queries': metrics.queries if metrics else None,
+        'sql_ms': round(metrics.sql_time * 1000, 2) if metrics else None,
+        'bytes': len(response.content) if not response.streaming else None,
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_routes(client=None, repeat=20, warmup=2, routes=None, on_route=None):
+    client = client or Client()
+    results = {}
+    for label, path in routes or page_routes():
+        results[label] = measure(client, path, repeat, warmup)
+        if on_route:
+            on_route(label, results[label])
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'machine': platform.machine(),
+        'commit': commit,
+    }
+
+
+def compare(previous, current):
+    """Yield ``(size, route, old p50, new p50, change %)`` for routes present in both runs."""
+    for size, run in current.get('sizes', {}).items():
+        old_routes = previous.get('sizes', {}).get(size, {}).get('routes', {})
+        for label, result in run.get('routes', {}).items():
+            old = old_routes.get(label)
+            if not old:
+                continue
+            change = (result['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+            yield size, label, old['p50_ms'], result['p50_ms'], change
+
+
+def _write_requests(worker):
+    """Endless form posts for one writer thread: a threat report, then an intel report."""
+    for n in itertools.count():
+        if n % 2:
+            yield '/spy_news/', {
+                'timing': '2025-01-01 10:00', 'location': f'Stress {worker}-{n}', 'leader': 'Load Test',
+                'status': 'pending',
+            }
+        else:
+            yield '/adding_new/', {
+                'title': f'Stress report {worker}-{n}', 'description': 'Concurrent write check',
+                'url': f'https://stress.example/{worker}/{n}', 'severity': 'medium', 'category': 'Other',
+            }
+
+
+def run_concurrency(writers=4, readers=8, requests=50, read_paths=READ_PATHS):
+    """
+    ``writers`` + ``readers`` threads, ``requests`` each, all at once. Returns
+    counts, "database is locked" failures (raised, or rendered into the form's
+    error message) and p50/p95 latency per side.
+    """
+    timings = {'write': [], 'read': []}
+    failures = []
+    lock = threading.Lock()
+    start = threading.Barrier(writers + readers)
+
+    def work(kind, calls):
+        client = Client()
+        start.wait()
+        try:
+            for path, data in itertools.islice(calls, requests):
+                began = time.perf_counter()
+                try:
+                    response = client.post(path, data) if data is not None else client.get(path)
+                    message = None
+                    if LOCKED.encode() in response.content:  # the forms render save errors as a message
+                        message = f'{path}: {LOCKED}'
+                    elif response.status_code >= 500:
+                        message = f'{path}: HTTP {response.status_code}'
+                except OperationalError as exc:
+                    message = f'{path}: {exc}'
+                elapsed = (time.perf_counter() - began) * 1000
+                with lock:
+                    timings[kind].append(elapsed)
+                    if message:
+                        failures.append(message)
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=work, args=('write', _write_requests(worker)))
+        for worker in range(writers)
+    ] + [
+        threading.Thread(target=work, args=('read', ((path, None) for path in itertools.cycle(read_paths))))
+        for worker in range(readers)
+    ]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    result = {
+        'writers': writers, 'readers': readers, 'seconds': round(elapsed, 2),
+        'requests_per_s': round(sum(map(len, timings.values())) / elapsed, 1) if elapsed else 0.0,
+        'locked': sum(LOCKED in message for message in failures),
+        'failed': len(failures),
+        'failures': failures[:20],
+    }
+    for kind, values in timings.items():
+        result[f'{kind}s'] = len(values)
+        result[f'{kind}_p50_ms'] = round(percentile(values, 50), 2) if values else None
+        result[f'{kind}_p95_ms'] = round(percentile(values, 95), 2) if values else None
+    return result
+
+
+def uncached_rendering():
+    """Settings overrides for the baseline: templates re-read and compiled per render, no fragment cache."""
+    templates = [
+        {**engine, 'OPTIONS': {**engine.get('OPTIONS', {}), 'loaders': [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]}}
+        for engine in settings.TEMPLATES
+    ]
+    caches = {**settings.CACHES, 'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    return {'TEMPLATES': templates, 'CACHES': caches}
+
+
+def run_render(client=None, paths=RENDER_PATHS, repeat=20, warmup=2):
+    """
+    Template time (RequestMetricsMiddleware's ``tpl``) p50/p95 per page, baseline
+    (``uncached_rendering``) against the configured loader and fragment cache.
+    """
+    client = client or Client()
+    results = {path: {} for path in paths}
+    for mode, overrides in (('baseline', uncached_rendering()), ('cached', {})):
+        with override_settings(**overrides):
+            for path in paths:
+                for _ in range(warmup):
+                    client.get(path)
+                timings = [client.get(path).metrics.template_time * 1000 for _ in range(repeat)]
+                results[path][f'{mode}_p50_ms'] = round(percentile(timings, 50), 2)
+                results[path][f'{mode}_p95_ms'] = round(percentile(timings, 95), 2)
+    for result in results.values():
+        result['speedup'] = round(result['baseline_p50_ms'] / result['cached_p50_ms'], 2) if result['cached_p50_ms'] else None
+    return results
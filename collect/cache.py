@@ -0,0 +1,198 @@
+# collect/cache.py
+"""
+Generation-versioned caching for expensive aggregates (stat cards, chart series).
+
+Each model has a generation counter. Cached results are stored under a key
+that embeds the current generation of every model they depend on, and
+``post_save`` / ``post_delete`` (plus the bulk writers) bump the counter
+after commit, so a change makes every dependent entry unreachable at once —
+no TTL guessing. Old entries simply age out of the backend.
+
+The counters live in the database (``CacheGeneration``), not in the cache: a
+bump by a management command (ingest, feed polling, archiving) or another
+worker must reach every web process, whatever the cache backend. A request
+reads them once (one query) and reuses them until it finishes.
+
+Cached values go to whatever ``CACHES['default']`` is (``CACHE_BACKEND`` in
+settings: locmem, file or redis). Concurrent misses on one key are collapsed
+with an ``add()`` lock: one caller computes, the others wait for its result.
+
+Nothing is read from or written to the cache inside a transaction: code there
+may see its own uncommitted writes, which must not leak to other requests.
+
+Rendered template fragments (``{% cache %}`` blocks) are versioned the same
+way: their vary-on values include ``TEMPLATE_RELEASE`` and the generation of
+the models they show (see collect/context_processors.py).
+"""
+import hashlib
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import request_finished, request_started
+from django.db import connection, connections, router, transaction
+
+PREFIX = 'collect'
+DEFAULT_TIMEOUT = 24 * 3600  # eviction only; invalidation is by generation
+LOCK_TIMEOUT = 30
+LOCK_POLL = 0.05
+
+_MISSING = object()
+
+
+def template_release():
+    """Newest template mtime: a deploy that changes the markup changes it."""
+    stamps = [
+        path.stat().st_mtime_ns
+        for directory in settings.TEMPLATES[0].get('DIRS', [])
+        for path in Path(directory).rglob('*.html')
+    ]
+    return max(stamps, default=0)
+
+
+TEMPLATE_RELEASE = template_release()
+
+
+def get_cache():
+    return caches['default']
+
+
+def _label(model):
+    return model if isinstance(model, str) else model._meta.label_lower
+
+
+def _counters():
+    from .models import CacheGeneration
+    return CacheGeneration
+
+
+# Generations already read by the current request: {label: value}, None outside requests
+_request_generations = ContextVar('request_generations', default=None)
+
+
+def _start_request(**kwargs):
+    _request_generations.set({})
+
+
+def _finish_request(**kwargs):
+    _request_generations.set(None)
+
+
+request_started.connect(_start_request)
+request_finished.connect(_finish_request)
+
+
+def _load(labels):
+    """{label: generation} from the database; a missing counter starts from the clock."""
+    model = _counters()
+    table = model._meta.db_table
+    marks = ', '.join(['%s'] * len(labels))
+    with connections[router.db_for_read(model)].cursor() as cursor:
+        cursor.execute(f'SELECT label, value FROM {table} WHERE label IN ({marks})', labels)
+        found = dict(cursor.fetchall())
+    missing = [label for label in labels if label not in found]
+    if missing:
+        # Never restart at a small number: old entries for it may still be cached.
+        # The no-op update makes RETURNING report rows another writer created first.
+        with connections[router.db_for_write(model)].cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (label, value) VALUES {', '.join(['(%s, %s)'] * len(missing))} "
+                f'ON CONFLICT(label) DO UPDATE SET value = value RETURNING label, value',
+                [value for label in missing for value in (label, time.time_ns())],
+            )
+            found.update(cursor.fetchall())
+    return found
+
+
+def ensure_generations(models, using='default'):
+    """Create the missing counters of ``models`` up front (after ``migrate``) so no request has to."""
+    labels = list(dict.fromkeys(_label(model) for model in models))
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {_counters()._meta.db_table} (label, value) VALUES {', '.join(['(%s, %s)'] * len(labels))} "
+            'ON CONFLICT(label) DO NOTHING',
+            [value for label in labels for value in (label, time.time_ns())],
+        )
+
+
+def generation_subquery(model):
+    """(SQL, params) of a scalar subquery for ``model``'s generation, to read it along with other values."""
+    return f'(SELECT value FROM {_counters()._meta.db_table} WHERE label = %s)', [_label(model)]
+
+
+def remember_generation(model, value):
+    """Keep a generation read through ``generation_subquery`` for the rest of the request."""
+    memo = _request_generations.get()
+    if memo is not None and value is not None:
+        memo.setdefault(_label(model), value)
+
+
+def generations(models):
+    """Current generation of each model (read once per request)."""
+    labels = [_label(model) for model in models]
+    memo = _request_generations.get()
+    if memo is None:
+        memo = {}
+    missing = list(dict.fromkeys(label for label in labels if label not in memo))
+    if missing:
+        memo.update(_load(missing))
+    return [memo[label] for label in labels]
+
+
+def bump(*models):
+    model = _counters()
+    memo = _request_generations.get()
+    with connections[router.db_for_write(model)].cursor() as cursor:
+        for label in dict.fromkeys(_label(model) for model in models):
+            cursor.execute(
+                f'INSERT INTO {model._meta.db_table} (label, value) VALUES (%s, %s) '
+                f'ON CONFLICT(label) DO UPDATE SET value = value + 1 RETURNING value',
+                [label, time.time_ns()],
+            )
+            if memo is not None:
+                memo[label] = cursor.fetchone()[0]  # this request sees its own change
+
+
+def bump_on_commit(*models):
+    """Invalidate once the current transaction (if any) has committed."""
+    transaction.on_commit(lambda: bump(*models))
+
+
+def cache_key(name, models, parts):
+    versions = '.'.join(str(value) for value in generations(models))
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()[:16] if parts else '-'
+    return f'{PREFIX}:{name}:{versions}:{digest}'
+
+
+def cached(name, compute, depends_on, parts=(), timeout=DEFAULT_TIMEOUT):
+    """
+    Return ``compute()``, shared through the cache until one of the
+    ``depends_on`` models changes. ``parts`` distinguishes variants (filters,
+    date) of the same value.
+    """
+    if connection.in_atomic_block:
+        return compute()
+
+    cache = get_cache()
+    key = cache_key(name, depends_on, parts)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    lock = f'{key}:lock'
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(lock, 1, LOCK_TIMEOUT):
+        time.sleep(LOCK_POLL)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if time.monotonic() > deadline:  # the holder died; compute ourselves
+            break
+    try:
+        value = compute()
+        cache.set(key, value, timeout)
+    finally:
+        cache.delete(lock)
+    return value
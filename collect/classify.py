@@ -0,0 +1,292 @@
+# collect/classify.py
+"""
+Text classifier that suggests a category and a severity for ThreatAlert.
+
+Features are hashed TF-IDF: word unigrams and bigrams of title + content are
+hashed into ``N_FEATURES`` columns, weighted ``1 + log(tf)`` times the
+training IDF and L2-normalised, giving a SciPy CSR matrix per batch. Two
+softmax (multinomial logistic) regressions sit on top, one over the category
+labels and one over severities, trained with L-BFGS on the columns seen
+during training.
+
+``train()`` learns from the alerts analysts already labelled (category other
+than 'Other', near-duplicate copies left out) and ``save()`` writes a
+compressed ``.npz`` to ``settings.CLASSIFIER_PATH``. Scoring is batched —
+one sparse matrix product per batch — and stores ``predicted_category``,
+``category_confidence`` and ``predicted_severity`` next to the analyst's own
+choice, which is never overwritten. New alerts are scored on save and at bulk
+ingestion; ``manage.py classify_alerts`` backfills the archive.
+"""
+import re
+import time
+import zlib
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from scipy import sparse
+from scipy.optimize import minimize
+
+from .models import ThreatAlert
+
+N_FEATURES = 1 << 18
+BATCH_SIZE = 2000
+FORMAT_VERSION = 1
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_BIGRAM_MULTIPLIER = np.uint64(0x9E3779B1)
+
+
+@lru_cache(maxsize=1 << 17)
+def _word_hash(word):
+    return zlib.crc32(word.encode())
+
+
+def hashed_tokens(text, n_features=N_FEATURES):
+    """
+    Column ids of the words and adjacent-word bigrams of ``text``. Words are
+    hashed once (and memoised); a bigram id is mixed from its two word hashes
+    in NumPy instead of hashing a joined string.
+    """
+    words = np.fromiter(map(_word_hash, _TOKEN_RE.findall(text.lower())), dtype=np.uint64)
+    bigrams = (words[:-1] * _BIGRAM_MULTIPLIER + words[1:]) & 0xFFFFFFFF
+    return np.concatenate([words, bigrams]).astype(np.int64) % n_features
+
+
+def hashed_counts(texts, n_features=N_FEATURES):
+    """CSR matrix of raw term counts, one row per text."""
+    cols = [hashed_tokens(text, n_features) for text in texts]
+    rows = np.repeat(np.arange(len(cols)), [len(col) for col in cols])
+    cols = np.concatenate(cols) if cols else np.empty(0, np.int64)
+    # Repeated (row, col) entries are summed when converting to CSR
+    counts = sparse.coo_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(texts), n_features),
+    ).tocsr()
+    counts.sum_duplicates()
+    return counts
+
+
+def _normalize(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+
+def _fit_softmax(X, y, n_classes, l2, max_iter):
+    """Multinomial logistic regression; returns (weights [features x classes], bias [classes])."""
+    n_samples, n_features = X.shape
+    target = np.zeros((n_samples, n_classes))
+    target[np.arange(n_samples), y] = 1
+
+    def loss(params):
+        W = params[:-n_classes].reshape(n_features, n_classes)
+        b = params[-n_classes:]
+        probs = _softmax(np.asarray(X @ W) + b)
+        value = -np.log(probs[np.arange(n_samples), y] + 1e-12).sum() / n_samples + l2 / 2 * (W * W).sum()
+        error = (probs - target) / n_samples
+        grad_W = np.asarray(X.T @ error) + l2 * W
+        return value, np.concatenate([grad_W.ravel(), error.sum(axis=0)])
+
+    result = minimize(
+        loss, np.zeros(n_features * n_classes + n_classes), jac=True, method='L-BFGS-B',
+        options={'maxiter': max_iter, 'maxcor': 5},
+    )
+    params = result.x
+    return params[:-n_classes].reshape(n_features, n_classes).astype(np.float32), params[-n_classes:].astype(np.float32)
+
+
+class TextClassifier:
+    """Hashed TF-IDF features + one softmax regression per target (category, severity)."""
+
+    def __init__(self, columns, idf, heads, n_features=N_FEATURES, meta=None):
+        self.columns = columns            # hashed column ids kept from training, sorted
+        self.idf = idf                    # IDF per kept column
+        self.heads = heads                # {'category': (labels, W, b), 'severity': (labels, W, b)}
+        self.n_features = n_features
+        self.meta = meta or {}
+        self._position = np.full(n_features, -1, dtype=np.int32)
+        self._position[columns] = np.arange(len(columns), dtype=np.int32)
+
+    def transform(self, texts):
+        """TF-IDF rows over the training columns (unseen hashes are dropped)."""
+        counts = hashed_counts(texts, self.n_features).tocoo()
+        position = self._position[counts.col]
+        keep = position >= 0
+        tf = 1 + np.log(counts.data[keep])
+        matrix = sparse.csr_matrix(
+            (tf * self.idf[position[keep]], (counts.row[keep], position[keep])),
+            shape=(len(texts), len(self.columns)),
+        )
+        return _normalize(matrix)
+
+    def predict(self, texts):
+        """{head: (labels, confidences)} for every text."""
+        X = self.transform(texts)
+        results = {}
+        for name, (labels, W, b) in self.heads.items():
+            probs = _softmax(np.asarray(X @ W) + b)
+            best = probs.argmax(axis=1)
+            results[name] = (labels[best], probs[np.arange(len(texts)), best])
+        return results
+
+    @classmethod
+    def train(cls, texts, targets, min_df=2, max_features=1 << 16, l2=1e-4, max_iter=200):
+        """``targets`` maps head name -> label per text."""
+        counts = hashed_counts(texts)
+        df = np.bincount(counts.indices, minlength=N_FEATURES)
+        columns = np.flatnonzero(df >= min_df)
+        if len(columns) > max_features:
+            columns = np.sort(columns[np.argsort(df[columns], kind='stable')[::-1][:max_features]])
+        idf = (np.log((1 + len(texts)) / (1 + df[columns])) + 1).astype(np.float32)
+        model = cls(columns, idf, {})
+        X = model.transform(texts)
+        for name, labels in targets.items():
+            classes, y = np.unique(np.asarray(labels), return_inverse=True)
+            W, b = _fit_softmax(X, y, len(classes), l2, max_iter)
+            model.heads[name] = (classes, W, b)
+        model.meta = {'samples': len(texts), 'features': len(columns), 'trained_at': time.time()}
+        return model
+
+    def save(self, path):
+        arrays = {'version': FORMAT_VERSION, 'n_features': self.n_features, 'columns': self.columns, 'idf': self.idf}
+        for name, (labels, W, b) in self.heads.items():
+            arrays[f'{name}_labels'] = labels
+            arrays[f'{name}_W'] = W
+            arrays[f'{name}_b'] = b
+        arrays.update({f'meta_{key}': value for key, value in self.meta.items()})
+        with open(path, 'wb') as handle:
+            np.savez_compressed(handle, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != FORMAT_VERSION:
+                raise ValueError(f'{path}: unsupported classifier format')
+            heads = {
+                name: (data[f'{name}_labels'], data[f'{name}_W'], data[f'{name}_b'])
+                for name in ('category', 'severity') if f'{name}_W' in data
+            }
+            meta = {key[5:]: data[key].item() for key in data.files if key.startswith('meta_')}
+            return cls(data['columns'], data['idf'], heads, int(data['n_features']), meta)
+
+
+# ---------------------------------------------------------------------------
+# The deployed model
+# ---------------------------------------------------------------------------
+
+_loaded = {'key': None, 'model': None}
+
+
+def classifier_path():
+    return Path(getattr(settings, 'CLASSIFIER_PATH', settings.BASE_DIR / 'classifier.npz'))
+
+
+def get_classifier():
+    """The model at CLASSIFIER_PATH (reloaded when the file changes), or None before training."""
+    path = classifier_path()
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    if _loaded['key'] != key:
+        _loaded['model'] = TextClassifier.load(path)
+        _loaded['key'] = key
+    return _loaded['model']
+
+
+def alert_text(title, content):
+    return f'{title}\n{content or ""}'
+
+
+def training_rows():
+    """(text, category, severity) of analyst-labelled alerts, one per story."""
+    rows = (
+        ThreatAlert.objects.filter(ThreatAlert.CANONICAL).exclude(category='Other')
+        .order_by('id').values_list('title', 'content', 'category', 'severity')
+    )
+    return [(alert_text(title, content), category, severity) for title, content, category, severity in rows.iterator()]
+
+
+def train(holdout=0.1, seed=0, **options):
+    """
+    Fit on ``training_rows()``. Returns (model, {head: holdout accuracy}); the
+    reported model is refitted on every row after the holdout check.
+    """
+    rows = training_rows()
+    if len(rows) < 2 or len({category for text, category, severity in rows}) < 2:
+        raise ValueError('Need labelled alerts in at least two categories to train')
+    texts = [text for text, category, severity in rows]
+    targets = {
+        'category': [category for text, category, severity in rows],
+        'severity': [severity for text, category, severity in rows],
+    }
+    accuracy = {}
+    test = np.random.RandomState(seed).rand(len(rows)) < holdout
+    if holdout and test.any() and not test.all():
+        train_idx, test_idx = np.flatnonzero(~test), np.flatnonzero(test)
+        model = TextClassifier.train(
+            [texts[i] for i in train_idx], {name: [labels[i] for i in train_idx] for name, labels in targets.items()},
+            **options,
+        )
+        predicted = model.predict([texts[i] for i in test_idx])
+        for name, labels in targets.items():
+            expected = np.array([labels[i] for i in test_idx])
+            accuracy[name] = float((predicted[name][0] == expected).mean())
+    return TextClassifier.train(texts, targets, **options), accuracy
+
+
+def score_alerts(alerts, model=None):
+    """Set the predicted_* fields on unsaved/in-memory alerts. Returns False without a model."""
+    model = model or get_classifier()
+    if model is None or not alerts:
+        return False
+    results = model.predict([alert_text(alert.title, alert.content) for alert in alerts])
+    categories, confidences = results['category']
+    severities = results['severity'][0] if 'severity' in results else [''] * len(alerts)
+    for alert, category, confidence, severity in zip(alerts, categories, confidences, severities):
+        alert.predicted_category = str(category)
+        alert.category_confidence = round(float(confidence), 4)
+        alert.predicted_severity = str(severity)
+    return True
+
+
+_UPDATE_SQL = (
+    f'UPDATE {ThreatAlert._meta.db_table} '
+    f'SET predicted_category = %s, category_confidence = %s, predicted_severity = %s WHERE id = %s'
+)
+
+
+def classify_archive(rescore=False, batch_size=BATCH_SIZE, model=None, on_batch=None):
+    """Backfill predictions in id order, ``batch_size`` alerts per matrix product. Returns rows scored."""
+    model = model or get_classifier()
+    if model is None:
+        raise ValueError(f'No classifier at {classifier_path()}; run `manage.py train_classifier` first')
+    queryset = ThreatAlert.objects.all() if rescore else ThreatAlert.objects.filter(predicted_category='')
+    last_id = done = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', 'title', 'content')[:batch_size])
+        if not rows:
+            return done
+        last_id = rows[-1][0]
+        results = model.predict([alert_text(title, content) for alert_id, title, content in rows])
+        categories, confidences = results['category']
+        severities = results['severity'][0] if 'severity' in results else [''] * len(rows)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(_UPDATE_SQL, [
+                (str(category), round(float(confidence), 4), str(severity), alert_id)
+                for (alert_id, title, content), category, confidence, severity
+                in zip(rows, categories, confidences, severities)
+            ])
+        done += len(rows)
+        if on_batch:
+            on_batch(done)
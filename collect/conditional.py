@@ -0,0 +1,98 @@
+# collect/conditional.py
+"""
+Conditional GET for list and chart pages.
+
+``@conditional_page(ThreatAlert, ...)`` works out a validator before the view
+runs. Each model costs one query of two index lookups, ``MAX(id)`` and
+``MAX(<time field>)`` (new rows), which also reads its generation from
+``collect/cache.py`` (kept for the rest of the request). The generation
+covers in-place edits and deletions, which the signals and the archive bump. The validator also includes the
+query string, the signed-in user and the template release. A request whose
+``If-None-Match`` (or, without one, ``If-Modified-Since``) still matches
+gets a 304 and skips the view's queries and template rendering.
+
+Responses are marked ``private, no-cache``: browsers keep the page but
+revalidate it on every visit instead of guessing a freshness lifetime from
+``Last-Modified``.
+"""
+import hashlib
+from datetime import timezone as dt_timezone
+from functools import wraps
+
+from django.db import connections, router
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .cache import TEMPLATE_RELEASE, generation_subquery, generations, remember_generation
+
+# Creation-time column per model; models without one are validated by max id and generation only
+TIME_FIELDS = {
+    'collect.threatalert': 'timestamp',
+    'collect.currentinformation': 'created_at',
+}
+
+
+def model_state(model):
+    """
+    (max id, max time field or None). Separate scalar subqueries so SQLite
+    answers each MAX from one end of an index; a combined aggregate (or a
+    COUNT) scans the whole table.
+    """
+    table = model._meta.db_table
+    time_field = TIME_FIELDS.get(model._meta.label_lower)
+    latest = f'(SELECT MAX({model._meta.get_field(time_field).column}) FROM {table})' if time_field else 'NULL'
+    generation, params = generation_subquery(model)
+    with connections[router.db_for_read(model)].cursor() as cursor:
+        cursor.execute(f'SELECT (SELECT MAX(id) FROM {table}), {latest}, {generation}', params)
+        last_id, latest, generation = cursor.fetchone()
+    remember_generation(model, generation)
+    if latest is not None:
+        # Raw subqueries come back as text; stored datetimes are UTC
+        latest = model._meta.get_field(time_field).to_python(latest)
+        if timezone.is_naive(latest):
+            latest = timezone.make_aware(latest, dt_timezone.utc)
+    return last_id, latest
+
+
+def page_validators(request, models, parts=None):
+    """(etag, last modified) for ``request``, computed once per request."""
+    if not hasattr(request, '_page_validators'):
+        states = [model_state(model) for model in models]
+        user = request.user
+        fingerprint = repr((
+            request.resolver_match.view_name if request.resolver_match else request.path,
+            sorted(request.GET.lists()),
+            user.pk if user.is_authenticated else None,
+            states,
+            generations(models),
+            parts(request) if parts else (),
+            TEMPLATE_RELEASE,
+        ))
+        etag = hashlib.blake2b(fingerprint.encode(), digest_size=12).hexdigest()
+        stamps = [latest for last_id, latest in states if latest is not None]
+        request._page_validators = (etag, max(stamps) if stamps else None)
+    return request._page_validators
+
+
+def conditional_page(*models, parts=None):
+    """
+    View decorator: ETag / Last-Modified from the state of ``models``; unchanged
+    pages answer 304 without running the view. ``parts(request)`` adds anything
+    else the page depends on (e.g. today's date for rolling chart windows).
+    """
+    def decorator(view):
+        conditional = condition(
+            etag_func=lambda request, *args, **kwargs: page_validators(request, models, parts)[0],
+            last_modified_func=lambda request, *args, **kwargs: page_validators(request, models, parts)[1],
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+    return decorator
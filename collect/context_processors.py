@@ -0,0 +1,16 @@
+# collect/context_processors.py
+"""
+Template context shared by every page.
+
+``{% cache %}`` keys are built from its vary-on values only, so fragments
+put ``fragment_release`` first: a deploy that changes the templates retires
+every cached fragment instead of serving old markup until it expires.
+"""
+from .cache import DEFAULT_TIMEOUT, TEMPLATE_RELEASE
+
+
+def fragments(request):
+    return {
+        'fragment_release': TEMPLATE_RELEASE,
+        'fragment_timeout': DEFAULT_TIMEOUT,
+    }
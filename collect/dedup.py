@@ -0,0 +1,359 @@
+# collect/dedup.py
+"""
+Near-duplicate detection for ThreatAlert (the same story reposted under another URL).
+
+* ``signature()`` shingles title + content into word 3-grams and computes a
+  64-permutation MinHash, stored on the row as 256 bytes (``minhash``).
+* The signature is cut into 8 bands of 8 rows; each band hashes to a bucket in
+  ``ThreatAlertSignatureBand``. Two alerts that share any bucket are candidates
+  (likely above ~0.77 Jaccard), so a lookup is one indexed query, not a scan.
+* Candidates whose estimated Jaccard similarity reaches ``SIMILARITY`` put the
+  new alert into their cluster: ``cluster_id`` is the id of the first alert of
+  the story and ``is_duplicate`` marks every later copy. Only cluster leaders
+  are banded. Lists show leaders only (``ThreatAlert.CANONICAL``) with the
+  number of copies; counts and the rollup still count every report.
+
+New rows are clustered as they are saved (signals) or ingested in bulk
+(``prepare_batch`` / ``index_batch``); ``manage.py backfill_clusters`` processes
+the existing archive, hashing chunks in parallel worker processes.
+"""
+import hashlib
+import os
+import re
+import zlib
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from operator import or_
+
+import numpy as np
+from django.db import connection, connections, router, transaction
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+from .cache import bump_on_commit
+from .models import ThreatAlert, ThreatAlertSignatureBand
+
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+SIMILARITY = 0.8
+# Buckets per lookup query: one ``bucket IN (...)`` per band keeps the expression
+# shallow, and the chunk keeps the parameters far below SQLite's variable limit
+LOOKUP_CHUNK = 2000
+
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(1)  # fixed: stored signatures must stay comparable
+_A = _rng.randint(1, (1 << 61) - 1, NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, (1 << 61) - 1, NUM_PERM, dtype=np.uint64)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def shingles(text):
+    tokens = _TOKEN_RE.findall((text or '').lower())
+    if len(tokens) < SHINGLE_SIZE:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def signature(title, content):
+    """MinHash of the title + content shingles as a uint32 array of NUM_PERM values."""
+    grams = shingles(f'{title} {content}')
+    if not grams:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint32)
+    hashes = np.fromiter((zlib.crc32(gram.encode()) for gram in grams), dtype=np.uint64, count=len(grams))
+    with np.errstate(over='ignore'):
+        permuted = (hashes[:, None] * _A + _B) % _PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def to_bytes(sig):
+    return sig.astype('<u4').tobytes()
+
+
+def from_bytes(data):
+    return np.frombuffer(bytes(data), dtype='<u4')
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def band_buckets(sig):
+    """[(band, bucket)] — a signed 64-bit hash of each band's rows."""
+    raw = to_bytes(sig)
+    width = ROWS * 4
+    return [
+        (band, int.from_bytes(hashlib.blake2b(raw[band * width:(band + 1) * width], digest_size=8).digest(),
+                              'little', signed=True))
+        for band in range(BANDS)
+    ]
+
+
+def _lookup(buckets):
+    """Leader ids sharing any of ``buckets`` (one indexed query per LOOKUP_CHUNK buckets)."""
+    buckets = sorted(set(buckets))
+    ids = set()
+    for start in range(0, len(buckets), LOOKUP_CHUNK):
+        by_band = defaultdict(list)
+        for band, bucket in buckets[start:start + LOOKUP_CHUNK]:
+            by_band[band].append(bucket)
+        condition = reduce(or_, (Q(band=band, bucket__in=values) for band, values in by_band.items()))
+        ids.update(ThreatAlertSignatureBand.objects.filter(condition).values_list('alert_id', flat=True))
+    return ids
+
+
+def _best_match(sig, candidates):
+    """(leader id, similarity) of the most similar candidate above SIMILARITY, else (None, 0)."""
+    best, best_score = None, 0.0
+    for alert_id, stored in candidates:
+        score = similarity(sig, stored)
+        if score >= SIMILARITY and (score > best_score or (score == best_score and alert_id < best)):
+            best, best_score = alert_id, score
+    return best, best_score
+
+
+def _leader_signatures(ids):
+    rows = ThreatAlert.objects.filter(id__in=ids, minhash__isnull=False).values_list('id', 'minhash')
+    return [(alert_id, from_bytes(data)) for alert_id, data in rows]
+
+
+# ---------------------------------------------------------------------------
+# One alert (model signals)
+# ---------------------------------------------------------------------------
+
+def prepare_alert(alert, old=None):
+    """
+    pre_save: (re)compute the signature and join an existing cluster if the text
+    is a near-duplicate. Sets ``alert._signature_changed`` for ``index_alert``.
+    """
+    sig = signature(alert.title, alert.content)
+    data = to_bytes(sig)
+    alert._signature_changed = old is None or old.minhash is None or bytes(old.minhash) != data
+    if not alert._signature_changed:
+        return
+    alert.minhash = data
+    if old is not None and not old.is_duplicate and old.cluster_id == old.pk and \
+            ThreatAlert.objects.filter(cluster_id=old.pk, is_duplicate=True).exists():
+        return  # an edited leader keeps its cluster
+    candidates = _lookup(band_buckets(sig)) - ({alert.pk} if alert.pk else set())
+    leader, score = _best_match(sig, _leader_signatures(candidates))
+    if leader:
+        alert.cluster_id = leader
+        alert.is_duplicate = True
+    else:
+        alert.cluster_id = alert.pk if alert.pk else _next_id()
+        alert.is_duplicate = False
+
+
+def _next_id():
+    """
+    The id the INSERT of a new alert will get, as part of that same statement
+    (AUTOINCREMENT: one past the highest id ever used), so a new leader's
+    cluster id needs no follow-up UPDATE. None elsewhere than SQLite.
+    """
+    if connections[router.db_for_write(ThreatAlert)].vendor != 'sqlite':
+        return None
+    table = ThreatAlert._meta.db_table
+    return RawSQL(
+        f'SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = %s), 0), '
+        f'COALESCE((SELECT MAX(id) FROM {table}), 0)) + 1',
+        [table],
+    )
+
+
+def index_alert(alert, created=False):
+    """post_save: band leaders (so later copies find them) and give new leaders their cluster id."""
+    if not getattr(alert, '_signature_changed', False):
+        return
+    if not created:  # a new row has no bands yet
+        ThreatAlertSignatureBand.objects.filter(alert_id=alert.pk).delete()
+    if alert.is_duplicate:
+        return
+    if isinstance(alert.cluster_id, RawSQL):
+        alert.cluster_id = alert.pk  # written by the INSERT itself
+    elif alert.cluster_id != alert.pk:
+        ThreatAlert.objects.filter(pk=alert.pk).update(cluster_id=alert.pk)
+        alert.cluster_id = alert.pk
+    ThreatAlertSignatureBand.objects.bulk_create([
+        ThreatAlertSignatureBand(alert_id=alert.pk, band=band, bucket=bucket)
+        for band, bucket in band_buckets(from_bytes(alert.minhash))
+    ])
+
+
+def promote_after_delete(alert):
+    """post_delete of a leader: the oldest remaining copy leads the cluster. Returns it, if any."""
+    if alert.is_duplicate or alert.cluster_id is None:
+        return None
+    successor = ThreatAlert.objects.filter(cluster_id=alert.pk, is_duplicate=True).order_by('id').first()
+    if successor is None:
+        return None
+    ThreatAlert.objects.filter(cluster_id=alert.pk).update(cluster_id=successor.pk)
+    successor.cluster_id = successor.pk
+    successor.is_duplicate = False
+    successor._signature_changed = True
+    ThreatAlert.objects.filter(pk=successor.pk).update(is_duplicate=False)
+    index_alert(successor)
+    return successor
+
+
+# ---------------------------------------------------------------------------
+# Batches (bulk ingestion)
+# ---------------------------------------------------------------------------
+
+def prepare_batch(alerts, existing=None):
+    """
+    Before ``bulk_create``: sign every alert and cluster the new ones against
+    stored leaders and earlier alerts of the same batch. ``existing`` maps url ->
+    stored alert for rows being updated; they keep their cluster. New leaders have
+    no id yet, so their copies remember the leader's url for ``index_batch``.
+    """
+    existing = existing or {}
+    signed = [(alert, signature(alert.title, alert.content)) for alert in alerts]
+    buckets = {alert.url: band_buckets(sig) for alert, sig in signed}
+    stored = _leader_signatures(_lookup({key for keys in buckets.values() for key in keys}))
+    stored_sigs = dict(stored)
+    stored_bands = defaultdict(set)
+    for alert_id, sig in stored:
+        for key in band_buckets(sig):
+            stored_bands[key].add(alert_id)
+
+    local_bands = defaultdict(list)  # (band, bucket) -> [url of a new leader in this batch]
+    local_sigs = {}
+    for alert, sig in signed:
+        alert.minhash = to_bytes(sig)
+        alert._cluster_url = None
+        alert._buckets = buckets[alert.url]
+        old = existing.get(alert.url)
+        if old is not None:
+            alert.cluster_id, alert.is_duplicate = old.cluster_id, old.is_duplicate
+            continue
+        keys = buckets[alert.url]
+        ids = {alert_id for key in keys for alert_id in stored_bands.get(key, ())}
+        leader, score = _best_match(sig, [(alert_id, stored_sigs[alert_id]) for alert_id in ids])
+        for url in sorted({url for key in keys for url in local_bands.get(key, ())}):
+            local_score = similarity(sig, local_sigs[url])
+            if local_score >= SIMILARITY and local_score > score:
+                leader, score, alert._cluster_url = None, local_score, url
+        alert.cluster_id = leader
+        alert.is_duplicate = bool(leader or alert._cluster_url)
+        if not alert.is_duplicate:
+            local_sigs[alert.url] = sig
+            for key in keys:
+                local_bands[key].append(alert.url)
+    return alerts
+
+
+_BAND_SQL = f'INSERT INTO {ThreatAlertSignatureBand._meta.db_table} (alert_id, band, bucket) VALUES (%s, %s, %s)'
+
+
+def index_batch(alerts):
+    """After ``bulk_create``: resolve ids, band the leaders and point copies at their leader."""
+    ids = dict(ThreatAlert.objects.filter(url__in=[alert.url for alert in alerts]).values_list('url', 'id'))
+    bands = []
+    for alert in alerts:
+        alert.pk = ids.get(alert.url, alert.pk)
+        if alert.pk is None or alert.is_duplicate:
+            continue
+        alert.cluster_id = alert.pk
+        buckets = getattr(alert, '_buckets', None) or band_buckets(from_bytes(alert.minhash))
+        bands.extend((alert.pk, band, bucket) for band, bucket in buckets)
+    ThreatAlertSignatureBand.objects.filter(alert_id__in=[alert.pk for alert in alerts if alert.pk]).delete()
+    # executemany skips building a model instance per band (eight per leader)
+    with connections[router.db_for_write(ThreatAlertSignatureBand)].cursor() as cursor:
+        cursor.executemany(_BAND_SQL, bands)
+    ThreatAlert.objects.filter(
+        id__in=[alert.pk for alert in alerts if alert.pk and not alert.is_duplicate], cluster_id__isnull=True,
+    ).update(cluster_id=F('id'))
+    for alert in alerts:
+        if alert._cluster_url and alert.pk:
+            alert.cluster_id = ids.get(alert._cluster_url)
+            ThreatAlert.objects.filter(pk=alert.pk).update(cluster_id=alert.cluster_id)
+
+
+# ---------------------------------------------------------------------------
+# Backfill
+# ---------------------------------------------------------------------------
+
+def _sign_chunk(rows):
+    """Worker: [(id, title, content)] -> [(id, signature bytes)]."""
+    return [(alert_id, to_bytes(signature(title, content))) for alert_id, title, content in rows]
+
+
+def _chunks(queryset, size):
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', 'title', 'content')[:size])
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield rows
+
+
+_UPDATE_SQL = (
+    f'UPDATE {ThreatAlert._meta.db_table} SET minhash = %s, cluster_id = %s, is_duplicate = %s WHERE id = %s'
+)
+
+
+def backfill_clusters(chunk_size=2000, workers=None, on_chunk=None):
+    """
+    Re-sign and re-cluster every alert, oldest first. Hashing runs in ``workers``
+    processes (None: one per CPU, 0: in-process); clustering is a single pass in
+    id order against an in-memory band index of the leaders, so the result is
+    the same whatever the parallelism. Returns (alerts, duplicates).
+    """
+    bands = defaultdict(list)  # (band, bucket) -> [leader id]
+    leader_sigs = {}
+    total = duplicates = 0
+
+    def cluster(signed):
+        nonlocal total, duplicates
+        updates = []
+        for alert_id, data in signed:
+            sig = from_bytes(data)
+            keys = band_buckets(sig)
+            ids = {leader for key in keys for leader in bands.get(key, ())}
+            leader, score = _best_match(sig, [(leader, leader_sigs[leader]) for leader in ids])
+            if leader:
+                duplicates += 1
+                updates.append((data, leader, True, alert_id))
+            else:
+                leader_sigs[alert_id] = sig
+                for key in keys:
+                    bands[key].append(alert_id)
+                updates.append((data, alert_id, False, alert_id))
+        # One parameterised statement per row via executemany; bulk_update's CASE WHEN is far slower
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(_UPDATE_SQL, updates)
+        total += len(updates)
+        if on_chunk:
+            on_chunk(total, duplicates)
+
+    chunks = _chunks(ThreatAlert.objects.all(), chunk_size)
+    if workers == 0:
+        for rows in chunks:
+            cluster(_sign_chunk(rows))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # A bounded window of chunks in flight (pool.map would read the whole table up front),
+            # collected in submission order so leaders are always the oldest alert of a story
+            pending, window = deque(), 2 * (workers or os.cpu_count() or 1)
+            for rows in chunks:
+                pending.append(pool.submit(_sign_chunk, rows))
+                if len(pending) > window:
+                    cluster(pending.popleft().result())
+            while pending:
+                cluster(pending.popleft().result())
+
+    with transaction.atomic():
+        ThreatAlertSignatureBand.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.executemany(_BAND_SQL, [
+                (leader, band, bucket) for (band, bucket), leaders in bands.items() for leader in leaders
+            ])
+        bump_on_commit(ThreatAlert)
+    return total, duplicates
@@ -0,0 +1,249 @@
+# collect/export.py
+"""
+Streaming exports of ThreatAlert and CurrentInformation.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` and encoded
+chunk by chunk, so memory stays flat however many rows match; the same
+generators feed ``StreamingHttpResponse`` (``newsExport``) and the
+``export_data`` management command. Alert exports with ``archive=1`` also
+read the monthly archive partitions, merged in time order.
+
+Formats: ``csv``, ``ndjson`` and ``parquet`` (columnar, one row group per
+chunk; needs the optional ``pyarrow`` package, ``pd.read_parquet`` reads it).
+"""
+import csv
+import heapq
+import io
+import json
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .archive import archived_rows, filter_live
+from .models import CurrentInformation, ThreatAlert
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # columnar export is optional
+    pa = pq = None
+
+CHUNK_SIZE = 2000
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+DATASETS = {
+    'alerts': {
+        'model': ThreatAlert,
+        'fields': ['id', 'timestamp', 'title', 'category', 'severity', 'source', 'url', 'content', 'image', 'video'],
+        'time_field': 'timestamp',
+    },
+    'current': {
+        'model': CurrentInformation,
+        'fields': ['id', 'created_at', 'timing', 'location', 'leader', 'number', 'vehicle', 'description', 'status'],
+        'time_field': 'created_at',
+    },
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parquet_available():
+    return pq is not None
+
+
+def parse_bound(value, end=False):
+    """Aware datetime from 'YYYY-MM-DD' or 'YYYY-MM-DDTHH:MM[:SS]'; a bare end date includes that day."""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ExportError(f'Invalid date: {value!r}')
+        parsed = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _alert_filters(params):
+    """category, severity, start, end and q of an alerts export, shared by the live and archive queries."""
+    getlist = params.getlist if hasattr(params, 'getlist') else (lambda key: params.get(key) or [])
+    return {
+        'categories': getlist('category'),
+        'severities': getlist('severity'),
+        'start': parse_bound(params.get('start')),
+        'end': parse_bound(params.get('end'), end=True),
+        'query': (params.get('q') or '').strip(),
+    }
+
+
+def filter_rows(dataset, params):
+    """
+    Queryset for ``dataset`` narrowed by ``params`` (a QueryDict or a dict of
+    lists): category, severity, status, start, end and q. Ordered oldest first.
+    """
+    if dataset not in DATASETS:
+        raise ExportError(f'Unknown dataset: {dataset!r}')
+    spec = DATASETS[dataset]
+    get = params.get
+    getlist = params.getlist if hasattr(params, 'getlist') else (lambda key: params.get(key) or [])
+    time_field = spec['time_field']
+
+    if dataset == 'alerts':
+        return filter_live(ThreatAlert.objects.all(), **_alert_filters(params)).order_by(time_field, 'id')
+
+    queryset = spec['model'].objects.all()
+    start = parse_bound(get('start'))
+    end = parse_bound(get('end'), end=True)
+    if start:
+        queryset = queryset.filter(**{f'{time_field}__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{time_field}__lt': end})
+    if getlist('status'):
+        queryset = queryset.filter(status__in=getlist('status'))
+    query = (get('q') or '').strip()
+    if query:
+        queryset = queryset.filter(
+            Q(location__icontains=query) | Q(leader__icontains=query) | Q(description__icontains=query)
+        )
+    return queryset.order_by(time_field, 'id')
+
+
+def include_archive(dataset, params):
+    """``archive=1`` on an alerts export also streams the archived partitions (collect/archive.py)."""
+    return dataset == 'alerts' and (params.get('archive') or '') in ('1', 'true', 'on')
+
+
+def iter_rows(queryset, fields, chunk_size=CHUNK_SIZE):
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return '' if value is None else value
+
+
+def stream_csv(rows, fields, chunk_size=CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for chunk in _chunks(rows, chunk_size):
+        writer.writerows([[_plain(value) for value in row] for row in chunk])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def stream_ndjson(rows, fields, chunk_size=CHUNK_SIZE):
+    for chunk in _chunks(rows, chunk_size):
+        yield ''.join(
+            json.dumps(dict(zip(fields, row)), default=str, ensure_ascii=False) + '\n' for row in chunk
+        ).encode('utf-8')
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands everything written since the last drain() back as bytes."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _arrow_schema(model, fields):
+    types = {
+        'AutoField': pa.int64(), 'BigAutoField': pa.int64(), 'IntegerField': pa.int64(),
+        'DateTimeField': pa.timestamp('us', tz='UTC'),
+    }
+    return pa.schema([
+        (name, types.get(model._meta.get_field(name).get_internal_type(), pa.string()))
+        for name in fields
+    ])
+
+
+def stream_parquet(rows, fields, chunk_size=CHUNK_SIZE, model=None):
+    if pq is None:
+        raise ExportError('Parquet export needs the pyarrow package')
+    schema = _arrow_schema(model, fields)
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for chunk in _chunks(rows, chunk_size):
+            columns = list(zip(*chunk))
+            batch = pa.record_batch(
+                [
+                    pa.array([None if v is None else str(v) for v in column], type=field.type)
+                    if pa.types.is_string(field.type) else pa.array(column, type=field.type)
+                    for field, column in zip(schema, columns)
+                ],
+                schema=schema,
+            )
+            writer.write_batch(batch, row_group_size=chunk_size)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_stream(dataset, fmt, params, chunk_size=CHUNK_SIZE):
+    """Validate the request and return ``(bytes iterator, content type, file extension)``."""
+    if fmt not in FORMATS:
+        raise ExportError(f'Unknown format: {fmt!r}')
+    if fmt == 'parquet' and not parquet_available():
+        raise ExportError('Parquet export needs the pyarrow package')
+    queryset = filter_rows(dataset, params)
+    spec = DATASETS[dataset]
+    rows = iter_rows(queryset, spec['fields'], chunk_size)
+    if include_archive(dataset, params):
+        # Both sides are (timestamp, id) ordered; fields start with id, timestamp
+        archived = archived_rows(spec['fields'], chunk_size, **_alert_filters(params))
+        rows = heapq.merge(rows, archived, key=lambda row: (row[1], row[0]))
+    if fmt == 'csv':
+        stream = stream_csv(rows, spec['fields'], chunk_size)
+    elif fmt == 'ndjson':
+        stream = stream_ndjson(rows, spec['fields'], chunk_size)
+    else:
+        stream = stream_parquet(rows, spec['fields'], chunk_size, model=spec['model'])
+    content_type, extension = FORMATS[fmt]
+    return stream, content_type, extension
@@ -0,0 +1,324 @@
+# collect/feeds.py
+"""
+Asynchronous RSS / Atom / JSON Feed collector for NewsSource.feed_url.
+
+``FeedPoller`` fetches every due source concurrently (bounded globally and per
+host), sends ``If-None-Match`` / ``If-Modified-Since`` from the stored
+NewsSourceFeedState, skips items older than the per-source cursor and hands new
+items to a single writer task that inserts them in batches through
+``collect.ingest.ingest_alerts``. Failing sources back off exponentially.
+
+A source's cursor and validators are saved only after the writer confirms
+its items are committed, so a failed write means they are fetched again
+next round. If the writer dies, the round stops: the remaining producers
+are cancelled instead of blocking on the full queue, and the error is
+raised.
+
+HTTP is done with ``urllib`` in worker threads so the poller needs nothing
+beyond the standard library; asyncio only schedules and limits the work.
+"""
+import asyncio
+import json
+import logging
+import random
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from email.utils import parsedate_to_datetime
+from html import unescape
+from urllib.parse import urljoin, urlsplit
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .ingest import IngestReport, ingest_alerts
+from .models import NewsSource, NewsSourceFeedState
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'CyberPulse-FeedPoller/1.0'
+MAX_FEED_BYTES = 5 * 1024 * 1024
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+CONTENT = '{http://purl.org/rss/1.0/modules/content/}'
+
+
+@dataclass
+class FetchResult:
+    status: int
+    body: bytes = b''
+    etag: str = ''
+    last_modified: str = ''
+    content_type: str = ''
+
+
+@dataclass
+class FeedItem:
+    title: str
+    url: str
+    content: str
+    published: datetime = None
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+def _clean(text):
+    return ' '.join(unescape(strip_tags(text or '')).split())
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)  # RFC 822 (RSS)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))  # RFC 3339 (Atom, JSON Feed)
+        except ValueError:
+            return None
+    if timezone.is_naive(parsed):
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed
+
+
+def _text(element, *paths):
+    for path in paths:
+        found = element.find(path)
+        if found is not None and (found.text or '').strip():
+            return found.text
+    return ''
+
+
+def parse_feed(body, base_url=''):
+    """Return FeedItems from an RSS 2.0, Atom or JSON Feed document."""
+    stripped = body.lstrip()
+    if stripped[:1] in (b'{', '{'):
+        return _parse_json_feed(json.loads(body), base_url)
+
+    root = ET.fromstring(body)
+    items = []
+    if root.tag == f'{ATOM}feed':
+        for entry in root.iter(f'{ATOM}entry'):
+            link = ''
+            for candidate in entry.findall(f'{ATOM}link'):
+                if candidate.get('rel', 'alternate') == 'alternate':
+                    link = candidate.get('href', '')
+                    break
+            items.append(FeedItem(
+                title=_clean(_text(entry, f'{ATOM}title')),
+                url=urljoin(base_url, link),
+                content=_clean(_text(entry, f'{ATOM}content', f'{ATOM}summary')),
+                published=_parse_date(_text(entry, f'{ATOM}published', f'{ATOM}updated')),
+            ))
+    else:
+        for entry in root.iter('item'):
+            link = _text(entry, 'link') or _text(entry, 'guid')
+            items.append(FeedItem(
+                title=_clean(_text(entry, 'title')),
+                url=urljoin(base_url, link.strip()),
+                content=_clean(_text(entry, f'{CONTENT}encoded', 'description')),
+                published=_parse_date(_text(entry, 'pubDate', '{http://purl.org/dc/elements/1.1/}date')),
+            ))
+    return items
+
+
+def _parse_json_feed(document, base_url):
+    items = []
+    for entry in document.get('items', []):
+        items.append(FeedItem(
+            title=_clean(entry.get('title', '')),
+            url=urljoin(base_url, entry.get('url') or entry.get('external_url') or entry.get('id', '')),
+            content=_clean(entry.get('content_text') or entry.get('content_html') or entry.get('summary', '')),
+            published=_parse_date(entry.get('date_published') or entry.get('date_modified')),
+        ))
+    return items
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+def fetch(url, etag='', last_modified='', timeout=15):
+    """Blocking conditional GET; 304 is returned as a result, other HTTP errors raise."""
+    request = urllib.request.Request(url, headers={
+        'User-Agent': USER_AGENT,
+        'Accept': 'application/rss+xml, application/atom+xml, application/feed+json, '
+                  'application/json, application/xml;q=0.9, */*;q=0.5',
+    })
+    if etag:
+        request.add_header('If-None-Match', etag)
+    if last_modified:
+        request.add_header('If-Modified-Since', last_modified)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read(MAX_FEED_BYTES + 1)
+            if len(body) > MAX_FEED_BYTES:
+                raise ValueError(f'feed larger than {MAX_FEED_BYTES} bytes')
+            return FetchResult(
+                status=response.status,
+                body=body,
+                etag=response.headers.get('ETag', ''),
+                last_modified=response.headers.get('Last-Modified', ''),
+                content_type=response.headers.get('Content-Type', ''),
+            )
+    except urllib.error.HTTPError as error:
+        if error.code == 304:
+            return FetchResult(status=304, etag=etag, last_modified=last_modified)
+        raise
+
+
+# ---------------------------------------------------------------------------
+# Poller
+# ---------------------------------------------------------------------------
+
+class FeedPoller:
+    """
+    One polling round over every due source with ``await poller.run_once()``,
+    or ``await poller.run_forever()`` for the long-running collector.
+    """
+
+    def __init__(self, concurrency=20, per_host=2, interval=300, timeout=15,
+                 batch_size=200, base_backoff=60, max_backoff=6 * 3600, fetcher=fetch):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.interval = interval
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.fetcher = fetcher
+        self.report = IngestReport(keep_rows=False)
+
+    def backoff(self, failures):
+        """Exponential backoff with jitter, capped at ``max_backoff`` seconds."""
+        delay = min(self.base_backoff * 2 ** (failures - 1), self.max_backoff)
+        return delay * random.uniform(0.8, 1.2)
+
+    # -- database helpers (run in a thread via sync_to_async) ---------------
+
+    def _due_sources(self):
+        now = timezone.now()
+        sources = list(NewsSource.objects.exclude(feed_url='').order_by('id'))
+        states = {
+            state.source_id: state
+            for state in NewsSourceFeedState.objects.filter(source__in=sources)
+        }
+        due = []
+        for source in sources:
+            state = states.get(source.id) or NewsSourceFeedState(source=source)
+            if state.next_poll_at is None or state.next_poll_at <= now:
+                due.append((source, state))
+        return due
+
+    def _save_state(self, state):
+        state.last_polled_at = timezone.now()
+        state.save()
+
+    def _write(self, records):
+        ingest_alerts(records, batch_size=self.batch_size, report=self.report, update_existing=False)
+
+    # -- async pipeline -----------------------------------------------------
+
+    async def _writer(self, queue):
+        """
+        Single consumer: drain the queue into batched inserts. A future in the
+        queue is resolved once every record queued before it is committed.
+        """
+        batch, acks = [], []
+        while True:
+            record = await queue.get()
+            if isinstance(record, asyncio.Future):
+                acks.append(record)
+            elif record is not None:
+                batch.append(record)
+            if (batch or acks) and (record is None or len(batch) >= self.batch_size or queue.empty()):
+                if batch:
+                    await sync_to_async(self._write)(batch)
+                for ack in acks:
+                    if not ack.done():
+                        ack.set_result(None)
+                batch, acks = [], []
+            queue.task_done()
+            if record is None:
+                return
+
+    async def _poll_source(self, source, state, queue, limit, host_limits):
+        host = urlsplit(source.feed_url).hostname or ''
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with limit, host_limit:
+            try:
+                result = await asyncio.to_thread(
+                    self.fetcher, source.feed_url, state.etag, state.last_modified, self.timeout,
+                )
+                items = [] if result.status == 304 else parse_feed(result.body, source.feed_url)
+            except Exception as error:  # network, HTTP and parse errors all back off
+                state.failures += 1
+                state.next_poll_at = timezone.now() + timedelta(seconds=self.backoff(state.failures))
+                state.last_status = f'error: {error}'[:255]
+                logger.warning("Feed %s failed (%s attempts): %s", source.feed_url, state.failures, error)
+                await sync_to_async(self._save_state)(state)
+                return 0
+
+        new_items = [
+            item for item in items
+            if item.url and (state.cursor is None or item.published is None or item.published > state.cursor)
+        ]
+        for item in new_items:
+            await queue.put({
+                'title': item.title or item.url,
+                'content': item.content or item.title or item.url,
+                'url': item.url,
+                'source': source.name,
+                'severity': 'low',
+                'category': 'Other',
+            })
+        if new_items:
+            committed = asyncio.get_running_loop().create_future()
+            await queue.put(committed)
+            await committed  # the state must not move past items that were never stored
+
+        dated = [item.published for item in new_items if item.published]
+        if dated:
+            state.cursor = max(dated + ([state.cursor] if state.cursor else []))
+        if result.status != 304:
+            state.etag = result.etag or ''
+            state.last_modified = result.last_modified or ''
+        state.failures = 0
+        state.next_poll_at = timezone.now() + timedelta(seconds=self.interval)
+        state.last_status = 'not modified' if result.status == 304 else f'{len(new_items)} new item(s)'
+        await sync_to_async(self._save_state)(state)
+        return len(new_items)
+
+    async def run_once(self):
+        """Poll every due source once; returns the number of new items queued."""
+        due = await sync_to_async(self._due_sources)()
+        queue = asyncio.Queue(maxsize=self.batch_size * 4)
+        writer = asyncio.create_task(self._writer(queue))
+        limit = asyncio.Semaphore(self.concurrency)
+        host_limits = {}
+        polls = asyncio.gather(*(
+            self._poll_source(source, state, queue, limit, host_limits) for source, state in due
+        ))
+        try:
+            await asyncio.wait([writer, polls], return_when=asyncio.FIRST_COMPLETED)
+            if writer.done():  # it only stops early when a write failed
+                polls.cancel()
+                await asyncio.gather(polls, return_exceptions=True)
+                await writer
+            counts = await polls
+        finally:
+            if not writer.done():
+                await queue.put(None)
+                await writer
+        return sum(counts)
+
+    async def run_forever(self, tick=30):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(tick)
@@ -0,0 +1,341 @@
+# collect/fuzzy.py
+"""
+Typo-tolerant lookup for NewsSource (name, url) and CurrentInformation
+(leader, location, vehicle), where the same person or place is spelt many
+ways ("Kathmandu" / "Kathmandau", "Prachanda" / "Prachand").
+
+Field values are split into normalised words (lower case, diacritics removed,
+Devanagari kept as is). Each distinct word is a ``FuzzyTerm`` with its
+trigrams (padded like pg_trgm: "  k", " ka", "kat", ..., "du ") in
+``FuzzyTrigram``, and ``FuzzyPosting`` maps terms to records with the weight
+of the field they came from. The vocabulary is far smaller than the number
+of records, so matching a query word means scoring a few hundred terms.
+
+``fuzzy_search()`` first compares every query word with the terms sharing its
+trigrams (similarity = shared / union of trigrams, at least ``THRESHOLD``),
+then scores records by their best weighted match per word. Postings are
+read best-first through a covering index, so the cost follows ``MAX_RESULTS``
+and ``SCAN_LIMIT`` rather than the number of records. Postings follow writes
+through model signals; ``manage.py rebuild_fuzzy_index`` rebuilds them after
+bulk loads.
+"""
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import connection, connections, router, transaction
+from django.db.models import Case, FloatField, Value, When
+
+from .models import CurrentInformation, FuzzyPosting, FuzzyTerm, FuzzyTrigram, NewsSource
+
+# Indexed fields and how much a match in each counts
+FUZZY_FIELDS = {
+    NewsSource: {'name': 2.0, 'url': 0.5},
+    CurrentInformation: {'leader': 2.0, 'location': 1.5, 'vehicle': 1.0},
+}
+THRESHOLD = 0.3
+MAX_RESULTS = 200
+MAX_QUERY_WORDS = 6
+SCAN_LIMIT = 1000  # postings read for the rarest word of a multi-word query
+# (term, weight) levels read per query, shared by its words. Each level is one UNION ALL
+# branch and SQLite refuses compound SELECTs of more than 500 terms; a short common
+# prefix ("ram") can match hundreds of terms
+MAX_LEVELS = 240
+
+# URL noise that would otherwise match every source
+STOP_WORDS = {'http', 'https', 'www', 'com', 'org', 'net', 'np'}
+
+# Devanagari vowel signs and viramas are not \w; keep them inside words (but not the dandas)
+_WORD_RE = re.compile(r'[\w\u0900-\u0963\u0966-\u097f]+', re.UNICODE)
+_TERM_LENGTH = FuzzyTerm._meta.get_field('term').max_length
+
+_T_TERM = FuzzyTerm._meta.db_table
+_T_GRAM = FuzzyTrigram._meta.db_table
+_T_POST = FuzzyPosting._meta.db_table
+
+
+def kind_of(model):
+    return model._meta.model_name
+
+
+def normalize(text):
+    """Lower case with accents removed from Latin letters; other scripts are kept as written."""
+    folded = []
+    for char in unicodedata.normalize('NFC', (text or '').lower()):
+        base = ''.join(c for c in unicodedata.normalize('NFKD', char) if not unicodedata.combining(c))
+        folded.append(base if base.isascii() else char)
+    return ''.join(folded)
+
+
+def words(text):
+    return [
+        word[:_TERM_LENGTH] for word in _WORD_RE.findall(normalize(text))
+        if word not in STOP_WORDS and not word.isdigit()
+    ]
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def record_terms(obj):
+    """{term: weight} of one record (a word in several fields keeps the highest weight)."""
+    terms = {}
+    for field, weight in FUZZY_FIELDS[type(obj)].items():
+        for word in words(getattr(obj, field)):
+            terms[word] = max(terms.get(word, 0), weight)
+    return terms
+
+
+def _term_ids(terms):
+    """{term: id}, creating missing terms and their trigrams."""
+    ids = dict(FuzzyTerm.objects.filter(term__in=terms).values_list('term', 'id'))
+    missing = [term for term in terms if term not in ids]
+    if missing:
+        FuzzyTerm.objects.bulk_create(
+            [FuzzyTerm(term=term, grams=len(trigrams(term))) for term in missing], ignore_conflicts=True,
+        )
+        created = dict(FuzzyTerm.objects.filter(term__in=missing).values_list('term', 'id'))
+        # A concurrent writer may have created (and indexed) some of these already
+        fresh = set(created.values()) - set(
+            FuzzyTrigram.objects.filter(term_id__in=created.values()).values_list('term_id', flat=True).distinct()
+        )
+        FuzzyTrigram.objects.bulk_create([
+            FuzzyTrigram(trigram=gram, term_id=created[term])
+            for term in missing if created.get(term) in fresh
+            for gram in trigrams(term)
+        ])
+        ids.update(created)
+    return ids
+
+
+def index_records(objects, refresh=True, replace=True):
+    """
+    (Re)write the postings of ``objects`` (all of one model); ``replace=False``
+    skips dropping old postings when there can't be any (new records, full rebuild).
+    """
+    objects = list(objects)
+    if not objects:
+        return
+    kind = kind_of(type(objects[0]))
+    per_object = {obj.pk: record_terms(obj) for obj in objects}
+    with transaction.atomic():  # one write transaction for new terms, trigrams and postings
+        ids = _term_ids({term for terms in per_object.values() for term in terms})
+        touched = set(ids.values())
+        if replace:
+            stale = FuzzyPosting.objects.filter(kind=kind, object_id__in=list(per_object))
+            touched |= set(stale.values_list('term_id', flat=True))
+            stale.delete()
+        FuzzyPosting.objects.bulk_create([
+            FuzzyPosting(term_id=ids[term], kind=kind, object_id=pk, weight=weight)
+            for pk, terms in per_object.items()
+            for term, weight in terms.items()
+        ], batch_size=2000)
+        if refresh:
+            refresh_frequencies(touched)
+
+
+def unindex_record(model, pk):
+    postings = FuzzyPosting.objects.filter(kind=kind_of(model), object_id=pk)
+    with transaction.atomic():
+        touched = set(postings.values_list('term_id', flat=True))
+        postings.delete()
+        refresh_frequencies(touched)
+
+
+def refresh_frequencies(term_ids=None):
+    """Recount ``FuzzyTerm.frequency`` (for ``term_ids``, or every term) from the postings."""
+    if term_ids is not None and not term_ids:
+        return
+    where = ''
+    params = []
+    if term_ids is not None:
+        where = f" WHERE id IN ({', '.join(['%s'] * len(term_ids))})"
+        params = list(term_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {_T_TERM} SET frequency = (SELECT COUNT(*) FROM {_T_POST} p WHERE p.term_id = {_T_TERM}.id)'
+            + where,
+            params,
+        )
+
+
+def rebuild_fuzzy_index(batch_size=2000, models=None):
+    """Drop every posting (and unused term) and re-index all records. Returns records indexed."""
+    total = 0
+    with transaction.atomic():
+        FuzzyPosting.objects.all().delete()
+        for model in models or FUZZY_FIELDS:
+            queryset = model.objects.order_by('pk').only('pk', *FUZZY_FIELDS[model])
+            last = 0
+            while True:
+                batch = list(queryset.filter(pk__gt=last)[:batch_size])
+                if not batch:
+                    break
+                index_records(batch, refresh=False, replace=False)
+                last = batch[-1].pk
+                total += len(batch)
+        FuzzyTerm.objects.filter(postings__isnull=True).delete()
+        refresh_frequencies()
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Lookup
+# ---------------------------------------------------------------------------
+
+def similar_terms(query_words, threshold=THRESHOLD):
+    """
+    [(word index, term id, similarity, frequency)] for every indexed term that
+    shares enough trigrams with a query word — one query over the small
+    vocabulary tables.
+    """
+    rows, params = [], []
+    for index, word in enumerate(query_words):
+        grams = trigrams(word)
+        for gram in grams:
+            rows.append('(%s, %s, %s)')
+            params += [index, gram, len(grams)]
+    sql = f"""
+        WITH q(word, trigram, grams) AS (VALUES {', '.join(rows)}),
+        shared AS (
+            SELECT q.word, g.term_id, q.grams, COUNT(*) AS n
+            FROM q JOIN {_T_GRAM} g ON g.trigram = q.trigram
+            GROUP BY q.word, g.term_id
+        )
+        SELECT s.word, s.term_id, s.n * 1.0 / (s.grams + t.grams - s.n) AS similarity, t.frequency
+        FROM shared s JOIN {_T_TERM} t ON t.id = s.term_id
+        WHERE s.n * 1.0 / (s.grams + t.grams - s.n) >= %s
+    """
+    with _reader().cursor() as cursor:
+        cursor.execute(sql, params + [threshold])
+        return cursor.fetchall()
+
+
+def _top_postings(kind, levels, limit, total=None):
+    """
+    SQL + params for one UNION ALL over score levels — (term, field weight)
+    pairs, best first — each reading at most ``limit`` postings, newest first,
+    from the (term, kind, weight, object_id) index; ``total`` stops the whole
+    scan early. Rows are (level index, object id).
+    """
+    branch = (
+        f'SELECT * FROM (SELECT %s AS level, object_id FROM {_T_POST} '
+        f'WHERE term_id = %s AND kind = %s AND weight = %s ORDER BY object_id DESC LIMIT %s)'
+    )
+    params = []
+    for index, (score, term_id, weight, word) in enumerate(levels):
+        params += [index, term_id, kind, weight, limit]
+    sql = ' UNION ALL '.join([branch] * len(levels))
+    if total:
+        sql += ' LIMIT %s'
+        params.append(total)
+    return sql, params
+
+
+def _reader():
+    """Connection for lookups: the read alias when a router provides one (see collect/routers.py)."""
+    return connections[router.db_for_read(FuzzyPosting)]
+
+
+def _fetch(sql, params):
+    with _reader().cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def rank(model, query, threshold=THRESHOLD, limit=MAX_RESULTS):
+    """
+    [(object id, score)] best first, at most ``limit``. A record scores the mean
+    over query words of its best term similarity × field weight, so records
+    matching every word come first. Newer records win ties.
+
+    Work is bounded by ``limit`` and ``SCAN_LIMIT`` rather than by table size:
+    single words read only the best postings per (term, weight) level; for
+    several words the rarest one (by term frequency) drives the candidates,
+    which are then scored exactly against all words.
+    """
+    query_words = list(dict.fromkeys(words(query)))[:MAX_QUERY_WORDS]
+    if not query_words:
+        return []
+    matches = similar_terms(query_words, threshold)
+    if not matches:
+        return []
+    kind = kind_of(model)
+    weights = sorted(set(FUZZY_FIELDS[model].values()), reverse=True)
+    levels = sorted(
+        ((similarity * weight, term_id, weight, word) for word, term_id, similarity, frequency in matches
+         for weight in weights),
+        key=lambda level: (-level[0], level[1], -level[2]),
+    )
+    # Keep the best levels of each word (see MAX_LEVELS); the weaker ones only add
+    # results when the stronger ones hold fewer than ``limit`` records between them
+    per_word, counts, trimmed = MAX_LEVELS // len(query_words), Counter(), []
+    for level in levels:
+        if counts[level[3]] < per_word:
+            counts[level[3]] += 1
+            trimmed.append(level)
+    levels = trimmed
+
+    if len(query_words) == 1:
+        best = {}
+        for index, object_id in _fetch(*_top_postings(kind, levels, limit)):
+            score = levels[index][0]
+            if score > best.get(object_id, 0):
+                best[object_id] = score
+        ranked = sorted(best.items(), key=lambda item: (-item[1], -item[0]))[:limit]
+        return [(object_id, round(score, 4)) for object_id, score in ranked]
+
+    # Candidates: every record of the rarest word (up to SCAN_LIMIT) plus the best of each other
+    # word, scored exactly against all matched terms in the same statement
+    cost = {}
+    for word, term_id, similarity, frequency in matches:
+        cost[word] = cost.get(word, 0) + frequency
+    driver = min(cost, key=cost.get)
+    driver_sql, params = _top_postings(kind, [level for level in levels if level[3] == driver], SCAN_LIMIT, SCAN_LIMIT)
+    candidates = f'SELECT object_id FROM ({driver_sql})'
+    other_levels = [level for level in levels if level[3] != driver]
+    if other_levels:
+        other_sql, other_params = _top_postings(kind, other_levels, limit, limit)
+        candidates += f' UNION SELECT object_id FROM ({other_sql})'
+        params += other_params
+    term_scores = {}
+    for word, term_id, similarity, frequency in matches:
+        term_scores.setdefault(term_id, []).append((word, similarity))
+    # Unary + keeps the planner on the covering (kind, object_id, ...) index: a few postings per
+    # candidate instead of every posting of a common term
+    rows = _fetch(
+        f'WITH candidate(object_id) AS ({candidates}) '
+        f'SELECT p.object_id, p.term_id, p.weight FROM candidate c '
+        f'JOIN {_T_POST} p ON p.kind = %s AND p.object_id = c.object_id '
+        f"WHERE +p.term_id IN ({', '.join(['%s'] * len(term_scores))})",
+        params + [kind, *term_scores],
+    )
+    scores = {}
+    for object_id, term_id, weight in rows:
+        per_word = scores.setdefault(object_id, {})
+        for word, similarity in term_scores[term_id]:
+            per_word[word] = max(per_word.get(word, 0), similarity * weight)
+    ranked = sorted(
+        ((object_id, sum(per_word.values()) / len(query_words)) for object_id, per_word in scores.items()),
+        key=lambda item: (-item[1], -item[0]),
+    )[:limit]
+    return [(object_id, round(score, 4)) for object_id, score in ranked]
+
+
+def ranked_queryset(queryset, ranked):
+    """``queryset`` limited to ``ranked`` ids, annotated with ``search_rank`` and ordered by it, then by id."""
+    if not ranked:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return queryset.filter(pk__in=[pk for pk, score in ranked]).annotate(
+        search_rank=Case(
+            *[When(pk=pk, then=Value(score)) for pk, score in ranked],
+            default=Value(0.0), output_field=FloatField(),
+        )
+    ).order_by('-search_rank', 'id')
+
+
+def fuzzy_search(queryset, query, **options):
+    """``queryset`` narrowed to the best fuzzy matches for ``query``, best first (see ``rank``)."""
+    return ranked_queryset(queryset, rank(queryset.model, query, **options))
@@ -0,0 +1,213 @@
+# collect/ingest.py
+"""
+Bulk ingestion of ThreatAlert records from collectors.
+
+Records are validated and normalized the same way ``newsfeeding`` treats the
+form, de-duplicated by ``url`` within each batch, and written with one
+``INSERT ... ON CONFLICT(url) DO UPDATE`` per batch. ``bulk_create`` skips model
+signals, so the daily rollup, near-duplicate clusters and classifier scores
+are maintained here; the FTS index follows through its SQL triggers.
+"""
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+
+from .cache import bump_on_commit
+from .classify import score_alerts
+from .dedup import index_batch, prepare_batch
+from .live import alert_payload, publish, publish_counts
+from .models import ThreatAlert
+from .rollup import apply_delta, rollup_key
+
+VALID_CATEGORIES = {value for value, label in ThreatAlert.CATEGORY_CHOICES}
+VALID_SEVERITIES = {value for value, label in ThreatAlert.SEVERITY_CHOICES}
+# updated_at versions the cached row fragments; auto_now fills it for every record of the INSERT
+UPDATE_FIELDS = ['title', 'content', 'category', 'source', 'severity', 'minhash', 'updated_at']
+PREDICTION_FIELDS = ['predicted_category', 'category_confidence', 'predicted_severity']
+
+_validate_url = URLValidator()
+
+
+def normalize_alert(data):
+    """
+    Clean one incoming record. Returns ``(fields, errors)``; ``fields`` is None
+    when the record cannot be stored.
+    """
+    if not isinstance(data, dict):
+        return None, ['Record must be a JSON object']
+
+    def text(key, default=''):
+        value = data.get(key, default)
+        return default if value is None else str(value).strip()
+
+    title = text('title')
+    content = text('content') or text('description')
+    url = text('url')
+    errors = []
+
+    if not title or not content:
+        errors.append('Title and Description are required.')
+    if not url:
+        errors.append('URL is required for bulk ingestion.')
+    else:
+        try:
+            _validate_url(url)
+        except ValidationError:
+            errors.append(f'Invalid URL: {url[:200]}')
+    if errors:
+        return None, errors
+
+    severity = text('severity', 'medium').lower()
+    category = text('category', 'Other')
+    return {
+        'title': title[:ThreatAlert._meta.get_field('title').max_length],
+        'content': content,
+        'url': url,
+        'source': (text('source', 'unknown') or 'unknown')[:ThreatAlert._meta.get_field('source').max_length],
+        'severity': severity if severity in VALID_SEVERITIES else 'medium',
+        'category': category if category in VALID_CATEGORIES else 'Other',
+    }, []
+
+
+class IngestReport:
+    """Per-row outcome plus running totals for one ingestion run."""
+
+    def __init__(self, keep_rows=True):
+        self.keep_rows = keep_rows
+        self.rows = []
+        self.counts = {'created': 0, 'updated': 0, 'duplicate': 0, 'error': 0}
+
+    def add(self, row, status, url=None, alert_id=None, errors=None):
+        self.counts[status] += 1
+        if self.keep_rows or status == 'error':
+            result = {'row': row, 'status': status}
+            if url:
+                result['url'] = url
+            if alert_id is not None:
+                result['id'] = alert_id
+            if errors:
+                result['errors'] = errors
+            self.rows.append(result)
+
+    def as_dict(self):
+        return {**self.counts, 'results': self.rows}
+
+
+def _write_batch(batch, report, update_existing=True):
+    """
+    ``batch`` maps url -> (row number, fields); later rows already replaced earlier
+    ones. With ``update_existing=False`` rows whose url is already stored are left
+    untouched and reported as duplicates.
+    """
+    urls = list(batch)
+    with transaction.atomic():
+        existing = {
+            alert.url: alert
+            for alert in ThreatAlert.objects.filter(url__in=urls).only(
+                'url', 'timestamp', 'category', 'severity', 'source', 'cluster_id', 'is_duplicate'
+            )
+        }
+        if update_existing:
+            alerts = prepare_batch([ThreatAlert(**fields) for row, fields in batch.values()], existing)
+            scored = score_alerts(alerts)  # one matrix product for the whole batch
+            ThreatAlert.objects.bulk_create(
+                alerts,
+                update_conflicts=True,
+                unique_fields=['url'],
+                update_fields=UPDATE_FIELDS + PREDICTION_FIELDS if scored else UPDATE_FIELDS,
+            )
+        else:
+            for url in existing:
+                report.add(batch[url][0], 'duplicate', url=url)
+            alerts = prepare_batch([ThreatAlert(**fields) for url, (row, fields) in batch.items() if url not in existing])
+            score_alerts(alerts)
+            ThreatAlert.objects.bulk_create(alerts, ignore_conflicts=True)
+            existing = {}
+        index_batch(alerts)
+
+        deltas = {}
+        for alert in alerts:
+            old = existing.get(alert.url)
+            if old is not None:
+                alert.timestamp = old.timestamp  # conflict updates keep the original timestamp
+                deltas[rollup_key(old)] = deltas.get(rollup_key(old), 0) - 1
+            deltas[rollup_key(alert)] = deltas.get(rollup_key(alert), 0) + 1
+        severities = {}
+        for key, delta in deltas.items():
+            if delta:
+                apply_delta(key, delta)
+                severities[key[2]] = severities.get(key[2], 0) + delta
+        bump_on_commit(ThreatAlert)
+        created = [alert_payload(alert) for alert in alerts if alert.url not in existing and not alert.is_duplicate]
+        transaction.on_commit(lambda: _push_batch(created, severities))
+
+    for alert in alerts:
+        row, fields = batch[alert.url]
+        status = 'updated' if alert.url in existing else 'created'
+        alert_id = alert.pk if alert.pk is not None else getattr(existing.get(alert.url), 'pk', None)
+        report.add(row, status, url=alert.url, alert_id=alert_id)
+    return alerts
+
+
+def _push_batch(created, severities):
+    for payload in created:
+        publish('alert', payload)
+    publish_counts(severities)
+
+
+def ingest_alerts(records, batch_size=500, report=None, on_batch=None, update_existing=True):
+    """
+    Validate and upsert an iterable of dicts. Works on any iterable, including
+    generators over an NDJSON stream, so memory stays bounded by ``batch_size``.
+    ``on_batch`` (optional) is called with the saved alerts after every batch.
+    Pass ``update_existing=False`` to only insert urls that are not stored yet.
+    """
+    report = report or IngestReport()
+    batch = {}
+    for row, data in enumerate(records, start=1):
+        if isinstance(data, Exception):
+            report.add(row, 'error', errors=[str(data)])
+            continue
+        fields, errors = normalize_alert(data)
+        if errors:
+            report.add(row, 'error', url=data.get('url') if isinstance(data, dict) else None, errors=errors)
+            continue
+        if fields['url'] in batch:
+            report.add(batch[fields['url']][0], 'duplicate', url=fields['url'])
+        batch[fields['url']] = (row, fields)
+        if len(batch) >= batch_size:
+            saved = _write_batch(batch, report, update_existing)
+            if on_batch:
+                on_batch(saved)
+            batch = {}
+    if batch:
+        saved = _write_batch(batch, report, update_existing)
+        if on_batch:
+            on_batch(saved)
+    return report
+
+
+def iter_ndjson(lines):
+    """Yield one dict per non-blank line; malformed lines become ValueError items."""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield ValueError(f'Invalid JSON: {exc}')
+
+
+def load_json_records(payload):
+    """Accept ``[...]`` or ``{"alerts": [...]}``."""
+    data = json.loads(payload)
+    if isinstance(data, dict):
+        data = data.get('alerts', [data])
+    if not isinstance(data, list):
+        raise ValueError('Expected a list of alerts')
+    return data
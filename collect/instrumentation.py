@@ -0,0 +1,214 @@
+# collect/instrumentation.py
+"""
+Per-request cost accounting: SQL query count and time, template render time,
+response size and total time.
+
+``RequestMetricsMiddleware`` measures every request, reports it in a
+``Server-Timing`` header (visible in the browser's network panel) and keeps a
+rolling window per view for ``/_stats/requests/``. A view that runs more
+queries than declared with ``@query_budget(n)`` raises ``QueryBudgetExceeded``
+when ``QUERY_BUDGET_STRICT`` is set (DEBUG and the test runner) and logs a
+warning otherwise. ``QueryBudgetAssertions`` checks a page against its budget.
+
+Template time comes from ``TimedDjangoTemplates``, the template backend named
+in ``TEMPLATES``: only its own templates are timed, and only inside a request.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.template.backends.django import DjangoTemplates, Template as BackendTemplate
+
+logger = logging.getLogger(__name__)
+
+WINDOW = 500  # requests kept per view for the percentiles
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_stats = defaultdict(lambda: deque(maxlen=WINDOW))
+_stats_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(queries):
+    """Declare the most SQL queries a view may run per request (session/auth lookups included)."""
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.total_time = 0.0
+        self.size = None
+        self.view = ''
+        self.budget = None
+        self._render_depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.queries > self.budget
+
+    def server_timing(self):
+        timings = [
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ]
+        return ', '.join(timings)
+
+    def as_dict(self):
+        return {
+            'view': self.view,
+            'queries': self.queries,
+            'budget': self.budget,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+            'bytes': self.size,
+        }
+
+
+class TimedTemplate(BackendTemplate):
+    """Adds its render time to the metrics of the request being handled, if any."""
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        metrics._render_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics._render_depth -= 1
+            if not metrics._render_depth:  # render_to_string inside a template tag is already counted
+                metrics.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """``DjangoTemplates`` whose templates are ``TimedTemplate``; set it as the ``BACKEND`` in ``TEMPLATES``."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class RequestMetricsMiddleware:
+    """Place first in MIDDLEWARE so session/auth queries are counted too."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.record_query))
+                request.metrics = metrics
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        metrics.total_time = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            metrics.view = match.view_name
+            metrics.budget = getattr(match.func, 'query_budget', None)
+        if not response.streaming:
+            metrics.size = len(response.content)
+        response.metrics = metrics
+        response['Server-Timing'] = metrics.server_timing()
+
+        if metrics.view:
+            with _stats_lock:
+                _stats[metrics.view].append(metrics.as_dict())
+        if metrics.over_budget:
+            message = f'{metrics.view} ran {metrics.queries} queries (budget {metrics.budget})'
+            if getattr(settings, 'QUERY_BUDGET_STRICT', settings.DEBUG):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize():
+    with _stats_lock:
+        snapshot = {view: list(samples) for view, samples in _stats.items()}
+    summary = {}
+    for view, samples in sorted(snapshot.items()):
+        totals = [s['total_ms'] for s in samples]
+        queries = [s['queries'] for s in samples]
+        sizes = [s['bytes'] for s in samples if s['bytes'] is not None]
+        summary[view] = {
+            'requests': len(samples),
+            'p50_ms': _percentile(totals, 50),
+            'p95_ms': _percentile(totals, 95),
+            'queries_avg': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+            'budget': samples[-1]['budget'],
+            'sql_ms_avg': round(sum(s['sql_ms'] for s in samples) / len(samples), 2),
+            'template_ms_avg': round(sum(s['template_ms'] for s in samples) / len(samples), 2),
+            'bytes_avg': round(sum(sizes) / len(sizes)) if sizes else None,
+        }
+    return summary
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def request_stats(request):
+    """JSON summary of recent requests per view; DEBUG, INTERNAL_IPS or staff only."""
+    local = request.META.get('REMOTE_ADDR') in getattr(settings, 'INTERNAL_IPS', ())
+    if not (settings.DEBUG or local or request.user.is_staff):
+        return JsonResponse({'error': 'Not available'}, status=404)
+    return JsonResponse({'window': WINDOW, 'views': summarize()})
+
+
+class QueryBudgetAssertions:
+    """TestCase mixin: ``self.assertWithinQueryBudget('/dashboard/')``; ``data`` makes it a POST."""
+
+    def assertWithinQueryBudget(self, url, data=None, **extra):
+        response = self.client.get(url, **extra) if data is None else self.client.post(url, data, **extra)
+        metrics = getattr(response, 'metrics', None)
+        if metrics is None:
+            self.fail('RequestMetricsMiddleware is not installed')
+        if metrics.budget is None:
+            self.fail(f'{metrics.view or url} has no @query_budget')
+        self.assertLessEqual(
+            metrics.queries, metrics.budget,
+            f'{url} ({metrics.view}) ran {metrics.queries} queries, budget is {metrics.budget}',
+        )
+        return response
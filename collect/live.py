@@ -0,0 +1,206 @@
+# collect/live.py
+"""
+In-process publish/subscribe for the live alert channel (``/live/events/``).
+
+Model signals publish small events after commit: ``alert`` and ``current``
+for new records, ``counts`` with severity deltas for the dashboard cards.
+Every event gets an increasing id and is kept in a ring buffer, so a client
+reconnecting with ``Last-Event-ID`` receives what it missed; if it fell out
+of the buffer it gets ``resync`` and reloads once.
+
+Subscribers are asyncio queues on the ASGI event loop; publishers may run in
+any thread. Events only reach clients served by the same process, so run
+one ASGI worker for the live channel (or put a shared broker behind
+``publish`` when scaling out).
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+BUFFER_SIZE = 1000
+QUEUE_SIZE = 500
+HEARTBEAT = 15  # seconds between keep-alive comments
+RETRY_MS = 5000  # reconnect delay suggested to EventSource
+
+
+class Event:
+    __slots__ = ('id', 'type', 'data')
+
+    def __init__(self, id, type, data):
+        self.id = id
+        self.type = type
+        self.data = data
+
+    def encode(self):
+        return f'id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n'.encode()
+
+
+class Subscription:
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Runs on the subscriber's loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Broker:
+
+    def __init__(self, buffer_size=BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._buffer = deque(maxlen=buffer_size)
+        self._subscribers = set()
+        # Ids continue from the clock, so ids from before a restart are recognisably stale
+        self.last_id = int(time.time() * 1000)
+
+    def publish(self, event_type, data):
+        with self._lock:
+            self.last_id += 1
+            event = Event(self.last_id, event_type, data)
+            self._buffer.append(event)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.deliver, event)
+            except RuntimeError:  # loop already closed
+                self._subscribers.discard(sub)
+        return event
+
+    def since(self, last_event_id):
+        """Buffered events after ``last_event_id``, or None if some were already dropped."""
+        with self._lock:
+            events = list(self._buffer)
+            last_id = self.last_id
+        if last_event_id > last_id:
+            return None
+        if last_event_id == last_id:
+            return []
+        if not events or events[0].id > last_event_id + 1:
+            return None
+        return [event for event in events if event.id > last_event_id]
+
+    def subscribe(self):
+        sub = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+broker = Broker()
+
+
+def publish(event_type, data):
+    return broker.publish(event_type, data)
+
+
+def resync_event():
+    return Event(broker.last_id, 'resync', {})
+
+
+def parse_last_event_id(request):
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or ''
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        return None
+
+
+async def event_stream(last_event_id, heartbeat=HEARTBEAT):
+    """Async SSE body: missed events first, then live ones, with keep-alive comments."""
+    sub = broker.subscribe()  # before reading the backlog, so nothing falls in between
+    sent = broker.last_id if last_event_id is None else last_event_id
+    try:
+        yield f'retry: {RETRY_MS}\n\n'.encode()
+        if last_event_id is not None:
+            backlog = broker.since(last_event_id)
+            if backlog is None:
+                yield resync_event().encode()
+                return
+            for event in backlog:
+                yield event.encode()
+                sent = event.id
+        while True:
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield b': keep-alive\n\n'
+                continue
+            if sub.overflowed:
+                yield resync_event().encode()
+                return
+            if event.id > sent:
+                yield event.encode()
+                sent = event.id
+    finally:
+        broker.unsubscribe(sub)
+
+
+def backlog_stream(last_event_id):
+    """
+    WSGI fallback: send what is buffered and close. EventSource reconnects after
+    ``retry`` with Last-Event-ID, which turns into cheap polling with no queries.
+    """
+    yield f'retry: {RETRY_MS}\n\n'.encode()
+    if last_event_id is None:
+        yield f': connected at {broker.last_id}\n\n'.encode()
+        yield Event(broker.last_id, 'hello', {}).encode()
+        return
+    backlog = broker.since(last_event_id)
+    if backlog is None:
+        yield resync_event().encode()
+        return
+    for event in backlog:
+        yield event.encode()
+
+
+# ---------------------------------------------------------------------------
+# Payloads
+# ---------------------------------------------------------------------------
+
+def alert_payload(alert):
+    return {
+        'id': alert.pk,
+        'title': alert.title,
+        'content': alert.content[:300],
+        'source': alert.source,
+        'url': alert.url,
+        'category': alert.category,
+        'severity': alert.severity,
+        'timestamp': alert.timestamp,
+        'has_video': bool(alert.video),
+    }
+
+
+def current_payload(info):
+    return {
+        'id': info.pk,
+        'timing': info.timing,
+        'location': info.location,
+        'leader': info.leader,
+        'status': info.status,
+        'created_at': info.created_at,
+    }
+
+
+def publish_counts(deltas):
+    """``deltas`` maps severity -> change; 'total' is derived."""
+    deltas = {severity: delta for severity, delta in deltas.items() if delta}
+    total = sum(deltas.values())
+    if deltas:
+        publish('counts', {'total': total, **deltas})
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from collect.archive import BATCH_SIZE, archive_alerts, archive_cutoff, archive_root, partition_stats
+from collect.export import ExportError, parse_bound
+
+
+class Command(BaseCommand):
+    help = "Move old ThreatAlert rows into compressed monthly archive files (searchable from /archive_news/)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=None,
+            help="Archive alerts older than this many days (default: settings.ARCHIVE_AFTER_DAYS)"
+        )
+        parser.add_argument('--before', help="Archive alerts before this date instead (YYYY-MM-DD)")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--list', action='store_true', help="Only list the existing partitions")
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for month, rows, size in partition_stats():
+                self.stdout.write(f"{month}  {rows:>8} alerts  {size / 1024:>10.1f} KiB")
+            return
+
+        try:
+            before = parse_bound(options['before']) if options['before'] else archive_cutoff(options['older_than'])
+        except ExportError as exc:
+            raise CommandError(str(exc))
+        start = time.perf_counter()
+        moved, raw, stored = archive_alerts(
+            before=before, batch_size=options['batch_size'],
+            on_batch=lambda done: self.stderr.write(f"{done} alerts archived"),
+        )
+        ratio = raw / stored if stored else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} alerts from before {before:%Y-%m-%d} into {archive_root()} "
+            f"in {time.perf_counter() - start:.1f}s (content {raw / 1024:.1f} KiB -> {stored / 1024:.1f} KiB, {ratio:.1f}x)."
+        ))
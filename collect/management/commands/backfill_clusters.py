@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from collect.dedup import backfill_clusters
+
+
+class Command(BaseCommand):
+    help = "Compute MinHash signatures for every ThreatAlert and group near-duplicates into clusters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Processes hashing chunks in parallel (default: one per CPU, 0: no worker processes)"
+        )
+
+    def handle(self, *args, **options):
+        def progress(done, duplicates):
+            self.stderr.write(f"{done} alerts, {duplicates} near-duplicates")
+
+        total, duplicates = backfill_clusters(
+            chunk_size=options['chunk_size'], workers=options['workers'], on_chunk=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Clustered {total} alerts: {total - duplicates} stories, {duplicates} near-duplicates."
+        ))
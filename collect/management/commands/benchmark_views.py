@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from collect.benchmark import compare, environment, run_render, run_routes
+from collect.routers import READ_ALIAS
+from collect.synthetic import SIZES, generate
+
+
+class Command(BaseCommand):
+    help = ("Benchmark every page route (p50/p95, queries, peak memory) on a throwaway database "
+            "filled with synthetic data, one run per size; results are written as JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10k', help="Comma separated: 10k,100k,1m or row counts")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default=f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+        parser.add_argument('--compare', help="Earlier results file to compare p50 latencies against")
+        parser.add_argument('--render', action='store_true',
+                            help="Also time template rendering with and without the cached loader and fragments")
+
+    def parse_sizes(self, value):
+        sizes = {}
+        for label in filter(None, (part.strip().lower() for part in value.split(','))):
+            if label in SIZES:
+                sizes[label] = SIZES[label]
+            elif label.isdigit():
+                sizes[label] = int(label)
+            else:
+                raise CommandError(f"Unknown size {label!r}; use {', '.join(SIZES)} or a number.")
+        return sizes
+
+    def handle(self, *args, **options):
+        sizes = self.parse_sizes(options['sizes'])
+        previous = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as fh:
+                previous = json.load(fh)
+
+        results = {'generated_at': datetime.now().isoformat(timespec='seconds'), **environment(),
+                   'repeat': options['repeat'], 'sizes': {}}
+        setup_test_environment()
+        try:
+            for label, alerts in sizes.items():
+                results['sizes'][label] = self.run_size(label, alerts, options)
+        finally:
+            teardown_test_environment()
+
+        with open(options['output'], 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+        if previous:
+            for size, route, old, new, change in compare(previous, results):
+                style = self.style.ERROR if change > 10 else self.style.SUCCESS if change < -10 else str
+                self.stdout.write(style(f"{size:>6} {route:<28} {old:>9.2f} -> {new:>9.2f} ms ({change:+.0f}%)"))
+
+    def run_size(self, label, alerts, options):
+        """Fresh file-backed test database per size, so the real db.sqlite3 is never touched."""
+        workdir = tempfile.mkdtemp(prefix='cyberpulse-bench-')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(workdir, f'bench-{label}.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        if READ_ALIAS in connections:  # reads must hit the throwaway database too
+            connections[READ_ALIAS].close()
+            connections[READ_ALIAS].creation.set_as_test_mirror(connection.settings_dict)
+        try:
+            self.stdout.write(f"[{label}] generating {alerts} alerts...")
+            started = time.perf_counter()
+            rows = generate(alerts, seed=options['seed'])
+            generate_s = time.perf_counter() - started
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            def report(route, result):
+                self.stdout.write(
+                    f"[{label}] {route:<28} p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  "
+                    f"{result['queries']} q  {result['peak_kb']:>8.1f} KiB"
+                )
+
+            routes = run_routes(repeat=options['repeat'], warmup=options['warmup'], on_route=report)
+            result = {'rows': rows, 'generate_s': round(generate_s, 2), 'routes': routes}
+            if options['render']:
+                result['render'] = run_render(repeat=options['repeat'], warmup=options['warmup'])
+                for path, timing in result['render'].items():
+                    self.stdout.write(
+                        f"[{label}] render {path:<21} {timing['baseline_p50_ms']:>8.2f} -> "
+                        f"{timing['cached_p50_ms']:>8.2f} ms p50 (x{timing['speedup']})"
+                    )
+            return result
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from collect.assets import AssetError, brotli_available, build, fetch_vendor, output_root, prune
+
+
+class Command(BaseCommand):
+    help = ("Bundle the vendored libraries and page CSS/JS into content-hashed files under STATIC_ROOT, "
+            "precompressed with gzip (and brotli when installed). Run at deploy time: vendored libraries "
+            "missing from collect/static/collect/vendor/ are downloaded, which needs network access.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--offline', action='store_true',
+                            help="Fail instead of downloading vendored libraries that are missing")
+        parser.add_argument('--refresh-vendor', action='store_true',
+                            help="Download every vendored library again before building")
+        parser.add_argument('--no-compress', action='store_true', help="Skip the .gz/.br variants")
+        parser.add_argument('--prune', action='store_true',
+                            help="Delete bundles of earlier builds (pages cached with old HTML may still ask for them)")
+
+    def handle(self, *args, **options):
+        try:
+            if options['refresh_vendor']:
+                for name in fetch_vendor(refresh=True):
+                    self.stderr.write(f"fetched vendor/{name}")
+
+            def report(name, hashed, sizes):
+                encoded = '  '.join(f"{encoding} {size / 1024:.1f} KiB" for encoding, size in sizes.items())
+                self.stdout.write(f"{name:<20} {hashed:<44} {encoded}")
+
+            manifest = build(compress=not options['no_compress'], fetch=not options['offline'], on_bundle=report)
+        except AssetError as exc:
+            raise CommandError(str(exc))
+
+        if not options['no_compress'] and not brotli_available():
+            self.stderr.write("brotli is not installed: only .gz variants were written")
+        if options['prune']:
+            self.stdout.write(f"Removed {prune()} stale files")
+        self.stdout.write(self.style.SUCCESS(
+            f"Built {len(manifest['bundles'])} bundles into {output_root()}."
+        ))
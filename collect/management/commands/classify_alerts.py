@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from collect.classify import BATCH_SIZE, classify_archive
+
+
+class Command(BaseCommand):
+    help = "Store predicted category, confidence and severity for alerts that have not been scored yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-score every alert, e.g. after retraining")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            scored = classify_archive(
+                rescore=options['all'], batch_size=options['batch_size'],
+                on_batch=lambda done: self.stderr.write(f"{done} alerts scored"),
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - start
+        rate = scored / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(f"Scored {scored} alerts in {elapsed:.1f}s ({rate:.0f}/s)."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from collect.storage import dedupe_media
+
+
+class Command(BaseCommand):
+    help = "Move uploaded media into content-addressed blobs, dropping byte-identical copies."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without touching files")
+
+    def handle(self, *args, **options):
+        stats = dedupe_media(dry_run=options['dry_run'], log=self.stderr.write)
+        prefix = "Would move" if options['dry_run'] else "Moved"
+        self.stdout.write(
+            f"{prefix} {stats['files']} file(s) into {stats['blobs_created']} new blob(s), "
+            f"{stats['rows']} row(s) repointed, {stats['missing']} missing."
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['bytes_saved'] / 1024 / 1024:.1f} MB of {stats['bytes_before'] / 1024 / 1024:.1f} MB "
+            f"were duplicates."
+        ))
@@ -0,0 +1,60 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from collect.export import CHUNK_SIZE, DATASETS, FORMATS, ExportError, export_stream
+
+
+class Command(BaseCommand):
+    help = "Stream ThreatAlert or CurrentInformation rows to CSV, NDJSON or Parquet ('-' for stdout)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="File to write, or '-' for stdout")
+        parser.add_argument('--dataset', choices=sorted(DATASETS), default='alerts')
+        parser.add_argument('--format', choices=sorted(FORMATS), help="Default: taken from the file extension")
+        parser.add_argument('--category', action='append', default=[])
+        parser.add_argument('--severity', action='append', default=[])
+        parser.add_argument('--status', action='append', default=[])
+        parser.add_argument('--start', help="YYYY-MM-DD or YYYY-MM-DDTHH:MM")
+        parser.add_argument('--end', help="YYYY-MM-DD (inclusive) or YYYY-MM-DDTHH:MM")
+        parser.add_argument('-q', '--query', help="Search terms")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            '--archive', action='store_true', help="Include archived alerts (see `manage.py archive_alerts`)"
+        )
+
+    def handle(self, *args, **options):
+        path = options['output']
+        fmt = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if fmt not in FORMATS:
+            raise CommandError(f"Pass --format ({', '.join(FORMATS)}); can't tell it from {path!r}.")
+
+        params = {
+            'category': options['category'],
+            'severity': options['severity'],
+            'status': options['status'],
+            'start': options['start'],
+            'end': options['end'],
+            'q': options['query'],
+            'archive': '1' if options['archive'] else '',
+        }
+        try:
+            stream, content_type, extension = export_stream(options['dataset'], fmt, params, options['chunk_size'])
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        written = 0
+        out = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        try:
+            for chunk in stream:
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if path != '-':
+                out.close()
+        if path != '-':
+            self.stdout.write(self.style.SUCCESS(
+                f"Wrote {written / 1024:.1f} KiB to {path} in {time.perf_counter() - started:.1f}s."
+            ))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from collect.synthetic import SIZES, clear_synthetic, generate
+
+
+class Command(BaseCommand):
+    help = "Insert synthetic ThreatAlert, CurrentInformation and NewsSource rows for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=sorted(SIZES), help="Preset ThreatAlert volume (10k, 100k, 1m)")
+        parser.add_argument('--alerts', type=int, help="Exact number of ThreatAlert rows")
+        parser.add_argument('--current', type=int, help="CurrentInformation rows (default: alerts / 10)")
+        parser.add_argument('--sources', type=int, help="NewsSource rows (default: alerts / 50, 10..2000)")
+        parser.add_argument('--days', type=int, default=365, help="Oldest timestamp, in days")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--clear', action='store_true', help="Delete previously generated rows first")
+
+    def handle(self, *args, **options):
+        alerts = options['alerts'] if options['alerts'] is not None else SIZES.get(options['size'])
+        if alerts is None and not options['clear']:
+            raise CommandError("Pass --size or --alerts (or only --clear).")
+
+        if options['clear']:
+            deleted = clear_synthetic()
+            self.stdout.write(f"Deleted {deleted['alerts']} alerts, {deleted['current']} current-information "
+                              f"rows and {deleted['sources']} sources.")
+        if alerts is None:
+            return
+
+        def progress(model, total):
+            self.stdout.write(f"  {model.__name__}: {total}", ending='\r')
+
+        started = time.perf_counter()
+        written = generate(
+            alerts, current=options['current'], sources=options['sources'], seed=options['seed'],
+            days=options['days'], batch_size=options['batch_size'], on_batch=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Inserted {written['alerts']} alerts, {written['current']} current-information rows and "
+            f"{written['sources']} sources in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,50 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from collect.ingest import IngestReport, ingest_alerts, iter_ndjson, load_json_records
+
+
+class Command(BaseCommand):
+    help = "Bulk upsert ThreatAlert records from a JSON or NDJSON file ('-' for stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or '-' for stdin")
+        parser.add_argument('--format', choices=['auto', 'json', 'ndjson'], default='auto')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--report', help="Write per-row results as JSON to this file")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if fmt == 'auto':
+            fmt = 'json' if path.endswith('.json') else 'ndjson'
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        report = IngestReport(keep_rows=bool(options['report']))
+        started = time.perf_counter()
+        try:
+            records = iter_ndjson(stream) if fmt == 'ndjson' else load_json_records(stream.read())
+            ingest_alerts(records, batch_size=options['batch_size'], report=report)
+        except ValueError as e:
+            raise CommandError(f"Invalid input: {e}")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.perf_counter() - started
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as fh:
+                json.dump(report.as_dict(), fh, indent=2)
+        else:
+            for result in report.rows:
+                self.stderr.write(f"row {result['row']}: {'; '.join(result['errors'])}")
+
+        total = sum(report.counts.values())
+        rate = total / elapsed if elapsed else total
+        self.stdout.write(self.style.SUCCESS(
+            "{created} created, {updated} updated, {duplicate} duplicate, {error} errors".format(**report.counts)
+            + f" ({total} rows in {elapsed:.2f}s, {rate:.0f} rows/s)"
+        ))
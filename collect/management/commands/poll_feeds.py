@@ -0,0 +1,33 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from collect.feeds import FeedPoller
+
+
+class Command(BaseCommand):
+    help = "Poll every NewsSource feed_url and insert new items as ThreatAlerts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run a single polling round and exit")
+        parser.add_argument('--interval', type=int, default=300, help="Seconds between polls of one source")
+        parser.add_argument('--concurrency', type=int, default=20, help="Feeds fetched at the same time")
+        parser.add_argument('--per-host', type=int, default=2, help="Concurrent requests per host")
+        parser.add_argument('--timeout', type=int, default=15)
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        poller = FeedPoller(
+            concurrency=options['concurrency'],
+            per_host=options['per_host'],
+            interval=options['interval'],
+            timeout=options['timeout'],
+            batch_size=options['batch_size'],
+        )
+        if options['once']:
+            queued = asyncio.run(poller.run_once())
+            self.stdout.write(self.style.SUCCESS(
+                f"{queued} new item(s): " + ", ".join(f"{n} {status}" for status, n in poller.report.counts.items())
+            ))
+        else:
+            asyncio.run(poller.run_forever())
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from collect.media import run_pending
+from collect.models import ThreatAlert
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnails, responsive variants and video posters for pending alerts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit")
+        parser.add_argument('--batch-size', type=int, default=10)
+        parser.add_argument('--sleep', type=float, default=5.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--requeue', action='store_true',
+                            help="Put failed and interrupted ('processing') rows back in the queue first")
+
+    def handle(self, *args, **options):
+        if options['requeue']:
+            requeued = ThreatAlert.objects.filter(
+                media_status__in=['failed', 'processing']
+            ).update(media_status='pending')
+            self.stdout.write(f"Requeued {requeued} alert(s).")
+
+        total_ready = total_failed = 0
+        while True:
+            ready, failed = run_pending(options['batch_size'])
+            total_ready += ready
+            total_failed += failed
+            if ready or failed:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"{total_ready} processed, {total_failed} failed."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from collect.fuzzy import rebuild_fuzzy_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the trigram lookup for news sources and current information (after bulk loads)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        records = rebuild_fuzzy_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {records} records."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from collect.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Recreate the ThreatAlert FTS5 search index (SQLite only)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if not rebuild_search_index(options['database']):
+            raise CommandError("FTS5 is not available on this database; search uses icontains.")
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from collect.benchmark import run_concurrency
+from collect.routers import READ_ALIAS
+from collect.synthetic import generate
+
+
+class Command(BaseCommand):
+    help = ("Concurrency stress test: writer threads post the news/intel forms while readers load the "
+            "list pages, on a throwaway file database. Reports 'database is locked' failures and latency.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alerts', type=int, default=2000, help="Synthetic alerts to start from")
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=50, help="Requests per thread")
+        parser.add_argument('--json', action='store_true', help="Print the result as JSON")
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp(prefix='cyberpulse-stress-')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(workdir, 'stress.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        if READ_ALIAS in connections:
+            connections[READ_ALIAS].creation.set_as_test_mirror(connection.settings_dict)
+        try:
+            generate(options['alerts'], seed=0)
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+            result = run_concurrency(options['writers'], options['readers'], options['requests'])
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        result['profile'] = getattr(settings, 'DB_PROFILE', 'plain')
+        result['journal_mode'] = journal_mode
+        if options['json']:
+            self.stdout.write(json.dumps(result))
+            return
+        for kind in ('write', 'read'):
+            self.stdout.write(
+                f"{kind + 's':<7} {result[kind + 's']:>6}  p50 {result[kind + '_p50_ms']:>8} ms  "
+                f"p95 {result[kind + '_p95_ms']:>8} ms"
+            )
+        style = self.style.ERROR if result['locked'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"[{result['profile']}, {journal_mode}] {result['requests_per_s']} req/s, "
+            f"{result['failed']} failed requests, {result['locked']} of them 'database is locked'"
+        ))
+        for failure in result['failures']:
+            self.stdout.write(f"  {failure}")
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from collect.classify import classifier_path, train
+
+
+class Command(BaseCommand):
+    help = "Train the category/severity classifier on analyst-labelled alerts and save it to CLASSIFIER_PATH."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Where to write the model (default: settings.CLASSIFIER_PATH)")
+        parser.add_argument('--holdout', type=float, default=0.1, help="Share of rows held out to report accuracy")
+        parser.add_argument('--min-df', type=int, default=2, help="Ignore features seen in fewer alerts")
+        parser.add_argument('--max-features', type=int, default=1 << 16)
+        parser.add_argument('--max-iter', type=int, default=200)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            model, accuracy = train(
+                holdout=options['holdout'], min_df=options['min_df'],
+                max_features=options['max_features'], max_iter=options['max_iter'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        path = options['output'] or classifier_path()
+        model.save(path)
+        for name, value in accuracy.items():
+            self.stdout.write(f"{name}: {value:.1%} holdout accuracy")
+        self.stdout.write(self.style.SUCCESS(
+            f"Trained on {model.meta['samples']} alerts, {model.meta['features']} features "
+            f"in {time.perf_counter() - start:.1f}s -> {path}"
+        ))
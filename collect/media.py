@@ -0,0 +1,165 @@
+# collect/media.py
+"""
+Derived media for ThreatAlert uploads, produced outside the request cycle.
+
+``newsfeeding`` and the admin only store the original file and mark the alert
+``media_status='pending'``; ``manage.py process_media`` then claims pending rows
+and writes
+
+* a small square ``thumbnail`` (JPEG, plus WebP in ``image_variants``) for list views,
+* responsive WebP + JPEG ``image_variants`` (never upscaled), offered to the
+  browser through ``srcset`` in the search table and the trending cards,
+* a ``video_poster`` frame and ``video_duration`` for videos (needs ffmpeg/ffprobe
+  on PATH; without them videos are marked ready with no poster).
+
+Results are written with ``QuerySet.update()`` so model signals don't re-queue the row.
+"""
+import io
+import json
+import logging
+import shutil
+import subprocess
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import ThreatAlert
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (160, 160)
+VARIANT_WIDTHS = (320, 640, 1280)
+POSTER_WIDTH = 640
+WEBP_QUALITY = 78
+JPEG_QUALITY = 82
+
+VARIANT_DIR = 'threat_alerts/variants'
+
+
+def _variant_name(alert, name):
+    return f'{VARIANT_DIR}/{alert.pk}/{name}'
+
+
+def _save(name, image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def _load_rgb(file):
+    with file.open('rb') as fh:
+        image = Image.open(fh)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'L'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image.convert('RGBA'), mask=image.convert('RGBA').split()[-1])
+        image = background
+    return image.convert('RGB')
+
+
+def process_image(alert):
+    image = _load_rgb(alert.image)
+    thumb = ImageOps.fit(image, THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+    updates = {
+        'thumbnail': _save(_variant_name(alert, 'thumb.jpg'), thumb, 'JPEG', quality=JPEG_QUALITY, optimize=True),
+    }
+    variants = {
+        'thumb_webp': _save(_variant_name(alert, 'thumb.webp'), thumb, 'WEBP', quality=WEBP_QUALITY, method=4),
+        'webp': {},
+        'jpeg': {},
+    }
+
+    widths = [w for w in VARIANT_WIDTHS if w < image.width] or [image.width]
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS) if width != image.width else image
+        variants['webp'][str(width)] = _save(
+            _variant_name(alert, f'{width}.webp'), resized, 'WEBP', quality=WEBP_QUALITY, method=4,
+        )
+        variants['jpeg'][str(width)] = _save(
+            _variant_name(alert, f'{width}.jpg'), resized, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True,
+        )
+    updates['image_variants'] = variants
+    return updates
+
+
+def probe_duration(path):
+    if not shutil.which('ffprobe'):
+        return None
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', path],
+        capture_output=True, timeout=60, check=True,
+    )
+    duration = json.loads(result.stdout or b'{}').get('format', {}).get('duration')
+    return float(duration) if duration else None
+
+
+def extract_poster(path, at_seconds):
+    if not shutil.which('ffmpeg'):
+        return None
+    result = subprocess.run(
+        ['ffmpeg', '-v', 'error', '-ss', f'{at_seconds:.2f}', '-i', path, '-frames:v', '1',
+         '-vf', f'scale={POSTER_WIDTH}:-2', '-f', 'image2', '-c:v', 'png', 'pipe:1'],
+        capture_output=True, timeout=120, check=True,
+    )
+    if not result.stdout:
+        return None
+    return Image.open(io.BytesIO(result.stdout)).convert('RGB')
+
+
+def process_video(alert):
+    try:
+        path = alert.video.path
+    except NotImplementedError:  # remote storage: nothing local for ffmpeg to read
+        return {}
+    if not shutil.which('ffmpeg'):
+        logger.warning("ffmpeg not found; skipping poster for alert %s", alert.pk)
+    updates = {'video_duration': probe_duration(path)}
+    duration = updates['video_duration'] or 0
+    poster = extract_poster(path, min(1.0, duration / 2) if duration else 0)
+    if poster is not None:
+        updates['video_poster'] = _save(_variant_name(alert, 'poster.jpg'), poster, 'JPEG', quality=JPEG_QUALITY)
+    return updates
+
+
+def process_alert_media(alert):
+    """Compute every derived file for ``alert``; returns the field updates."""
+    updates = {}
+    if alert.image:
+        updates.update(process_image(alert))
+    if alert.video:
+        updates.update(process_video(alert))
+    return updates
+
+
+def claim_pending(limit=10):
+    """Atomically move up to ``limit`` pending rows to 'processing' and return them."""
+    ids = list(
+        ThreatAlert.objects.filter(media_status='pending').order_by('id').values_list('id', flat=True)[:limit]
+    )
+    claimed = [
+        pk for pk in ids
+        if ThreatAlert.objects.filter(pk=pk, media_status='pending').update(media_status='processing')
+    ]
+    return list(ThreatAlert.objects.filter(pk__in=claimed).order_by('id'))
+
+
+def run_pending(limit=10):
+    """Process one batch of the queue; returns (ready, failed) counts."""
+    ready = failed = 0
+    for alert in claim_pending(limit):
+        try:
+            updates = process_alert_media(alert)
+        except Exception:
+            logger.exception("Media processing failed for alert %s", alert.pk)
+            ThreatAlert.objects.filter(pk=alert.pk).update(media_status='failed', updated_at=timezone.now())
+            failed += 1
+            continue
+        ThreatAlert.objects.filter(pk=alert.pk).update(media_status='ready', updated_at=timezone.now(), **updates)
+        ready += 1
+    return ready, failed
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:00
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def populate_rollup(apps, schema_editor):
+    ThreatAlert = apps.get_model('collect', 'ThreatAlert')
+    ThreatAlertDailyRollup = apps.get_model('collect', 'ThreatAlertDailyRollup')
+    rows = (
+        ThreatAlert.objects.order_by()
+        .annotate(day=TruncDate('timestamp', tzinfo=timezone.get_default_timezone()))
+        .values('day', 'category', 'severity', 'source')
+        .annotate(count=Count('id'))
+    )
+    ThreatAlertDailyRollup.objects.bulk_create([
+        ThreatAlertDailyRollup(
+            date=row['day'], category=row['category'], severity=row['severity'],
+            source=row['source'], count=row['count'],
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0007_newssource'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThreatAlertDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Local calendar day of the alert timestamp')),
+                ('category', models.CharField(max_length=50)),
+                ('severity', models.CharField(max_length=10)),
+                ('source', models.CharField(max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Threat Alert Daily Rollup',
+                'verbose_name_plural': 'Threat Alert Daily Rollups',
+                'constraints': [models.UniqueConstraint(fields=('date', 'category', 'severity', 'source'), name='unique_threat_rollup_bucket')],
+            },
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0008_threatalertdailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='currentinformation',
+            index=models.Index(fields=['created_at'], name='currentinfo_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newssource',
+            index=models.Index(fields=['name'], name='newssource_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='threatalert',
+            index=models.Index(fields=['timestamp'], name='threat_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='threatalert',
+            index=models.Index(fields=['severity', 'timestamp'], name='threat_severity_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='threatalert',
+            index=models.Index(fields=['category', 'timestamp'], name='threat_category_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='threatalert',
+            index=models.Index(condition=models.Q(('severity', 'critical'), ('video__gt', '')), fields=['timestamp'], name='threat_critical_video_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='threatalert',
+            index=models.Index(condition=models.Q(('video__gt', '')), fields=['timestamp'], name='threat_video_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0009_threat_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newssource',
+            name='feed_url',
+            field=models.URLField(blank=True, default='', help_text='RSS, Atom or JSON Feed URL polled by `manage.py poll_feeds` (optional)', max_length=500),
+        ),
+        migrations.CreateModel(
+            name='NewsSourceFeedState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('etag', models.CharField(blank=True, default='', max_length=255)),
+                ('last_modified', models.CharField(blank=True, default='', max_length=64)),
+                ('cursor', models.DateTimeField(blank=True, help_text='Publication time of the newest item already ingested', null=True)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('next_poll_at', models.DateTimeField(blank=True, null=True)),
+                ('last_polled_at', models.DateTimeField(blank=True, null=True)),
+                ('last_status', models.CharField(blank=True, default='', max_length=255)),
+                ('source', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='feed_state', to='collect.newssource')),
+            ],
+            options={
+                'verbose_name': 'News Source Feed State',
+                'verbose_name_plural': 'News Source Feed States',
+            },
+        ),
+    ]
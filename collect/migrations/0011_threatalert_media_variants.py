@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:08
+
+from django.db import migrations, models
+
+
+def queue_existing_media(apps, schema_editor):
+    ThreatAlert = apps.get_model('collect', 'ThreatAlert')
+    ThreatAlert.objects.filter(models.Q(image__gt='') | models.Q(video__gt='')).update(media_status='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0010_newssource_feeds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='threatalert',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, help_text="{'thumb_webp': path, 'webp': {width: path}, 'jpeg': {width: path}}"),
+        ),
+        migrations.AddField(
+            model_name='threatalert',
+            name='media_status',
+            field=models.CharField(blank=True, choices=[('', 'No media'), ('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='threatalert',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='threat_alerts/variants/'),
+        ),
+        migrations.AddField(
+            model_name='threatalert',
+            name='video_duration',
+            field=models.FloatField(blank=True, help_text='Video length in seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='threatalert',
+            name='video_poster',
+            field=models.ImageField(blank=True, null=True, upload_to='threat_alerts/variants/'),
+        ),
+        migrations.AddIndex(
+            model_name='threatalert',
+            index=models.Index(condition=models.Q(('media_status', 'pending')), fields=['id'], name='threat_media_pending_idx'),
+        ),
+        migrations.RunPython(queue_existing_media, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:12
+
+import collect.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0011_threatalert_media_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField(default=0, help_text='Size in bytes')),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Media Blob',
+                'verbose_name_plural': 'Media Blobs',
+            },
+        ),
+        migrations.AlterField(
+            model_name='newssource',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Logo or favicon (optional)', null=True, storage=collect.storage.get_media_storage, upload_to='threat_alerts/source'),
+        ),
+        migrations.AlterField(
+            model_name='threatalert',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=collect.storage.get_media_storage, upload_to='threat_alerts/'),
+        ),
+        migrations.AlterField(
+            model_name='threatalert',
+            name='video',
+            field=models.FileField(blank=True, help_text='Upload video files', null=True, storage=collect.storage.get_media_storage, upload_to='threat_alerts/videos/'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0012_media_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThreatAlertSignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Threat Alert Signature Band',
+                'verbose_name_plural': 'Threat Alert Signature Bands',
+            },
+        ),
+        migrations.AddField(
+            model_name='threatalert',
+            name='cluster_id',
+            field=models.BigIntegerField(blank=True, help_text='Id of the first alert of the same story', null=True),
+        ),
+        migrations.AddField(
+            model_name='threatalert',
+            name='is_duplicate',
+            field=models.BooleanField(default=False, help_text='Near-duplicate of an earlier alert'),
+        ),
+        migrations.AddField(
+            model_name='threatalert',
+            name='minhash',
+            field=models.BinaryField(blank=True, help_text='MinHash signature of title + content', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='threatalert',
+            index=models.Index(condition=models.Q(('is_duplicate', True)), fields=['cluster_id'], name='threat_duplicate_cluster_idx'),
+        ),
+        migrations.AddField(
+            model_name='threatalertsignatureband',
+            name='alert',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_bands', to='collect.threatalert'),
+        ),
+        migrations.AddIndex(
+            model_name='threatalertsignatureband',
+            index=models.Index(fields=['band', 'bucket'], name='threat_band_bucket_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0013_threatalert_clusters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='threatalert',
+            name='category_confidence',
+            field=models.FloatField(blank=True, help_text='Probability of predicted_category', null=True),
+        ),
+        migrations.AddField(
+            model_name='threatalert',
+            name='predicted_category',
+            field=models.CharField(blank=True, choices=[('Genz', 'Genz'), ('Chapagau', 'Chapagau'), ('UML', 'UML'), ('Bhrikuti Mandav', 'Bhrikuti Mandav'), ('Samakoshi', 'Samakoshi'), ('PM', 'PM'), ('People', 'People'), ('Protest', 'Protest'), ('Disinformation', 'Disinformation / Fake News'), ('Army', 'Army'), ('Police', 'Police'), ('APF', 'APF'), ('NationalCyberCrime', 'National CyberCrime'), ('InternationalCyberCrime', 'International CyberCrime'), ('ElectionManipulation', 'Election Manipulation'), ('SocialEngineering', 'Social Engineering'), ('DataLeak', 'Data Leak'), ('Scam', 'Financial Scam'), ('Impersonation', 'Impersonation'), ('Malware', 'Malware / Infected Links'), ('Other', 'Other')], default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='threatalert',
+            name='predicted_severity',
+            field=models.CharField(blank=True, choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('critical', 'Critical')], default='', max_length=10),
+        ),
+    ]
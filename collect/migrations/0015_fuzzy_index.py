@@ -0,0 +1,122 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:37
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copies of the collect/fuzzy.py helpers as of this migration, so later changes
+# there don't change (or break) what it produces. Anything indexed differently since
+# is brought up to date by `manage.py rebuild_fuzzy_index`.
+STOP_WORDS = {'http', 'https', 'www', 'com', 'org', 'net', 'np'}
+WORD_RE = re.compile(r'[\w\u0900-\u0963\u0966-\u097f]+', re.UNICODE)
+TERM_LENGTH = 64
+
+
+def normalize(text):
+    folded = []
+    for char in unicodedata.normalize('NFC', (text or '').lower()):
+        base = ''.join(c for c in unicodedata.normalize('NFKD', char) if not unicodedata.combining(c))
+        folded.append(base if base.isascii() else char)
+    return ''.join(folded)
+
+
+def words(text):
+    return [
+        word[:TERM_LENGTH] for word in WORD_RE.findall(normalize(text))
+        if word not in STOP_WORDS and not word.isdigit()
+    ]
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+FIELDS = {
+    'newssource': {'name': 2.0, 'url': 0.5},
+    'currentinformation': {'leader': 2.0, 'location': 1.5, 'vehicle': 1.0},
+}
+
+
+def populate_fuzzy_index(apps, schema_editor):
+    FuzzyTerm = apps.get_model('collect', 'FuzzyTerm')
+    FuzzyTrigram = apps.get_model('collect', 'FuzzyTrigram')
+    FuzzyPosting = apps.get_model('collect', 'FuzzyPosting')
+    postings = []
+    for kind, fields in FIELDS.items():
+        for row in apps.get_model('collect', kind).objects.values('id', *fields):
+            terms = {}
+            for field, weight in fields.items():
+                for word in words(row[field]):
+                    terms[word] = max(terms.get(word, 0), weight)
+            postings.extend((term, kind, row['id'], weight) for term, weight in terms.items())
+    frequency = {}
+    for term, kind, object_id, weight in postings:
+        frequency[term] = frequency.get(term, 0) + 1
+    FuzzyTerm.objects.bulk_create([
+        FuzzyTerm(term=term, grams=len(trigrams(term)), frequency=count) for term, count in sorted(frequency.items())
+    ])
+    ids = dict(FuzzyTerm.objects.values_list('term', 'id'))
+    FuzzyTrigram.objects.bulk_create(
+        [FuzzyTrigram(trigram=gram, term_id=ids[term]) for term in frequency for gram in trigrams(term)],
+        batch_size=2000,
+    )
+    FuzzyPosting.objects.bulk_create(
+        [FuzzyPosting(term_id=ids[term], kind=kind, object_id=object_id, weight=weight)
+         for term, kind, object_id, weight in postings],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0014_threatalert_predictions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FuzzyTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, unique=True)),
+                ('grams', models.PositiveSmallIntegerField(help_text='Number of distinct trigrams in the term')),
+                ('frequency', models.PositiveIntegerField(default=0, help_text='Number of records containing the term')),
+            ],
+            options={
+                'verbose_name': 'Fuzzy Term',
+                'verbose_name_plural': 'Fuzzy Terms',
+            },
+        ),
+        migrations.CreateModel(
+            name='FuzzyPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=30)),
+                ('object_id', models.BigIntegerField()),
+                ('weight', models.FloatField(default=1.0)),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='collect.fuzzyterm')),
+            ],
+            options={
+                'verbose_name': 'Fuzzy Posting',
+                'verbose_name_plural': 'Fuzzy Postings',
+                'indexes': [models.Index(fields=['term', 'kind', 'weight', 'object_id'], name='fuzzy_posting_term_idx'), models.Index(fields=['kind', 'object_id', 'term', 'weight'], name='fuzzy_posting_object_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FuzzyTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='collect.fuzzyterm')),
+            ],
+            options={
+                'verbose_name': 'Fuzzy Trigram',
+                'verbose_name_plural': 'Fuzzy Trigrams',
+                'indexes': [models.Index(fields=['trigram', 'term'], name='fuzzy_trigram_term_idx')],
+            },
+        ),
+        migrations.RunPython(populate_fuzzy_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:27
+
+import time
+
+from django.db import migrations, models
+
+
+def seed_generations(apps, schema_editor):
+    # Counters start from the clock so they never reuse a generation an old cache entry was stored under
+    CacheGeneration = apps.get_model('collect', 'CacheGeneration')
+    CacheGeneration.objects.bulk_create([
+        CacheGeneration(label=label, value=time.time_ns())
+        for label in ('collect.threatalert', 'collect.currentinformation', 'collect.newssource')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0015_fuzzy_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(help_text='Model label, e.g. collect.threatalert', max_length=100, unique=True)),
+                ('value', models.BigIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Cache Generation',
+                'verbose_name_plural': 'Cache Generations',
+            },
+        ),
+        migrations.RunPython(seed_generations, migrations.RunPython.noop),
+    ]
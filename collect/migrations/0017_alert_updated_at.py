@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0016_cache_generations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='threatalert',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.utils import timezone
 import datetime
 
+from .storage import get_media_storage, saving_media
+
 class ThreatAlert(models.Model):
     # 🔹 Define choices inside the model
     CATEGORY_CHOICES = [
@@ -36,8 +38,8 @@ class ThreatAlert(models.Model):
     ]
 
     title = models.CharField(max_length=300)
-    image = models.ImageField(upload_to='threat_alerts/', blank=True, null=True)
-    video = models.FileField(upload_to='threat_alerts/videos/', blank=True, null=True, 
+    image = models.ImageField(upload_to='threat_alerts/', storage=get_media_storage, blank=True, null=True)
+    video = models.FileField(upload_to='threat_alerts/videos/', storage=get_media_storage, blank=True, null=True, 
                            help_text="Upload video files")
     content = models.TextField()
     category = models.CharField(
@@ -53,9 +55,79 @@ class ThreatAlert(models.Model):
         default='low'
     )
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Versions the row's cached fragments; QuerySet.update() callers that change shown fields set it too
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # 🔹 Derived media, produced out of request by `manage.py process_media`
+    MEDIA_STATUS_CHOICES = [
+        ('', 'No media'),
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    media_status = models.CharField(max_length=12, choices=MEDIA_STATUS_CHOICES, blank=True, default='')
+    thumbnail = models.ImageField(upload_to='threat_alerts/variants/', blank=True, null=True)
+    image_variants = models.JSONField(
+        blank=True,
+        default=dict,
+        help_text="{'thumb_webp': path, 'webp': {width: path}, 'jpeg': {width: path}}"
+    )
+    video_poster = models.ImageField(upload_to='threat_alerts/variants/', blank=True, null=True)
+    video_duration = models.FloatField(blank=True, null=True, help_text="Video length in seconds")
+
+    # 🔹 Near-duplicate clustering (collect/dedup.py)
+    minhash = models.BinaryField(blank=True, null=True, editable=False, help_text="MinHash signature of title + content")
+    cluster_id = models.BigIntegerField(
+        blank=True,
+        null=True,
+        help_text="Id of the first alert of the same story"
+    )
+    is_duplicate = models.BooleanField(default=False, help_text="Near-duplicate of an earlier alert")
+
+    # 🔹 Classifier suggestions (collect/classify.py); the analyst's category/severity stay authoritative
+    predicted_category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, blank=True, default='')
+    category_confidence = models.FloatField(blank=True, null=True, help_text="Probability of predicted_category")
+    predicted_severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES, blank=True, default='')
+
+    # Rows that carry a video; `video > ''` excludes both NULL and empty paths
+    HAS_VIDEO = models.Q(video__gt='')
+    # One row per story: the first alert of each near-duplicate cluster
+    CANONICAL = models.Q(is_duplicate=False)
+
+    class Meta:
+        indexes = [
+            # Newest-first lists and keyset pages (SQLite appends the rowid/id)
+            models.Index(fields=['timestamp'], name='threat_timestamp_idx'),
+            models.Index(fields=['severity', 'timestamp'], name='threat_severity_ts_idx'),
+            models.Index(fields=['category', 'timestamp'], name='threat_category_ts_idx'),
+            # newsTrending: critical alerts with a video, newest first
+            models.Index(
+                fields=['timestamp'],
+                condition=models.Q(severity='critical') & models.Q(video__gt=''),
+                name='threat_critical_video_idx',
+            ),
+            models.Index(fields=['timestamp'], condition=models.Q(video__gt=''), name='threat_video_idx'),
+            # process_media work queue
+            models.Index(
+                fields=['id'],
+                condition=models.Q(media_status='pending'),
+                name='threat_media_pending_idx',
+            ),
+            # "+N similar" counts per cluster
+            models.Index(
+                fields=['cluster_id'],
+                condition=models.Q(is_duplicate=True),
+                name='threat_duplicate_cluster_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.id}: {self.title}"
+
+    def save(self, *args, **kwargs):
+        with saving_media():
+            super().save(*args, **kwargs)
     
     @property
     def has_media(self):
@@ -68,7 +140,27 @@ class ThreatAlert(models.Model):
         elif self.image:
             return 'image'
         return 'none'
-    
+
+    @property
+    def thumbnail_webp_url(self):
+        path = (self.image_variants or {}).get('thumb_webp')
+        return self.image.storage.url(path) if path else ''
+
+    def _srcset(self, fmt):
+        widths = (self.image_variants or {}).get(fmt) or {}
+        return ', '.join(
+            f'{self.image.storage.url(path)} {width}w' for width, path in sorted(widths.items(), key=lambda item: int(item[0]))
+        )
+
+    @property
+    def webp_srcset(self):
+        """``srcset`` of the responsive WebP variants; empty until process_media has run."""
+        return self._srcset('webp')
+
+    @property
+    def jpeg_srcset(self):
+        return self._srcset('jpeg')
+
 
 class CurrentInformation(models.Model):
     timing = models.CharField(
@@ -123,6 +215,9 @@ class CurrentInformation(models.Model):
 
     class Meta:
         ordering = ['-created_at']  # Show newest first
+        indexes = [
+            models.Index(fields=['created_at'], name='currentinfo_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.leader} at {self.location} on {self.timing}"
@@ -131,8 +226,15 @@ class CurrentInformation(models.Model):
 class NewsSource(models.Model):
     name = models.CharField(max_length=200, help_text="Display name of the news source")
     url = models.URLField(max_length=500, help_text="Full TikTok or official URL")
+    feed_url = models.URLField(
+        max_length=500,
+        blank=True,
+        default='',
+        help_text="RSS, Atom or JSON Feed URL polled by `manage.py poll_feeds` (optional)"
+    )
     image = models.ImageField(
         upload_to='threat_alerts/source',
+        storage=get_media_storage,
         blank=True,
         null=True,
         help_text="Logo or favicon (optional)"
@@ -142,6 +244,158 @@ class NewsSource(models.Model):
         verbose_name = "News Source"
         verbose_name_plural = "News Sources"
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name'], name='newssource_name_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        with saving_media():
+            super().save(*args, **kwargs)
+
+
+class ThreatAlertDailyRollup(models.Model):
+    """
+    Pre-aggregated ThreatAlert counts, one row per (day, category, severity, source).
+
+    Kept current by the signal handlers in ``collect/signals.py`` and rebuilt from
+    scratch with ``python manage.py rebuild_threat_rollup``.
+    """
+    date = models.DateField(help_text="Local calendar day of the alert timestamp")
+    category = models.CharField(max_length=50)
+    severity = models.CharField(max_length=10)
+    source = models.CharField(max_length=50)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Threat Alert Daily Rollup"
+        verbose_name_plural = "Threat Alert Daily Rollups"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'category', 'severity', 'source'],
+                name='unique_threat_rollup_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.category}/{self.severity}/{self.source}: {self.count}"
+
+
+class NewsSourceFeedState(models.Model):
+    """Poller bookkeeping for one NewsSource feed (conditional GET, cursor, backoff)."""
+    source = models.OneToOneField(NewsSource, on_delete=models.CASCADE, related_name='feed_state')
+    etag = models.CharField(max_length=255, blank=True, default='')
+    last_modified = models.CharField(max_length=64, blank=True, default='')
+    cursor = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Publication time of the newest item already ingested"
+    )
+    failures = models.PositiveIntegerField(default=0)
+    next_poll_at = models.DateTimeField(blank=True, null=True)
+    last_polled_at = models.DateTimeField(blank=True, null=True)
+    last_status = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        verbose_name = "News Source Feed State"
+        verbose_name_plural = "News Source Feed States"
+
+    def __str__(self):
+        return f"{self.source}: {self.last_status or 'never polled'}"
+
+
+class ThreatAlertSignatureBand(models.Model):
+    """LSH band bucket of a cluster leader's MinHash signature (see collect/dedup.py)."""
+    alert = models.ForeignKey(ThreatAlert, on_delete=models.CASCADE, related_name='signature_bands')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = "Threat Alert Signature Band"
+        verbose_name_plural = "Threat Alert Signature Bands"
+        indexes = [
+            models.Index(fields=['band', 'bucket'], name='threat_band_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.alert_id} band {self.band}: {self.bucket}"
+
+
+class FuzzyTerm(models.Model):
+    """Distinct normalised word indexed for typo-tolerant lookup (see collect/fuzzy.py)."""
+    term = models.CharField(max_length=64, unique=True)
+    grams = models.PositiveSmallIntegerField(help_text="Number of distinct trigrams in the term")
+    frequency = models.PositiveIntegerField(default=0, help_text="Number of records containing the term")
+
+    class Meta:
+        verbose_name = "Fuzzy Term"
+        verbose_name_plural = "Fuzzy Terms"
+
+    def __str__(self):
+        return self.term
+
+
+class FuzzyTrigram(models.Model):
+    """Trigram -> term posting."""
+    trigram = models.CharField(max_length=3)
+    term = models.ForeignKey(FuzzyTerm, on_delete=models.CASCADE, related_name='trigrams')
+
+    class Meta:
+        verbose_name = "Fuzzy Trigram"
+        verbose_name_plural = "Fuzzy Trigrams"
+        indexes = [
+            models.Index(fields=['trigram', 'term'], name='fuzzy_trigram_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.trigram!r} -> {self.term_id}"
+
+
+class FuzzyPosting(models.Model):
+    """Term -> record posting; ``kind`` is the model name, ``weight`` the best field weight."""
+    term = models.ForeignKey(FuzzyTerm, on_delete=models.CASCADE, related_name='postings')
+    kind = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    weight = models.FloatField(default=1.0)
+
+    class Meta:
+        verbose_name = "Fuzzy Posting"
+        verbose_name_plural = "Fuzzy Postings"
+        indexes = [
+            # Covering, and ordered so the best postings of a term are a short range scan
+            models.Index(fields=['term', 'kind', 'weight', 'object_id'], name='fuzzy_posting_term_idx'),
+            models.Index(fields=['kind', 'object_id', 'term', 'weight'], name='fuzzy_posting_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term_id} -> {self.kind}#{self.object_id}"
+
+
+class MediaBlob(models.Model):
+    """Reference count for one content-addressed file under ``media/blobs/`` (see collect/storage.py)."""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0, help_text="Size in bytes")
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Media Blob"
+        verbose_name_plural = "Media Blobs"
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} ref)"
+
+
+class CacheGeneration(models.Model):
+    """Generation counter of one model for the versioned cache keys of ``collect/cache.py``."""
+    label = models.CharField(max_length=100, unique=True, help_text="Model label, e.g. collect.threatalert")
+    value = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = "Cache Generation"
+        verbose_name_plural = "Cache Generations"
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"{self.label} @ {self.value}"
@@ -0,0 +1,233 @@
+# collect/pagination.py
+"""
+Keyset ("cursor") pagination shared by every list view.
+
+Pages are fetched with ``WHERE (timestamp, id) < (last_timestamp, last_id)``
+instead of ``LIMIT/OFFSET``, so page 500 costs the same as page 1 and no
+``COUNT(*)`` is needed to render a page. Cursors are opaque URL-safe tokens;
+a missing or mangled token simply yields the first page, and so does one whose
+values don't convert to the types of the ordering columns (``cursor_values``).
+
+The page object keeps the attribute names the templates already use
+(``has_previous``, ``has_next``, ``number``, ``paginator.count`` ...) and adds
+``first_url`` / ``previous_url`` / ``next_url`` / ``last_url`` that preserve the
+rest of the query string.
+"""
+import base64
+import binascii
+import datetime
+import json
+import math
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+CURSOR_PARAM = 'cursor'
+
+FIRST, NEXT, PREVIOUS, LAST = 'f', 'n', 'p', 'l'
+
+
+def encode_cursor(direction, values=None, number=1):
+    payload = json.dumps({'d': direction, 'v': values or [], 'n': number}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(direction, values, number); anything unreadable means "first page"."""
+    if not token:
+        return FIRST, [], 1
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction, values, number = payload['d'], payload['v'], int(payload['n'])
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        return FIRST, [], 1
+    if direction not in (NEXT, PREVIOUS, LAST) or not isinstance(values, list):
+        return FIRST, [], 1
+    return direction, values, max(number, 1)
+
+
+def cursor_values(queryset, names, values):
+    """
+    ``values`` converted by the fields (or annotations) ``names`` of ``queryset``,
+    or None when the count is wrong or any value is null or invalid.
+    """
+    if not isinstance(values, list) or len(values) != len(names):
+        return None
+    cleaned = []
+    for name, value in zip(names, values):
+        annotation = queryset.query.annotations.get(name)
+        try:
+            field = annotation.output_field if annotation is not None else queryset.model._meta.get_field(name)
+            value = field.to_python(value)
+            if value is None:
+                return None
+            field.run_validators(value)  # e.g. the integer range of the column
+        except (FieldDoesNotExist, ValidationError, ValueError, TypeError, OverflowError):
+            return None
+        if settings.USE_TZ and isinstance(value, datetime.datetime) and timezone.is_naive(value):
+            value = timezone.make_aware(value, datetime.timezone.utc)
+        cleaned.append(value)
+    return cleaned
+
+
+def _plain(value):
+    """JSON-safe cursor value; datetimes keep full microsecond precision."""
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class CursorPaginator:
+    """
+    ``ordering`` lists the keyset columns, e.g. ``('-timestamp', '-id')``; the last
+    one must be unique so every row has a distinct position.
+
+    ``count`` is optional and only used for the "Page X of Y" / total labels. Pass
+    an int (e.g. from the rollup table) or a callable; without it the queryset is
+    counted lazily, and only if a template actually asks.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-timestamp', '-id'), count=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.keys = [(key.lstrip('-'), key.startswith('-')) for key in ordering]
+        self._count = count
+
+    @cached_property
+    def count(self):
+        if self._count is None:
+            return self.queryset.count()
+        return self._count() if callable(self._count) else self._count
+
+    @property
+    def num_pages(self):
+        return max(1, math.ceil(self.count / self.per_page))
+
+    def _ordering(self, reverse=False):
+        return [('-' if descending != reverse else '') + name for name, descending in self.keys]
+
+    def _beyond(self, values, reverse=False):
+        """
+        Q for rows strictly after ``values`` in (optionally reversed) ordering.
+
+        The leading ``timestamp <= v`` bound is redundant logically but lets SQLite
+        walk the index range in order instead of a MULTI-INDEX OR plus a sort.
+        """
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.keys, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        (first, descending), first_value = self.keys[0], values[0]
+        bound = 'lte' if descending != reverse else 'gte'
+        return Q(**{f'{first}__{bound}': first_value}) & condition
+
+    def position(self, obj):
+        return [_plain(getattr(obj, name)) for name, descending in self.keys]
+
+    def get_page(self, token=None, params=None):
+        direction, values, number = decode_cursor(token)
+        if direction in (NEXT, PREVIOUS):
+            values = cursor_values(self.queryset, [name for name, descending in self.keys], values)
+            if values is None:
+                direction, values, number = FIRST, [], 1
+
+        backwards = direction in (PREVIOUS, LAST)
+        queryset = self.queryset
+        if direction in (NEXT, PREVIOUS):
+            queryset = queryset.filter(self._beyond(values, reverse=backwards))
+        rows = list(queryset.order_by(*self._ordering(reverse=backwards))[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if direction == FIRST:
+            has_previous, has_next = False, more
+        elif direction == NEXT:
+            has_previous, has_next = True, more
+        elif direction == PREVIOUS:
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = more, False
+            number = self.num_pages
+        if not has_previous:
+            number = 1
+        return CursorPage(rows, self, number, has_previous, has_next, params)
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, number, has_previous, has_next, params=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.number = number
+        self._has_previous = has_previous
+        self._has_next = has_next
+        self.params = params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f'<Cursor page {self.number}>'
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    @property
+    def next_cursor(self):
+        if not (self._has_next and self.object_list):
+            return None
+        return encode_cursor(NEXT, self.paginator.position(self.object_list[-1]), self.number + 1)
+
+    @property
+    def previous_cursor(self):
+        if not (self._has_previous and self.object_list):
+            return None
+        return encode_cursor(PREVIOUS, self.paginator.position(self.object_list[0]), self.number - 1)
+
+    def _url(self, cursor):
+        params = (self.params if self.params is not None else QueryDict()).copy()
+        params.pop('page', None)
+        params.pop(CURSOR_PARAM, None)
+        if cursor:
+            params[CURSOR_PARAM] = cursor
+        return f'?{params.urlencode()}'
+
+    @property
+    def first_url(self):
+        return self._url(None)
+
+    @property
+    def previous_url(self):
+        return self._url(self.previous_cursor)
+
+    @property
+    def next_url(self):
+        return self._url(self.next_cursor)
+
+    @property
+    def last_url(self):
+        return self._url(encode_cursor(LAST))
+
+
+def paginate(request, queryset, per_page, ordering=('-timestamp', '-id'), count=None):
+    """Keyset-paginate ``queryset`` using the ``?cursor=`` parameter of ``request``."""
+    paginator = CursorPaginator(queryset, per_page, ordering, count=count)
+    return paginator.get_page(request.GET.get(CURSOR_PARAM), params=request.GET)
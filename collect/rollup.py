@@ -0,0 +1,71 @@
+# collect/rollup.py
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .cache import bump_on_commit
+from .models import ThreatAlert, ThreatAlertDailyRollup
+
+
+def rollup_key(alert):
+    """(date, category, severity, source) bucket that ``alert`` is counted in."""
+    timestamp = alert.timestamp or timezone.now()
+    day = timezone.localtime(timestamp, timezone.get_default_timezone()).date()
+    return (day, alert.category, alert.severity, alert.source)
+
+
+def apply_delta(key, delta):
+    """Add ``delta`` (usually +1 / -1) to a single rollup bucket."""
+    day, category, severity, source = key
+    bucket = ThreatAlertDailyRollup.objects.filter(
+        date=day, category=category, severity=severity, source=source,
+    )
+    with transaction.atomic():
+        if bucket.update(count=F('count') + delta):
+            if delta < 0:
+                bucket.filter(count__lte=0).delete()
+            return
+        if delta <= 0:
+            return
+        try:
+            with transaction.atomic():
+                ThreatAlertDailyRollup.objects.create(
+                    date=day, category=category, severity=severity, source=source, count=delta,
+                )
+        except IntegrityError:
+            # Another writer created the bucket between our update and insert
+            bucket.update(count=F('count') + delta)
+
+
+def apply_alerts(alerts, sign=1):
+    """Fold many alerts into the rollup at once, e.g. after ``bulk_create``."""
+    deltas = {}
+    for alert in alerts:
+        key = rollup_key(alert)
+        deltas[key] = deltas.get(key, 0) + sign
+    for key, delta in deltas.items():
+        if delta:
+            apply_delta(key, delta)
+
+
+def rebuild_rollup(batch_size=1000):
+    """Throw away every rollup row and recompute them from ThreatAlert in one grouped query."""
+    rows = (
+        ThreatAlert.objects.order_by()
+        .annotate(day=TruncDate('timestamp', tzinfo=timezone.get_default_timezone()))
+        .values('day', 'category', 'severity', 'source')
+        .annotate(count=Count('id'))
+    )
+    buckets = [
+        ThreatAlertDailyRollup(
+            date=row['day'], category=row['category'], severity=row['severity'],
+            source=row['source'], count=row['count'],
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        ThreatAlertDailyRollup.objects.all().delete()
+        ThreatAlertDailyRollup.objects.bulk_create(buckets, batch_size=batch_size)
+        bump_on_commit(ThreatAlert)
+    return len(buckets)
@@ -0,0 +1,38 @@
+# collect/routers.py
+"""
+Read/write split for the tuned SQLite profile (``DB_PROFILE`` in settings).
+
+'default' is the single writer: every write goes there, and with
+``transaction_mode='IMMEDIATE'`` a transaction takes the write lock when it
+begins, so concurrent writers queue on ``busy_timeout`` instead of failing
+with "database is locked" when a read transaction tries to upgrade. 'read'
+opens the same file with ``query_only``; in WAL mode its readers see the last
+commit and never wait for the writer.
+
+Reads stay on 'default' while it is inside a transaction (they must see its
+uncommitted rows) and when the database is in memory (the test suite), where
+a second connection would not share the test's transaction.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+
+READ_ALIAS = 'read'
+
+
+class ReadWriteRouter:
+
+    def db_for_read(self, model, **hints):
+        writer = connections[DEFAULT_DB_ALIAS]
+        if READ_ALIAS not in connections.settings or writer.in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if writer.vendor == 'sqlite' and writer.is_in_memory_db():
+            return DEFAULT_DB_ALIAS
+        return READ_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # both aliases are the same database
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,175 @@
+# collect/search.py
+"""
+Full-text search over ThreatAlert title/content/source.
+
+On SQLite builds with FTS5 an external-content index (``collect_threatalert_fts``)
+mirrors the alert table and is kept in sync by SQL triggers, so bulk inserts and
+``QuerySet.update()`` are indexed too. Other backends, or SQLite without FTS5,
+fall back to the original ``icontains`` filters.
+"""
+from django.db import DatabaseError, connections
+from django.db.models import FloatField, Q, TextField
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import ThreatAlert
+
+FTS_TABLE = 'collect_threatalert_fts'
+ALERT_TABLE = ThreatAlert._meta.db_table
+
+# bm25() column weights: a hit in the title matters most, then the source, then the body
+BM25_WEIGHTS = (10.0, 1.0, 4.0)
+# Keyset ordering of ranked results (bm25() is lower for better matches)
+RANKED_ORDERING = ('search_rank', '-timestamp', '-id')
+
+# Private-use markers so the snippet can be escaped before <mark> tags are added
+MARK_START = '\ue000'
+MARK_END = '\ue001'
+
+_CREATE_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content, source,
+        content='{ALERT_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {ALERT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content, source)
+        VALUES (new.id, new.title, new.content, new.source);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {ALERT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content, source)
+        VALUES ('delete', old.id, old.title, old.content, old.source);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, content, source ON {ALERT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content, source)
+        VALUES ('delete', old.id, old.title, old.content, old.source);
+        INSERT INTO {FTS_TABLE}(rowid, title, content, source)
+        VALUES (new.id, new.title, new.content, new.source);
+    END""",
+]
+
+_available = {}
+
+
+def ensure_search_index(using='default'):
+    """
+    Create the FTS5 table and triggers if they are missing and (re)build the index
+    when they were. Safe to call repeatedly; returns False when FTS5 is unavailable.
+
+    SQLite table rebuilds done by migrations drop the triggers, which is why this
+    runs after every ``migrate`` rather than living in a migration of its own.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f'{FTS_TABLE}_a_'],
+        )
+        triggers_present = cursor.fetchone()[0] == 3
+        try:
+            for statement in _CREATE_STATEMENTS:
+                cursor.execute(statement)
+        except DatabaseError:
+            _available[using] = False  # e.g. "no such module: fts5"
+            return False
+        if not triggers_present:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    _available[using] = True
+    return True
+
+
+def rebuild_search_index(using='default'):
+    """Recreate the index contents from the alert table."""
+    if not ensure_search_index(using):
+        return False
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def fts_available(using='default'):
+    if using not in _available:
+        connection = connections[using]
+        if connection.vendor != 'sqlite':
+            _available[using] = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+                )
+                _available[using] = cursor.fetchone() is not None
+    return _available[using]
+
+
+def build_match_query(query):
+    """
+    Turn free text into an FTS5 MATCH expression: every word must appear, and
+    each one matches as a prefix (``"cyber"*`` finds "cybercrime").
+    Quotes are escaped so user input can never be parsed as FTS5 syntax.
+    """
+    terms = [term.replace('"', '""') for term in query.split()]
+    return ' '.join(f'"{term}"*' for term in terms if term.strip('"'))
+
+
+def search_threats(queryset, query, snippet_words=16):
+    """
+    Filter ``queryset`` to alerts matching ``query``, best BM25 match first.
+
+    With FTS5 each row gets ``search_rank`` and ``search_snippet`` (plain text with
+    private-use highlight markers; render it through ``highlight_snippet``).
+    Without FTS5, or when ``query`` has no searchable term, this is the old
+    title/content/source ``icontains`` filter; ``search_ordering`` tells which.
+    """
+    match = build_match_query(query)
+    if not match or not fts_available(queryset.db):
+        return _contains(queryset, query)
+
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {ALERT_TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+    ).annotate(
+        search_rank=RawSQL(f'bm25({FTS_TABLE}, {weights})', (), output_field=FloatField()),
+        search_snippet=RawSQL(
+            f"snippet({FTS_TABLE}, 1, %s, %s, '…', %s)",
+            (MARK_START, MARK_END, snippet_words),
+            output_field=TextField(),
+        ),
+    ).order_by(*RANKED_ORDERING)
+
+
+def search_ordering(queryset):
+    """Keyset ordering for a ``search_threats`` result: by BM25 only if it was ranked."""
+    return RANKED_ORDERING if 'search_rank' in queryset.query.annotations else ('-timestamp', '-id')
+
+
+def filter_matches(queryset, query):
+    """
+    ``search_threats`` without ranking or snippets: only the matching rows, in
+    the queryset's own order (time-ordered pages and exports), so SQLite can
+    walk the timestamp index and stop at the LIMIT.
+    """
+    match = build_match_query(query)
+    if not match or not fts_available(queryset.db):
+        return _contains(queryset, query)
+    return queryset.filter(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,)))
+
+
+def _contains(queryset, query):
+    return queryset.filter(
+        Q(title__icontains=query) |
+        Q(content__icontains=query) |
+        Q(source__icontains=query)
+    )
+
+
+def highlight_snippet(snippet):
+    """Escape an FTS snippet and wrap the matched terms in ``<mark>``."""
+    if not snippet:
+        return ''
+    html = escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+    return mark_safe(html)
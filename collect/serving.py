@@ -0,0 +1,234 @@
+# collect/serving.py
+"""
+Production media view (replaces ``django.conf.urls.static``, which only works with DEBUG).
+
+* ``ETag`` / ``Last-Modified`` with 304 answers to conditional requests; blob
+  names embed their SHA-256, so the digest is the ETag and the response is
+  ``immutable`` for a year.
+* Single ``Range: bytes=...`` requests (and ``If-Range``) answered with 206, so
+  browsers can seek through trending videos without downloading them whole.
+* Bodies are ``FileResponse`` streams: WSGI servers with ``wsgi.file_wrapper``
+  (gunicorn, uWSGI) send them with ``sendfile()``, ranges included.
+* ``MEDIA_SENDFILE = 'x-accel-redirect'`` (nginx) or ``'x-sendfile'``
+  (Apache/lighttpd) hands the transfer to the front-end server after Django has
+  resolved the file, so no worker is held for the length of a download.
+
+``serve_static`` serves the CSS/JS built by ``manage.py build_assets``
+(collect/assets.py): fingerprinted names are ``immutable`` for a year, and the
+``.br`` / ``.gz`` file written next to each bundle is sent when the client
+accepts that encoding, so nothing is compressed per request.
+"""
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import BLOB_PREFIX, is_blob
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=3600'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOB_NAME_RE = re.compile(r'^[0-9a-f]{2}/([0-9a-f]{64})(\.[A-Za-z0-9]+)?$')
+# Built bundles and the files they reference: name.<12 hex>.ext (collect.assets.fingerprint)
+FINGERPRINT_RE = re.compile(r'\.([0-9a-f]{12})\.[A-Za-z0-9]+$')
+# Precompressed siblings, most preferred first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+class FileRange:
+    """
+    File-like window of ``length`` bytes starting at ``start``. ``fileno()`` is
+    kept so ``wsgi.file_wrapper`` can still ``sendfile()`` from the current offset.
+    """
+
+    def __init__(self, fh, start, length):
+        fh.seek(start)
+        self._fh = fh
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._fh.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._fh.fileno()
+
+    def close(self):
+        self._fh.close()
+
+
+def media_etag(path, st):
+    match = BLOB_NAME_RE.match(path[len(BLOB_PREFIX):]) if is_blob(path) else None
+    if match:
+        return f'"{match.group(1)}"'
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` (inclusive) for a single satisfiable byte range, ``None``
+    when the header should be ignored, or ``False`` when it can't be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None  # malformed or multiple ranges: reply with the whole file
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        start, end = max(size - int(last), 0), size - 1
+        if not int(last):
+            return False
+    if start >= size:
+        return False
+    return start, end
+
+
+def if_range_passes(request, etag, mtime):
+    value = request.META.get('HTTP_IF_RANGE')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag  # strong comparison only
+    return parse_http_date_safe(value) == int(mtime)
+
+
+@require_safe
+def serve_media(request, path, document_root=None):
+    document_root = document_root or settings.MEDIA_ROOT
+    try:
+        fullpath = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404("Media file not found")
+    try:
+        st = os.stat(fullpath)
+    except OSError:
+        raise Http404("Media file not found")
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404("Media file not found")
+
+    etag = media_etag(path, st)
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    headers = HttpResponse(content_type=content_type)
+    headers['ETag'] = etag
+    headers['Last-Modified'] = http_date(st.st_mtime)
+    headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if is_blob(path) else DEFAULT_CACHE_CONTROL
+    headers['Accept-Ranges'] = 'bytes'
+    headers['X-Content-Type-Options'] = 'nosniff'
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime), response=headers)
+    if conditional is not headers:
+        return conditional
+
+    sendfile = getattr(settings, 'MEDIA_SENDFILE', '')
+    if sendfile:
+        # The front-end server applies Range itself for offloaded files
+        if sendfile == 'x-accel-redirect':
+            prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+            headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + path.lstrip('/')
+        else:
+            headers['X-Sendfile'] = fullpath
+        return headers
+
+    byte_range = None
+    if request.META.get('HTTP_RANGE') and if_range_passes(request, etag, st.st_mtime):
+        byte_range = parse_range(request.META['HTTP_RANGE'], st.st_size)
+    if byte_range is False:
+        headers.status_code = 416
+        headers['Content-Range'] = f'bytes */{st.st_size}'
+        return headers
+
+    start, end = byte_range or (0, st.st_size - 1)
+    length = max(end - start + 1, 0)
+    if request.method == 'HEAD':
+        response = headers
+    else:
+        response = FileResponse(FileRange(open(fullpath, 'rb'), start, length), content_type=content_type)
+        for header, value in headers.items():
+            response[header] = value
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{st.st_size}'
+    return response
+
+
+def accepted_encodings(header):
+    """Content codings the client accepts (``q=0`` excluded)."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q=') and quality[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+@require_safe
+def serve_static(request, path):
+    """Files from STATIC_ROOT, falling back to the app static dirs before the first build."""
+    root = settings.STATIC_ROOT
+    fullpath = None
+    if root:
+        try:
+            fullpath = safe_join(root, path)
+        except SuspiciousFileOperation:
+            raise Http404("Static file not found")
+    if not fullpath or not os.path.isfile(fullpath):
+        fullpath = finders.find(path)
+    if not fullpath or not os.path.isfile(fullpath):
+        raise Http404("Static file not found")
+
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    encoding, variants = None, False
+    for coding, suffix in ENCODINGS:
+        if os.path.isfile(fullpath + suffix):
+            variants = True
+            if encoding is None and coding in accepted:
+                encoding, fullpath = coding, fullpath + suffix
+    st = os.stat(fullpath)
+
+    match = FINGERPRINT_RE.search(path)
+    # Each encoding is its own representation, so it gets its own validator
+    tag = match.group(1) if match else f'{st.st_mtime_ns:x}-{st.st_size:x}'
+    etag = f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+    response = HttpResponse(content_type=content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(st.st_mtime)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if match else DEFAULT_CACHE_CONTROL
+    response['X-Content-Type-Options'] = 'nosniff'
+    if variants:
+        response['Vary'] = 'Accept-Encoding'
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime), response=response)
+    if conditional is not response:
+        return conditional
+    if request.method != 'HEAD':
+        body = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+        del body['Content-Disposition']  # a .br/.gz file name would not describe the decoded body
+        for header, value in response.items():
+            body[header] = value
+        response = body
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(st.st_size)
+    return response
@@ -0,0 +1,192 @@
+# collect/signals.py
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_on_commit, ensure_generations
+from .classify import score_alerts
+from .dedup import index_alert, prepare_alert, promote_after_delete
+from .fuzzy import index_records, unindex_record
+from .live import alert_payload, current_payload, publish, publish_counts
+from .models import CacheGeneration, CurrentInformation, NewsSource, ThreatAlert
+from .rollup import apply_delta, rollup_key
+from .search import ensure_search_index
+from .storage import ContentAddressedStorage, is_blob
+
+
+@receiver(pre_save, sender=ThreatAlert)
+def remember_previous_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Remember the stored rollup bucket and media of an alert before it changes; re-cluster and re-score edited text."""
+    instance._rollup_key = None
+    if raw:
+        return
+    old = None
+    if instance.pk:
+        old = ThreatAlert.objects.filter(pk=instance.pk).only(
+            'timestamp', 'category', 'severity', 'source', 'image', 'video', 'minhash', 'cluster_id', 'is_duplicate'
+        ).first()
+        instance._rollup_key = rollup_key(old) if old else None
+    queue_media_processing(instance, old)
+    instance._signature_changed = False
+    if update_fields is None:  # partial saves leave the text, and so the cluster, alone
+        prepare_alert(instance, old)
+    if instance._signature_changed:
+        score_alerts([instance])
+    track_media_references(instance, old, MEDIA_FIELDS[ThreatAlert])
+
+
+def queue_media_processing(instance, old):
+    """New or replaced image/video -> let `manage.py process_media` pick the alert up."""
+    if not instance.has_media:
+        return
+    if old is None or old.image.name != instance.image.name or old.video.name != instance.video.name:
+        instance.media_status = 'pending'
+
+
+# Upload fields backed by collect.storage.ContentAddressedStorage
+MEDIA_FIELDS = {
+    ThreatAlert: ('image', 'video'),
+    NewsSource: ('image',),
+}
+
+
+def track_media_references(instance, old, fields):
+    """
+    Uploads count their own blob reference in storage._save(); a blob assigned by
+    name needs one added here. Replaced files are released once the save commits.
+    """
+    instance._released_media = []
+    for field in fields:
+        new = getattr(instance, field)
+        old_name = getattr(old, field).name if old else None
+        if new.name == old_name:
+            continue
+        if new.name and new._committed and isinstance(new.storage, ContentAddressedStorage):
+            new.storage.retain(new.name)
+        if old_name:
+            instance._released_media.append((new.storage, old_name))
+
+
+def release_media(instance, names):
+    for storage, name in names:
+        if isinstance(storage, ContentAddressedStorage) and is_blob(name):  # legacy files are left alone
+            transaction.on_commit(lambda storage=storage, name=name: storage.delete(name))
+
+
+@receiver(pre_save, sender=NewsSource)
+def remember_previous_logo(sender, instance, raw=False, **kwargs):
+    if raw:
+        instance._released_media = []
+        return
+    old = NewsSource.objects.filter(pk=instance.pk).only('image').first() if instance.pk else None
+    track_media_references(instance, old, MEDIA_FIELDS[NewsSource])
+
+
+@receiver(post_save, sender=NewsSource)
+@receiver(post_save, sender=ThreatAlert)
+def release_replaced_media(sender, instance, raw=False, **kwargs):
+    release_media(instance, getattr(instance, '_released_media', []))
+    instance._released_media = []
+
+
+@receiver(post_delete, sender=NewsSource)
+@receiver(post_delete, sender=ThreatAlert)
+def release_deleted_media(sender, instance, **kwargs):
+    release_media(instance, [
+        (getattr(instance, field).storage, getattr(instance, field).name)
+        for field in MEDIA_FIELDS[sender]
+        if getattr(instance, field).name
+    ])
+
+
+@receiver(post_save, sender=ThreatAlert)
+def cluster_saved_alert(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        index_alert(instance, created)
+
+
+@receiver(post_delete, sender=ThreatAlert)
+def promote_cluster_copy(sender, instance, **kwargs):
+    """Deleting the first alert of a story hands the cluster to its oldest copy."""
+    promote_after_delete(instance)
+
+
+@receiver(post_save, sender=ThreatAlert)
+def count_saved_alert(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new_key = rollup_key(instance)
+    old_key = getattr(instance, '_rollup_key', None)
+    if created or old_key is None:
+        apply_delta(new_key, 1)
+    elif old_key != new_key:
+        apply_delta(old_key, -1)
+        apply_delta(new_key, 1)
+
+
+@receiver(post_delete, sender=ThreatAlert)
+def uncount_deleted_alert(sender, instance, **kwargs):
+    apply_delta(rollup_key(instance), -1)
+
+
+@receiver(post_save, sender=ThreatAlert)
+@receiver(post_delete, sender=ThreatAlert)
+@receiver(post_save, sender=CurrentInformation)
+@receiver(post_delete, sender=CurrentInformation)
+@receiver(post_save, sender=NewsSource)
+@receiver(post_delete, sender=NewsSource)
+def invalidate_cached_aggregates(sender, **kwargs):
+    """Cached aggregates and page ETags (collect/conditional.py) depend on the generation."""
+    bump_on_commit(sender)
+
+
+@receiver(post_save, sender=ThreatAlert)
+def push_saved_alert(sender, instance, created, raw=False, **kwargs):
+    """Live channel: new alerts and severity changes, once committed."""
+    if raw:
+        return
+    old_key = getattr(instance, '_rollup_key', None)
+    if created or old_key is None:
+        severity = instance.severity
+        payload = None if instance.is_duplicate else alert_payload(instance)  # copies only move the counters
+        transaction.on_commit(lambda: (payload and publish('alert', payload), publish_counts({severity: 1})))
+    elif old_key[2] != instance.severity:
+        deltas = {old_key[2]: -1, instance.severity: 1}
+        transaction.on_commit(lambda: publish_counts(deltas))
+
+
+@receiver(post_delete, sender=ThreatAlert)
+def push_deleted_alert(sender, instance, **kwargs):
+    severity = instance.severity
+    transaction.on_commit(lambda: publish_counts({severity: -1}))
+
+
+@receiver(post_save, sender=CurrentInformation)
+def push_current_information(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        payload = current_payload(instance)
+        transaction.on_commit(lambda: publish('current', payload))
+
+
+@receiver(post_save, sender=NewsSource)
+@receiver(post_save, sender=CurrentInformation)
+def index_fuzzy_terms(sender, instance, created=False, **kwargs):
+    """Keep the trigram lookup (collect/fuzzy.py) in step with names, places and vehicles."""
+    index_records([instance], replace=not created)
+
+
+@receiver(post_delete, sender=NewsSource)
+@receiver(post_delete, sender=CurrentInformation)
+def unindex_fuzzy_terms(sender, instance, **kwargs):
+    unindex_record(sender, instance.pk)
+
+
+def install_search_index(sender, using='default', **kwargs):
+    """Recreate the FTS5 index/triggers after migrations (table rebuilds drop triggers)."""
+    ensure_search_index(using)
+
+
+def install_cache_generations(sender, using='default', **kwargs):
+    """Start the generation counters of this app's models, outside any request's query budget."""
+    if CacheGeneration._meta.db_table in connections[using].introspection.table_names():  # not after migrating back
+        ensure_generations(sender.get_models(), using)
@@ -0,0 +1,31 @@
+/* collect/static/collect/js/dashboard.js */
+/* templates/dashboard.html */
+document.getElementById('threatSearch').addEventListener('input', function() {
+  const searchValue = this.value.toLowerCase();
+  const rows = document.querySelectorAll('#threatTable tbody tr');
+
+  rows.forEach(row => {
+    const text = row.textContent.toLowerCase();
+    row.style.display = text.includes(searchValue) ? '' : 'none';
+  });
+});
+
+// ✅ Universal expandable cells
+document.addEventListener('click', function(e) {
+  if (e.target.closest('.expandable-cell')) {
+    const cell = e.target.closest('.expandable-cell');
+    const isExpanded = cell.classList.contains('expanded');
+
+    if (isExpanded) {
+      cell.textContent = cell.dataset.truncated;
+      cell.classList.remove('expanded');
+      cell.style.cursor = 'pointer';
+      cell.title = 'Click to expand';
+    } else {
+      cell.textContent = cell.dataset.full;
+      cell.classList.add('expanded');
+      cell.style.cursor = 'text';
+      cell.title = 'Click to collapse';
+    }
+  }
+});
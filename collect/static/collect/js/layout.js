@@ -0,0 +1,77 @@
+/* collect/static/collect/js/layout.js */
+/* templates/base.html */
+document.getElementById('current-year').textContent = new Date().getFullYear();
+
+document.addEventListener('DOMContentLoaded', () => {
+  const sidebar = document.getElementById('mainSidebar');
+  const toggle = document.getElementById('sidebarToggle');
+
+  if (localStorage.getItem('sidebarCollapsed') === 'true') {
+    sidebar.classList.add('collapsed');
+  }
+
+  toggle?.addEventListener('click', () => {
+    sidebar.classList.toggle('collapsed');
+    localStorage.setItem('sidebarCollapsed', sidebar.classList.contains('collapsed'));
+  });
+});
+
+/* templates/sidebar_menu.html */
+document.addEventListener('DOMContentLoaded', () => {
+  // Auto-expand submenu if child is active
+  const activeSubItem = document.querySelector('.nav-link.active');
+  if (activeSubItem && activeSubItem.closest('.collapse')) {
+    const parentCollapse = activeSubItem.closest('.collapse');
+    const parentToggle = document.querySelector(`[href="#${parentCollapse.id}"]`);
+    if (parentToggle) {
+      parentToggle.classList.remove('collapsed');
+      parentCollapse.classList.add('show');
+    }
+  }
+});
+
+/* templates/sweet_alert.html */
+// 🌟 Global reusable alert function
+function showAlert(type, message) {
+  const config = {
+    success: { icon: 'success', title: 'Success!', timer: 3000, timerProgressBar: true },
+    error: { icon: 'error', title: 'Error!', timer: null },
+    warning: { icon: 'warning', title: 'Warning!', timer: null },
+    info: { icon: 'info', title: 'Info!', timer: 2500 }
+  }[type] || { icon: 'info', title: 'Notification!' };
+
+  Swal.fire({
+    icon: config.icon,
+    title: config.title,
+    text: message,
+    confirmButtonColor: type === 'success' ? '#1d4ed8' : '#6b7280',
+    timer: config.timer,
+    timerProgressBar: config.timerProgressBar,
+    didOpen: (popup) => {
+      if (config.timer) {
+        popup.onmouseenter = Swal.stopTimer;
+        popup.onmouseleave = Swal.resumeTimer;
+      }
+    }
+  });
+}
+
+// 🔄 Auto-show if Django messages exist
+document.addEventListener('DOMContentLoaded', () => {
+  // From Django messages (if passed)
+  const alertType = document.getElementById('sweet-alert-type');
+  const alertMessage = document.getElementById('sweet-alert-message');
+
+  if (alertType && alertMessage) {
+    showAlert(alertType.value, alertMessage.value);
+  }
+
+  // From URL params (fallback)
+  const urlParams = new URLSearchParams(window.location.search);
+  const type = urlParams.get('alert');
+  const msg = urlParams.get('message');
+  if (type && msg) {
+    showAlert(type, decodeURIComponent(msg));
+    history.replaceState(null, null, window.location.pathname);
+  }
+});
@@ -0,0 +1,75 @@
+/* collect/static/collect/js/login.js */
+/* templates/login.html */
+// Create animated background particles
+function createParticles() {
+    const particlesContainer = document.getElementById('particles');
+    const particleCount = 20;
+
+    for (let i = 0; i < particleCount; i++) {
+        const particle = document.createElement('div');
+        particle.classList.add('particle');
+
+        // Random properties
+        const size = Math.random() * 100 + 20;
+        const posX = Math.random() * 100;
+        const posY = Math.random() * 100;
+        const opacity = Math.random() * 0.1 + 0.05;
+        const animationDuration = Math.random() * 30 + 20;
+
+        particle.style.width = `${size}px`;
+        particle.style.height = `${size}px`;
+        particle.style.left = `${posX}%`;
+        particle.style.top = `${posY}%`;
+        particle.style.opacity = opacity;
+        particle.style.animation = `float ${animationDuration}s infinite linear`;
+
+        particlesContainer.appendChild(particle);
+    }
+
+    // Add floating animation
+    const style = document.createElement('style');
+    style.textContent = `
+        @keyframes float {
+            0% { transform: translate(0, 0) rotate(0deg); }
+            25% { transform: translate(${Math.random() * 50 - 25}px, ${Math.random() * 50 - 25}px) rotate(90deg); }
+            50% { transform: translate(${Math.random() * 50 - 25}px, ${Math.random() * 50 - 25}px) rotate(180deg); }
+            75% { transform: translate(${Math.random() * 50 - 25}px, ${Math.random() * 50 - 25}px) rotate(270deg); }
+            100% { transform: translate(0, 0) rotate(360deg); }
+        }
+    `;
+    document.head.appendChild(style);
+}
+
+// Form submission handler
+document.getElementById('loginForm').addEventListener('submit', function(e) {
+    e.preventDefault();
+
+    const username = document.getElementById('username').value;
+    const password = document.getElementById('password').value;
+    const button = document.querySelector('.btn-login');
+
+    // Simple validation
+    if (username.trim() === '' || password.trim() === '') {
+        alert('Please enter both username and password.');
+        return;
+    }
+
+    // Show loading state
+    button.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i> AUTHENTICATING...';
+    button.disabled = true;
+
+    // Simulate authentication process
+    setTimeout(function() {
+        // In a real application, you would send credentials to server here
+        // For demo purposes, we'll just show a success message
+        alert('Authentication successful! Redirecting to intelligence dashboard...');
+        button.innerHTML = 'ACCESS SYSTEM';
+        button.disabled = false;
+
+        // In a real app, you would redirect to the dashboard
+        // window.location.href = '/dashboard';
+    }, 2000);
+});
+
+// Initialize particles when page loads
+window.addEventListener('load', createParticles);
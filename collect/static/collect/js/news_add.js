@@ -0,0 +1,183 @@
+/* collect/static/collect/js/news_add.js */
+/* templates/news_add.html */
+document.addEventListener('DOMContentLoaded', function() {
+    const form = document.getElementById('threatForm');
+
+    // Form validation
+    form.addEventListener('submit', function(e) {
+        const requiredFields = form.querySelectorAll('[required]');
+        let isValid = true;
+
+        requiredFields.forEach(field => {
+            if (!field.value.trim()) {
+                field.classList.add('is-invalid');
+                isValid = false;
+            } else {
+                field.classList.remove('is-invalid');
+            }
+        });
+
+        if (!isValid) {
+            e.preventDefault();
+            alert('Please fill in all required fields.');
+        }
+    });
+
+    // Remove invalid state on input
+    form.querySelectorAll('[required]').forEach(field => {
+        field.addEventListener('input', function() {
+            if (this.value.trim()) {
+                this.classList.remove('is-invalid');
+            }
+        });
+    });
+});
+
+/* Resumable chunked video upload (collect/uploads.py). The video starts uploading
+   as soon as it is picked; on submit only its upload id is posted. Browsers
+   without fetch/Blob.slice keep the plain multipart upload. */
+document.addEventListener('DOMContentLoaded', function() {
+    const form = document.getElementById('threatForm');
+    const input = document.getElementById('videoInput');
+    const hidden = document.getElementById('videoUploadId');
+    const progress = document.getElementById('videoProgress');
+    const status = document.getElementById('videoUploadStatus');
+    if (!form || !input || !hidden || !window.fetch || !window.Blob || !Blob.prototype.slice) {
+        return;
+    }
+
+    const PARALLEL = 3;
+    const RETRIES = 5;
+    const csrf = form.querySelector('[name=csrfmiddlewaretoken]').value;
+    const endpoint = input.dataset.uploadUrl;
+    let current = null;  // {file, promise}
+
+    function storageKey(file) {
+        return 'video-upload:' + [file.name, file.size, file.lastModified].join(':');
+    }
+
+    function show(message, fraction, failed) {
+        progress.classList.remove('d-none');
+        status.classList.remove('d-none');
+        status.classList.toggle('text-danger', !!failed);
+        status.classList.toggle('text-muted', !failed);
+        status.textContent = message;
+        if (fraction !== null) {
+            progress.firstElementChild.style.width = Math.round(fraction * 100) + '%';
+        }
+    }
+
+    async function request(url, options) {
+        const response = await fetch(url, Object.assign({credentials: 'same-origin'}, options, {
+            headers: Object.assign({'X-CSRFToken': csrf}, (options || {}).headers),
+        }));
+        if (!response.ok) {
+            let message = response.statusText;
+            try { message = (await response.json()).error || message; } catch (e) { /* not JSON */ }
+            const error = new Error(message);
+            error.status = response.status;
+            throw error;
+        }
+        return response.status === 204 ? null : response.json();
+    }
+
+    async function checksum(blob) {
+        if (!window.crypto || !crypto.subtle) {
+            return null;  // plain http: the server still checks length
+        }
+        const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+        return 'sha256 ' + btoa(String.fromCharCode.apply(null, new Uint8Array(digest)));
+    }
+
+    async function resumeOrCreate(file) {
+        const saved = localStorage.getItem(storageKey(file));
+        if (saved) {
+            try {
+                return await request(endpoint + saved + '/');
+            } catch (e) {
+                localStorage.removeItem(storageKey(file));  // expired or finished
+            }
+        }
+        const upload = await request(endpoint, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({filename: file.name, size: file.size}),
+        });
+        localStorage.setItem(storageKey(file), upload.id);
+        return upload;
+    }
+
+    async function sendChunk(file, upload, index) {
+        const blob = file.slice(index * upload.chunk_size, Math.min(file.size, (index + 1) * upload.chunk_size));
+        const headers = {'Content-Type': 'application/octet-stream'};
+        const sum = await checksum(blob);
+        if (sum) {
+            headers['Upload-Checksum'] = sum;
+        }
+        for (let attempt = 0; ; attempt++) {
+            try {
+                return await request(endpoint + upload.id + '/' + index + '/', {method: 'PUT', headers: headers, body: blob});
+            } catch (e) {
+                // 4xx other than a checksum mismatch will not get better by retrying
+                const fatal = e.status && e.status < 500 && e.status !== 460;
+                if (fatal || attempt >= RETRIES) {
+                    throw e;
+                }
+                await new Promise(resolve => setTimeout(resolve, Math.min(30000, 1000 * 2 ** attempt)));
+            }
+        }
+    }
+
+    async function upload(file) {
+        const session = await resumeOrCreate(file);
+        const queue = session.missing.slice();
+        let done = session.chunks - queue.length;
+        show('Uploading video…', done / session.chunks);
+        async function worker() {
+            while (queue.length) {
+                await sendChunk(file, session, queue.shift());
+                done++;
+                show('Uploading video… ' + Math.round(done / session.chunks * 100) + '%', done / session.chunks);
+            }
+        }
+        await Promise.all(Array.from({length: Math.min(PARALLEL, queue.length)}, worker));
+        show('Video uploaded', 1);
+        return session.id;
+    }
+
+    input.addEventListener('change', function() {
+        hidden.value = '';
+        const file = input.files[0];
+        if (!file) {
+            current = null;
+            return;
+        }
+        const promise = upload(file);
+        current = {file: file, promise: promise};
+        promise.catch(e => show('Video upload failed: ' + e.message, null, true));
+    });
+
+    form.addEventListener('submit', async function(e) {
+        if (e.defaultPrevented || !current) {
+            return;
+        }
+        e.preventDefault();
+        const pending = current;
+        try {
+            hidden.value = await pending.promise;
+        } catch (error) {
+            show('Video upload failed: ' + error.message, null, true);
+            return;
+        }
+        localStorage.removeItem(storageKey(pending.file));
+        input.disabled = true;  // the bytes are already on the server
+        form.submit();
+    });
+
+    form.addEventListener('reset', function() {
+        current = null;
+        hidden.value = '';
+        progress.classList.add('d-none');
+        status.classList.add('d-none');
+    });
+});
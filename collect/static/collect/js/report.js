@@ -0,0 +1,38 @@
+/* collect/static/collect/js/report.js */
+/* templates/news_report.html */
+document.addEventListener('DOMContentLoaded', function() {
+    const timeForm = document.getElementById('timeForm');
+    const dataset = document.getElementById('dataset');
+
+    // Default to the last 30 days
+    const now = new Date();
+    const monthAgo = new Date(now.getTime() - 30 * 24 * 60 * 60 * 1000);
+
+    const formatForInput = (date) => {
+        const local = new Date(date.getTime() - date.getTimezoneOffset() * 60000);
+        return local.toISOString().slice(0, 16);
+    };
+
+    document.getElementById('startDatetime').value = formatForInput(monthAgo);
+    document.getElementById('endDatetime').value = formatForInput(now);
+
+    // Category / severity only apply to threat alerts
+    const toggleFilters = () => {
+        document.querySelectorAll('.alert-filter').forEach((el) => {
+            el.style.display = dataset.value === 'alerts' ? '' : 'none';
+            el.querySelectorAll('select, input').forEach((input) => { input.disabled = dataset.value !== 'alerts'; });
+        });
+    };
+    dataset.addEventListener('change', toggleFilters);
+    toggleFilters();
+
+    timeForm.addEventListener('submit', function(e) {
+        const start = document.getElementById('startDatetime').value;
+        const end = document.getElementById('endDatetime').value;
+
+        if (start && end && new Date(end) < new Date(start)) {
+            e.preventDefault();
+            alert('End date/time must be after the start');
+        }
+    });
+});
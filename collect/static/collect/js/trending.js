@@ -0,0 +1,35 @@
+/* collect/static/collect/js/trending.js */
+/* templates/newsTrending.html */
+function shareThreat(threatId) {
+    const url = `${window.location.origin}/threat/${threatId}/`;
+    if (navigator.share) {
+        navigator.share({
+            title: 'Security Threat Alert',
+            url: url
+        });
+    } else {
+        navigator.clipboard.writeText(url);
+        alert('Threat URL copied to clipboard!');
+    }
+}
+
+function downloadVideo(videoUrl) {
+    const link = document.createElement('a');
+    link.href = videoUrl;
+    link.download = 'threat-video.mp4';
+    link.click();
+}
+
+// Auto-play video on hover (optional)
+document.addEventListener('DOMContentLoaded', function() {
+    const videos = document.querySelectorAll('.video-thumbnail');
+    videos.forEach(video => {
+        video.addEventListener('mouseenter', function() {
+            this.play();
+        });
+        video.addEventListener('mouseleave', function() {
+            this.pause();
+            this.currentTime = 0;
+        });
+    });
+});
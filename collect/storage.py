@@ -0,0 +1,268 @@
+# collect/storage.py
+"""
+Content-addressed storage for uploaded evidence and source logos.
+
+Every upload is hashed (SHA-256) while it is streamed to a temporary file and
+then kept once as ``blobs/<aa>/<digest><ext>``; uploading the same bytes again
+only adds a reference instead of another ``_LmKdrbM``-suffixed copy. A blob name
+never changes content, so blob URLs can be served with immutable cache headers.
+
+References are counted in ``MediaBlob``: saving a file or assigning an existing
+blob name adds one, replacing or deleting a row releases one (see
+``collect/signals.py``), a save that fails gives its references back
+(``saving_media``), and the file is removed with its last reference.
+``python manage.py dedupe_media`` moves the pre-existing tree into blobs and
+recomputes the counts from the rows that actually point at each blob.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import connections, models, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = 'blobs/'
+CHUNK_SIZE = 64 * 1024
+
+# References counted by the model save in progress: [(storage, name)], see saving_media()
+_counted = ContextVar('counted_references', default=None)
+
+
+def blob_name(digest, ext):
+    return f'{BLOB_PREFIX}{digest[:2]}/{digest}{ext.lower()}'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_PREFIX)
+
+
+def _blobs():
+    return apps.get_model('collect', 'MediaBlob').objects
+
+
+def add_reference(name, size=0, count=1):
+    """One upsert: create the blob's row or add ``count`` to it, race-free and without savepoints."""
+    model = _blobs().model
+    connection = connections[router.db_for_write(model)]
+    created_at = model._meta.get_field('created_at').get_db_prep_value(timezone.now(), connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {model._meta.db_table} (name, size, refcount, created_at) VALUES (%s, %s, %s, %s) '
+            f'ON CONFLICT(name) DO UPDATE SET refcount = refcount + excluded.refcount',
+            [name, size, count, created_at],
+        )
+
+
+@contextmanager
+def saving_media():
+    """
+    Wrap ``Model.save()``. Blob references are counted while the row is being
+    prepared (``_save``, ``retain``), before it is written; if the write fails
+    (a duplicate url) they are released again. Inside a transaction there is
+    nothing to do: its rollback takes them back with the row.
+    """
+    counted = []
+    token = _counted.set(counted)
+    try:
+        yield
+    except Exception:
+        if not connections[router.db_for_write(_blobs().model)].in_atomic_block:
+            for storage, name in counted:
+                storage.delete(name)
+        raise
+    finally:
+        _counted.reset(token)
+
+
+def release_reference(name):
+    """Drop one reference; returns True when nothing references the blob any more."""
+    blobs = _blobs()
+    with transaction.atomic():
+        blobs.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+        if blobs.filter(name=name, refcount__gt=0).exists():
+            return False
+        blobs.filter(name=name).delete()
+        return True
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # The stored name comes from the content in _save(), so never suffix it
+        return name
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1]
+        blob_dir = self.path(BLOB_PREFIX)
+        os.makedirs(blob_dir, exist_ok=True)
+
+        if hasattr(content, 'temporary_file_path'):
+            # Already on disk (large uploads, finished chunked uploads): hash it and move it, no copy.
+            # MediaUploadHandler hashed it on arrival (collect/upload_handlers.py).
+            path = content.temporary_file_path()
+            digest = getattr(content, 'sha256', None) or hash_file(path)
+            return self.store_hashed(path, digest, ext, os.path.getsize(path))
+
+        digest = hashlib.sha256()
+        size = 0
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        tmp = tempfile.NamedTemporaryFile(dir=blob_dir, prefix='.upload-', delete=False)
+        try:
+            with tmp:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            return self.store_hashed(tmp.name, digest.hexdigest(), ext, size)
+        finally:
+            if os.path.exists(tmp.name):
+                os.unlink(tmp.name)
+
+    def store_hashed(self, temp_path, digest, ext, size):
+        """Move an already-hashed temp file into place unless the blob exists; add a reference."""
+        name = blob_name(digest, ext)
+        full_path = self.path(name)
+        if not os.path.exists(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            file_move_safe(temp_path, full_path, allow_overwrite=True)  # a rename unless across filesystems
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+        self._count(name, size)
+        return name
+
+    def retain(self, name):
+        """Count a reference to a blob assigned by name rather than uploaded."""
+        if is_blob(name) and self.exists(name):
+            self._count(name, self.size(name))
+
+    def _count(self, name, size):
+        add_reference(name, size)
+        counted = _counted.get()
+        if counted is not None:
+            counted.append((self, name))
+
+    def delete(self, name):
+        if not is_blob(name):
+            return super().delete(name)
+        if release_reference(name):
+            super().delete(name)
+
+
+media_storage = ContentAddressedStorage()
+
+
+def get_media_storage():
+    """Storage callable for the upload fields (keeps the instance out of migrations)."""
+    return media_storage
+
+
+# ---------------------------------------------------------------------------
+# Migrating the existing tree
+# ---------------------------------------------------------------------------
+
+def content_addressed_fields():
+    """(model, field name) for every collect FileField stored in a ContentAddressedStorage."""
+    return [
+        (model, field.name)
+        for model in apps.get_app_config('collect').get_models()
+        for field in model._meta.get_fields()
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dedupe_media(dry_run=False, log=None):
+    """
+    Move every legacy (non-blob) file referenced by a content-addressed field
+    into ``blobs/``, repoint the rows, delete the originals and rebuild
+    ``MediaBlob`` refcounts. Archived alerts (collect/archive.py) are repointed
+    and counted as well. Returns a dict of totals; ``dry_run`` only reports.
+    """
+    from .archive import archived_media, rename_media  # imported here: the models import this module
+
+    log = log or (lambda message: None)
+    fields = content_addressed_fields()
+    stats = {'files': 0, 'blobs_created': 0, 'missing': 0, 'rows': 0, 'bytes_before': 0, 'bytes_saved': 0}
+
+    legacy = set()
+    for model, field in fields:
+        names = model.objects.exclude(**{f'{field}__startswith': BLOB_PREFIX}).exclude(
+            **{field: ''}
+        ).exclude(**{f'{field}__isnull': True}).values_list(field, flat=True).distinct()
+        legacy.update(names)
+    legacy.update(name for name in archived_media() if not is_blob(name))
+
+    mapping = {}
+    planned = set()
+    for name in sorted(legacy):
+        path = media_storage.path(name)
+        if not os.path.isfile(path):
+            stats['missing'] += 1
+            log(f"missing: {name}")
+            continue
+        size = os.path.getsize(path)
+        target = blob_name(hash_file(path), os.path.splitext(name)[1])
+        stats['files'] += 1
+        stats['bytes_before'] += size
+        if target in planned or media_storage.exists(target):
+            stats['bytes_saved'] += size
+        else:
+            planned.add(target)
+            stats['blobs_created'] += 1
+            if not dry_run:
+                full_path = media_storage.path(target)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                shutil.copyfile(path, full_path + '.part')
+                os.replace(full_path + '.part', full_path)
+        mapping[name] = target
+
+    if dry_run:
+        return stats
+
+    with transaction.atomic():
+        now = timezone.now()
+        for name, target in mapping.items():
+            for model, field in fields:
+                changes = {field: target}
+                if any(f.name == 'updated_at' for f in model._meta.concrete_fields):
+                    changes['updated_at'] = now  # the row's cached fragments show the old URL
+                stats['rows'] += model.objects.filter(**{field: name}).update(**changes)
+        rename_media(mapping)
+
+        # Archived alerts keep their references (collect/archive.py)
+        references = Counter({name: count for name, count in archived_media().items() if is_blob(name)})
+        for model, field in fields:
+            references.update(
+                model.objects.filter(**{f'{field}__startswith': BLOB_PREFIX}).values_list(field, flat=True)
+            )
+        MediaBlob = apps.get_model('collect', 'MediaBlob')
+        MediaBlob.objects.all().delete()
+        MediaBlob.objects.bulk_create([
+            MediaBlob(name=name, size=media_storage.size(name), refcount=count)
+            for name, count in references.items()
+            if media_storage.exists(name)
+        ])
+
+    for name in mapping:
+        os.unlink(media_storage.path(name))
+    return stats
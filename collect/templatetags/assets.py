@@ -0,0 +1,14 @@
+from django import template
+from django.utils.html import format_html_join
+
+from ..assets import asset_urls
+
+register = template.Library()
+
+
+@register.simple_tag
+def asset(name):
+    """``<link>`` / deferred ``<script>`` tags for bundle ``name`` (see collect/assets.py)."""
+    if name.endswith('.css'):
+        return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((url,) for url in asset_urls(name)))
+    return format_html_join('\n', '<script src="{}" defer></script>', ((url,) for url in asset_urls(name)))
@@ -1,3 +1,1400 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from html import unescape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from dataclasses import replace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, IntegrityError, connection
+from django.db.models import Count, F
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from . import views
+from .export import parquet_available
+from .fuzzy import rank, rebuild_fuzzy_index, similar_terms
+from .feeds import FeedPoller
+from .aggregates import compute_rollup_stats, compute_threat_stats, rollup_totals
+from .archive import archive_alerts, month_of, partitions, search_history
+from .assets import BUNDLES, build, prune
+from .benchmark import run_render, run_routes
+from .cache import cached, get_cache
+from .classify import classify_archive, train
+from .dedup import backfill_clusters
+from .ingest import ingest_alerts
+from .live import Broker, broker
+from .instrumentation import QueryBudgetAssertions, QueryBudgetExceeded, reset_stats, summarize
+from .media import run_pending
+from .rollup import rebuild_rollup
+from .pagination import LAST, NEXT, CursorPaginator, encode_cursor
+from .search import RANKED_ORDERING, filter_matches, fts_available, highlight_snippet, search_ordering, search_threats
+from .models import (
+    CacheGeneration, CurrentInformation, MediaBlob, NewsSource, NewsSourceFeedState, ThreatAlert, ThreatAlertDailyRollup,
+)
+from .storage import dedupe_media, media_storage
+from .synthetic import clear_synthetic, generate
+from .upload_handlers import IMAGE_RULE, MEDIA_RULES
+from .uploads import purge_stale_uploads
+
+
+class QueryPlanTests(TestCase):
+    """Every query a list/chart view runs against the big tables must be index-driven."""
+
+    TABLES = ('collect_threatalert', 'collect_currentinformation', 'collect_newssource')
+
+    URLS = [
+        '/dashboard/',
+        '/dashboard/?q=cyber',
+        '/search_news/',
+        '/search_news/?category=PM',
+        '/visualize_news/',
+        '/trending_news/',
+        '/current_news/',
+        '/spy_news/',
+        '/spy_news/?q=kathmando',
+        '/source_news/',
+        '/source_news/?search=sorce',
+        '/archive_news/',
+        '/archive_news/?q=cyber',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(40):
+            ThreatAlert.objects.create(
+                title=f'cyber alert {i}',
+                content='cyber crime report',
+                url=f'https://example.com/{i}',
+                severity=['critical', 'high', 'medium', 'low'][i % 4],
+                category=['PM', 'Scam', 'Other'][i % 3],
+                video='threat_alerts/videos/clip.mp4' if i % 2 else '',
+            )
+            CurrentInformation.objects.create(timing='now', location='Kathmandu', leader='Leader')
+            NewsSource.objects.create(name=f'Source {i % 7}', url='https://example.com')
+
+    def capture(self, url):
+        """Run ``url`` (and the page behind its first cursor link) and return (sql, params)."""
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            link = re.search(r'href="(\?[^"]*cursor=[^"]*)"', response.content.decode())
+            if link:
+                path = url.split('?')[0]
+                self.assertEqual(self.client.get(path + unescape(link.group(1))).status_code, 200)
+        return queries
+
+    def plan(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_views_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('query plans are asserted for SQLite only')
+        for url in self.URLS:
+            for sql, params in self.capture(url):
+                if not any(f'"{table}"' in sql for table in self.TABLES):
+                    continue
+                plan = self.plan(sql, params)
+                for step in plan:
+                    with self.subTest(url=url, sql=sql[:120], step=step):
+                        self.assertNotRegex(step, rf'^SCAN ({"|".join(self.TABLES)})$')
+                        # bm25 order is computed per match; fuzzy ranks sort at most fuzzy.MAX_RESULTS rows
+                        if 'collect_threatalert_fts' not in sql and 'CASE WHEN' not in sql:
+                            self.assertNotIn('TEMP B-TREE FOR ORDER BY', step)
+
+    def test_search_totals_skip_ranking(self):
+        get_cache().clear()
+        for sql, params in self.capture('/dashboard/?q=cyber'):
+            if 'COUNT(' in sql:
+                with self.subTest(sql=sql[:120]):
+                    self.assertNotIn('bm25(', sql)
+                    self.assertNotIn('snippet(', sql)
+                    self.assertNotIn('"collect_threatalert_fts"', sql)  # search_threats' ranking join
+
+
+class QueryBudgetTests(QueryBudgetAssertions, TestCase):
+    """Hot pages must stay within their @query_budget, for anonymous and signed-in users."""
+
+    setUpTestData = QueryPlanTests.setUpTestData
+    URLS = QueryPlanTests.URLS + ['/adding_new/', '/report_news/', '/login/']
+
+    def test_views_within_budget(self):
+        reset_stats()
+        for url in self.URLS:
+            with self.subTest(url=url):
+                response = self.assertWithinQueryBudget(url)
+                self.assertIn('db;dur=', response['Server-Timing'])
+
+        self.client.force_login(User.objects.create_user('analyst', is_staff=True))
+        for url in self.URLS:
+            with self.subTest(url=url, user='analyst'):
+                self.assertWithinQueryBudget(url)
+
+        stats = self.client.get('/_stats/requests/').json()['views']
+        self.assertEqual(stats['dashboard']['requests'], 4)
+        self.assertEqual(summarize()['dashboard']['budget'], 7)
+
+    def test_report_submission_within_budget(self):
+        for n in range(2):  # the first report of the day also creates its rollup bucket
+            with self.subTest(report=n):
+                response = self.assertWithinQueryBudget('/adding_new/', {
+                    'title': f'Phishing wave {n}', 'description': f'Fake bank SMS number {n} asks for OTP codes',
+                    'url': f'https://example.com/phishing-{n}', 'severity': 'high',
+                })
+                self.assertContains(response, 'saved successfully')
+        alert = ThreatAlert.objects.get(url='https://example.com/phishing-1')
+        self.assertEqual(alert.cluster_id, alert.pk)
+
+        for location in ('Birgunj checkpoint', 'Birgunj checkpoint'):  # new words for the fuzzy index, then known ones
+            with self.subTest(location=location):
+                response = self.assertWithinQueryBudget('/spy_news/', {
+                    'timing': '2025-01-01 10:00', 'location': location, 'leader': 'Hari', 'status': 'pending',
+                })
+                self.assertContains(response, 'submitted successfully')
+
+    def test_cold_start_within_budget(self):
+        # Counters are created by migrate, not by the first request that reads them
+        self.assertTrue(CacheGeneration.objects.filter(label='collect.threatalert').exists())
+        self.client.force_login(User.objects.create_user('analyst', is_staff=True))
+        for url in ('/dashboard/?q=cyber', '/dashboard/'):
+            with self.subTest(url=url), mock.patch.dict('collect.search._available', clear=True):
+                get_cache().clear()
+                self.assertWithinQueryBudget(url)
+
+    def test_over_budget_fails_under_the_test_runner(self):
+        self.assertTrue(settings.QUERY_BUDGET_STRICT)
+        with mock.patch.object(views.dashboard, 'query_budget', 1):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'dashboard ran'):
+                self.client.get('/dashboard/')
+            with override_settings(QUERY_BUDGET_STRICT=False), self.assertLogs('collect.instrumentation', 'WARNING'):
+                self.assertEqual(self.client.get('/dashboard/').status_code, 200)
+
+    def test_template_time_is_measured_per_request(self):
+        response = self.client.get('/dashboard/')
+        self.assertGreater(response.metrics.template_time, 0)
+        self.assertNotIn('tpl;dur=0.0,', response['Server-Timing'])
+
+
+class CursorPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        for i in range(12):
+            ThreatAlert.objects.create(title=f'paged {i}', content='c', url=f'https://example.com/paged/{i}')
+        # Ties: four rows share each timestamp, so only the id separates them
+        for i, alert in enumerate(ThreatAlert.objects.order_by('id')):
+            ThreatAlert.objects.filter(pk=alert.pk).update(timestamp=now - timedelta(hours=i // 4))
+        cls.expected = list(ThreatAlert.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+
+    def page(self, token=None):
+        return CursorPaginator(ThreatAlert.objects.all(), 5).get_page(token)
+
+    def ids(self, page):
+        return [alert.id for alert in page]
+
+    def test_next_previous_and_last_pages(self):
+        first = self.page()
+        self.assertEqual((self.ids(first), first.has_previous(), first.has_next()), (self.expected[:5], False, True))
+        second = self.page(first.next_cursor)
+        self.assertEqual((self.ids(second), second.number), (self.expected[5:10], 2))
+        third = self.page(second.next_cursor)
+        self.assertEqual((self.ids(third), third.has_next()), (self.expected[10:], False))
+
+        back = self.page(third.previous_cursor)
+        self.assertEqual((self.ids(back), back.number, back.has_next()), (self.expected[5:10], 2, True))
+        self.assertEqual(self.ids(self.page(back.previous_cursor)), self.expected[:5])
+
+        last = self.page(encode_cursor(LAST))
+        self.assertEqual((self.ids(last), last.number), (self.expected[7:], 3))
+        self.assertEqual(self.ids(self.page(last.previous_cursor)), self.expected[2:7])
+
+    def test_bad_cursors_fall_back_to_the_first_page(self):
+        stamp = timezone.now().isoformat()
+        for values in (['garbage', 1], [stamp, 'x'], [None, None], [stamp], [stamp, 10 ** 30], 'not a list'):
+            with self.subTest(values=values):
+                page = self.page(encode_cursor(NEXT, values, 4))
+                self.assertEqual((self.ids(page), page.number), (self.expected[:5], 1))
+        self.assertEqual(self.ids(self.page('%%%')), self.expected[:5])
+
+    def test_views_ignore_bad_cursors(self):
+        for url, values in [
+            ('/dashboard/', ['garbage', 1]),
+            ('/dashboard/', ['2025-01-01T00:00:00+00:00', 'x']),
+            ('/current_news/', [None, None]),
+            ('/archive_news/', ['2025-01-01T00:00:00+00:00', 'x']),
+            ('/archive_news/', ['garbage', 1]),
+        ]:
+            with self.subTest(url=url, values=values):
+                response = self.client.get(url, {'cursor': encode_cursor(NEXT, values, 2)})
+                self.assertEqual(response.status_code, 200)
+
+    def test_search_without_terms_pages_by_time(self):
+        # Only quotes: no FTS term, so search_threats falls back to icontains without a rank
+        ThreatAlert.objects.create(title='say "hi"', content='c', url='https://example.com/quoted')
+        response = self.client.get('/dashboard/', {'q': '"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([threat.title for threat in response.context['threats']], ['say "hi"'])
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.title_hit = ThreatAlert.objects.create(
+            title='Phishing wave', content='Banks warn customers.', url='https://example.com/s/1')
+        cls.body_hit = ThreatAlert.objects.create(
+            title='Weekly roundup', content='One phishing kit and some other news.', url='https://example.com/s/2')
+        cls.html = ThreatAlert.objects.create(
+            title='Kit sold', content='<script>alert(1)</script> phishing <b>kit</b> & more', url='https://example.com/s/3')
+        cls.other = ThreatAlert.objects.create(
+            title='Army drill', content='Routine exercise.', url='https://example.com/s/4')
+
+    def test_ranked_search_prefers_title_hits_and_matches_prefixes(self):
+        self.assertTrue(fts_available())
+        results = list(search_threats(ThreatAlert.objects.all(), 'phish'))
+        self.assertEqual(results[0], self.title_hit)
+        self.assertEqual(set(results), {self.title_hit, self.body_hit, self.html})
+        self.assertEqual([row.search_rank for row in results], sorted(row.search_rank for row in results))
+        self.assertEqual(search_ordering(search_threats(ThreatAlert.objects.all(), 'phish')), RANKED_ORDERING)
+        self.assertEqual(set(filter_matches(ThreatAlert.objects.all(), 'phishing kit')), {self.body_hit, self.html})
+
+    def test_operators_and_quotes_are_matched_as_text(self):
+        for query in ['"', '" "', 'phishing OR army', 'NOT phishing', 'title:army', 'NEAR(phishing kit)', 'kit*', '^kit']:
+            with self.subTest(query=query):
+                list(search_threats(ThreatAlert.objects.all(), query))  # never an FTS5 syntax error
+                list(filter_matches(ThreatAlert.objects.all(), query))
+        self.assertEqual(list(search_threats(ThreatAlert.objects.all(), 'phishing OR army')), [])
+        quotes = search_threats(ThreatAlert.objects.all(), '" "')
+        self.assertNotIn('search_rank', quotes.query.annotations)
+        self.assertEqual(search_ordering(quotes), ('-timestamp', '-id'))
+        self.assertEqual(self.client.get('/dashboard/', {'q': 'NEAR(phishing'}).status_code, 200)
+
+    def test_snippet_html_is_escaped_around_the_marks(self):
+        row = search_threats(ThreatAlert.objects.filter(pk=self.html.pk), 'phishing').get()
+        snippet = highlight_snippet(row.search_snippet)
+        self.assertIn('&lt;script&gt;alert(1)&lt;/script&gt;', snippet)
+        self.assertIn('<mark>phishing</mark>', snippet)
+        self.assertIn('&lt;b&gt;kit&lt;/b&gt; &amp; more', snippet)
+        self.assertEqual(highlight_snippet(''), '')
+
+        response = self.client.get('/dashboard/', {'q': 'phishing'})
+        self.assertContains(response, '<mark>phishing</mark>')
+        self.assertContains(response, '&lt;script&gt;')
+        self.assertNotContains(response, '<script>alert(1)')
+
+    def test_contains_fallback_without_fts(self):
+        with mock.patch('collect.search.fts_available', return_value=False):
+            results = search_threats(ThreatAlert.objects.all(), 'PHISHING kit')
+            self.assertNotIn('search_rank', results.query.annotations)
+            self.assertEqual(set(results), {self.body_hit})  # one icontains phrase, not separate words
+            self.assertEqual(set(filter_matches(ThreatAlert.objects.all(), 'army')), {self.other})
+            response = self.client.get('/dashboard/', {'q': 'phishing'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {threat.pk for threat in response.context['threats']}, {self.title_hit.pk, self.body_hit.pk, self.html.pk}
+        )
+
+
+class ConditionalGetTests(TestCase):
+
+    def test_unchanged_pages_answer_304_without_rendering(self):
+        info = CurrentInformation.objects.create(timing='now', location='Kathmandu', leader='Ram')
+        response = self.client.get('/current_news/')
+        etag = response['ETag']
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(1):  # the validator lookup only
+            response = self.client.get('/current_news/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        response = self.client.get('/current_news/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(self.client.get('/current_news/?cursor=x')['ETag'], etag)
+
+        # In-place edits and deletions (generation) and new rows (max id) all change the ETag
+        with self.captureOnCommitCallbacks(execute=True):
+            info.status = 'completed'
+            info.save()
+        response = self.client.get('/current_news/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Kathmandu')
+        etag = response['ETag']
+        CurrentInformation.objects.create(timing='later', location='Pokhara', leader='Sita')
+        response = self.client.get('/current_news/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            CurrentInformation.objects.filter(location='Pokhara').delete()
+        self.assertEqual(self.client.get('/current_news/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get('/visualize_news/')['ETag']
+        self.assertEqual(self.client.get('/visualize_news/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        ThreatAlert.objects.create(title='t', content='c', url='https://example.com/etag')
+        self.assertEqual(self.client.get('/visualize_news/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class SyntheticBenchmarkTests(TestCase):
+
+    def test_generate_benchmark_and_clear(self):
+        rows = generate(400, seed=7)
+        self.assertEqual(rows, {'sources': 10, 'alerts': 400, 'current': 40})
+        totals = rollup_totals()
+        self.assertEqual(totals['total'], 400)
+        self.assertGreater(totals['low'], totals['critical'])
+        self.assertLess(ThreatAlert.objects.order_by('timestamp').first().timestamp,
+                        timezone.now() - timedelta(days=30))
+
+        results = run_routes(repeat=1, warmup=0)
+        self.assertIn('dashboard?q=phishing', results)
+        self.assertEqual({result['status'] for result in results.values()}, {200})
+        render = run_render(paths=['/dashboard/'], repeat=1, warmup=1)
+        self.assertGreater(render['/dashboard/']['baseline_p50_ms'], 0)
+
+        self.assertEqual(clear_synthetic(), {'alerts': 400, 'current': 40, 'sources': 10})
+        self.assertEqual(rollup_totals()['total'], 0)
+
+
+class ConcurrencyStressTests(SimpleTestCase):
+
+    def test_tuned_profile_has_no_lock_errors_under_concurrent_posts(self):
+        # Own process and throwaway file database: the suite's in-memory database can't show WAL behaviour
+        output = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'stress_db', '--json',
+             '--alerts', '200', '--writers', '4', '--readers', '4', '--requests', '12'],
+            capture_output=True, text=True, timeout=300, env={**os.environ, 'DB_PROFILE': 'tuned'},
+        )
+        self.assertEqual(output.returncode, 0, output.stderr)
+        result = json.loads(output.stdout)
+        self.assertEqual(result['journal_mode'], 'wal')
+        self.assertEqual((result['writes'], result['reads']), (48, 48))
+        self.assertEqual(result['failed'], 0, result['failures'])
+
+
+class AggregateTests(TestCase):
+    """The grouped aggregates match the per-query counts newsVisualization used to run."""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        for i in range(40):
+            alert = ThreatAlert.objects.create(
+                title=f'agg {i}', content='c', url=f'https://example.com/agg/{i}',
+                severity=['low', 'medium', 'high', 'critical', 'high'][i % 5],
+                category=['PM', 'Scam', 'Other', 'Army'][i % 4],
+                source=['tiktok', 'facebook', '', 'x'][i % 3],
+            )
+            day = today - timedelta(days=1 + i % 6)  # local noon: the same calendar day in UTC
+            stamp = timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=12))
+            ThreatAlert.objects.filter(pk=alert.pk).update(timestamp=stamp)
+
+    def old_counts(self):
+        """The per-severity, per-day queries of the original view."""
+        threats = ThreatAlert.objects.all()
+        days = {}
+        for threat in threats:
+            days[threat.timestamp.date()] = days.get(threat.timestamp.date(), 0) + 1
+        trend = {}
+        for day in days:
+            start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+            end = timezone.make_aware(datetime.combine(day, datetime.max.time()))
+            in_day = threats.filter(timestamp__range=(start, end))
+            trend[day] = {s: in_day.filter(severity=s).count() for s in ('high', 'medium', 'low')}
+        labels = dict(ThreatAlert.SEVERITY_CHOICES)
+        return {
+            'total': threats.count(),
+            'severity': {s: threats.filter(severity=s).count() for s in ('high', 'medium', 'low')},
+            'severity_items': [
+                (labels[row['severity']], row['count'])
+                for row in threats.values('severity').annotate(count=Count('id')).order_by('severity')
+            ],
+            'category': sorted(
+                (dict(ThreatAlert.CATEGORY_CHOICES).get(row['category'], row['category']), row['count'])
+                for row in threats.values('category').annotate(count=Count('id'))
+            ),
+            'sources': sorted(
+                (row['source'] or 'Unknown', row['count'])
+                for row in threats.values('source').annotate(count=Count('id')).order_by('-count')[:10]
+            ),
+            'timeline': days,
+            'trend': trend,
+        }
+
+    def new_counts(self, stats):
+        timeline = dict(zip(stats.timeline_days, stats.timeline))
+        dates, series = stats.trend(days=7)
+        trend = {day: {s: series[s][i] for s in series} for i, day in enumerate(dates)}
+        old = self.old_counts()
+        return {
+            'total': stats.total,
+            'severity': {s: stats.severity[s] for s in ('high', 'medium', 'low')},
+            'severity_items': stats.severity_items,
+            'category': sorted(stats.category),
+            'sources': sorted(stats.sources),
+            'timeline': {day: timeline[day] for day in old['timeline']},
+            'trend': {day: trend[day] for day in old['trend']},
+        }
+
+    def test_grouped_queries_match_the_old_counts(self):
+        rebuild_rollup()
+        old = self.old_counts()
+        with self.assertNumQueries(3):
+            live = compute_threat_stats(days=30)
+        for name, stats in (('live', live), ('rollup', compute_rollup_stats(days=30))):
+            with self.subTest(name):
+                self.assertEqual(self.new_counts(stats), old)
+
+
+class RollupTests(TestCase):
+    """Signals keep ThreatAlertDailyRollup equal to what ``rebuild_rollup`` would compute."""
+
+    def snapshot(self):
+        return sorted(ThreatAlertDailyRollup.objects.values_list('date', 'category', 'severity', 'source', 'count'))
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_rollup()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_incremental_rollup_matches_rebuild_after_edits(self):
+        late = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()) + timedelta(hours=23, minutes=50))
+        alerts = [
+            ThreatAlert.objects.create(
+                title=f'roll {i}', content='c', url=f'https://example.com/roll/{i}',
+                severity=['low', 'high', 'critical'][i % 3], category=['PM', 'Scam'][i % 2], source=['tiktok', ''][i % 2],
+            )
+            for i in range(6)
+        ]
+        self.assertMatchesRebuild()
+
+        # Category, severity and source edits move the alert between buckets
+        alerts[0].category, alerts[0].severity = 'Army', 'medium'
+        alerts[0].save()
+        alerts[1].source = 'facebook'
+        alerts[1].save()
+        self.assertMatchesRebuild()
+
+        # A timestamp just before local midnight lands on a different UTC day; shifting it moves the local day
+        alerts[2].timestamp = late
+        alerts[2].save()
+        self.assertMatchesRebuild()
+        alerts[2].timestamp = late - timedelta(days=3)
+        alerts[2].save()
+        self.assertMatchesRebuild()
+
+        # Deleting one row and a queryset both drop their buckets, emptied ones disappear
+        alerts[3].delete()
+        ThreatAlert.objects.filter(category='Scam').delete()
+        self.assertMatchesRebuild()
+
+        # Batch ingestion upserts an existing url with a new category and adds a new one
+        ingest_alerts([
+            {'title': 'roll 0', 'content': 'c', 'url': 'https://example.com/roll/0', 'category': 'Scam', 'severity': 'high'},
+            {'title': 'roll new', 'content': 'c', 'url': 'https://example.com/roll/new', 'category': 'PM', 'severity': 'low'},
+        ])
+        self.assertMatchesRebuild()
+        self.assertEqual(sum(row[-1] for row in self.snapshot()), ThreatAlert.objects.count())
+
+
+class VersionedCacheTests(TransactionTestCase):
+    """Aggregates are shared until a ThreatAlert change bumps the generation."""
+
+    def setUp(self):
+        get_cache().clear()
+
+    def create_alert(self, i, severity='high'):
+        return ThreatAlert.objects.create(
+            title=f'alert {i}', content='report', url=f'https://example.com/c/{i}', severity=severity,
+        )
+
+    def test_hits_skip_aggregates_and_writes_invalidate(self):
+        self.create_alert(1)
+        first = self.client.get('/dashboard/')
+        second = self.client.get('/dashboard/')
+        self.assertEqual(second.metrics.queries, first.metrics.queries - 1)
+        self.assertEqual(second.context['high_severity'], 1)
+
+        self.create_alert(2)
+        third = self.client.get('/dashboard/')
+        self.assertEqual(third.context['high_severity'], 2)
+
+        ThreatAlert.objects.filter(url='https://example.com/c/1').delete()
+        self.assertEqual(self.client.get('/visualize_news/').context['total_threats'], 1)
+
+    def test_generations_are_shared_through_the_database(self):
+        self.create_alert(1)
+        search = lambda: self.client.get('/dashboard/', {'q': 'alert'}).context['high_severity']
+        self.assertEqual(search(), 1)
+        ThreatAlert.objects.update(severity='low')  # no signals, so no bump yet
+        self.assertEqual(search(), 1)
+
+        # What bump() in a management command or another worker writes
+        CacheGeneration.objects.filter(label='collect.threatalert').update(value=F('value') + 1)
+        self.assertEqual(search(), 0)
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return 42
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cached('slow', slow, depends_on=[ThreatAlert])))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [42] * 8)
+        self.assertEqual(len(calls), 1)
+
+
+class FragmentCacheTests(TestCase):
+    """Rendered rows, cards and the sidebar are reused until their row or the key changes."""
+
+    def setUp(self):
+        get_cache().clear()
+
+    def test_rows_and_cards_render_once_per_row_version(self):
+        alert = ThreatAlert.objects.create(
+            title='Original title', content='c', url='https://example.com/frag', severity='critical',
+            video='threat_alerts/videos/frag.mp4',
+        )
+        self.assertContains(self.client.get('/dashboard/'), 'Original title')
+        self.assertContains(self.client.get('/trending_news/'), 'Original title')
+
+        # A write that bypasses updated_at leaves the cached markup in place...
+        ThreatAlert.objects.filter(id=alert.id).update(title='Edited title')
+        self.assertContains(self.client.get('/dashboard/'), 'Original title')
+        # ...and so does saving another alert
+        with self.captureOnCommitCallbacks(execute=True):
+            ThreatAlert.objects.create(title='Other', content='c', url='https://example.com/frag-2')
+        self.assertContains(self.client.get('/dashboard/'), 'Original title')
+        # ...saving the alert itself re-renders it
+        alert.refresh_from_db()
+        alert.save()
+        self.assertContains(self.client.get('/dashboard/'), 'Edited title')
+        self.assertContains(self.client.get('/trending_news/'), 'Edited title')
+
+    def test_reingested_alert_is_rendered_again(self):
+        ingest_alerts([{'title': 'Collector title', 'content': 'c', 'url': 'https://example.com/re', 'severity': 'low'}])
+        self.assertContains(self.client.get('/dashboard/'), 'Collector title')
+
+        ingest_alerts([{'title': 'Corrected title', 'content': 'c', 'url': 'https://example.com/re', 'severity': 'high'}])
+        response = self.client.get('/dashboard/')
+        self.assertContains(response, 'Corrected title')
+        self.assertContains(response, '<span class="badge bg-danger">High</span>', html=True)
+
+    def test_relative_time_is_rendered_outside_the_card(self):
+        alert = ThreatAlert.objects.create(
+            title='Aging', content='c', url='https://example.com/aging', severity='critical',
+            video='threat_alerts/videos/aging.mp4',
+        )
+        self.client.get('/trending_news/')
+        ThreatAlert.objects.filter(id=alert.id).update(timestamp=timezone.now() - timedelta(days=3))
+        self.assertContains(self.client.get('/trending_news/'), '3\xa0days ago')
+
+    def test_sidebar_is_cached_per_page(self):
+        self.assertContains(self.client.get('/dashboard/'), 'rounded active')
+        self.assertNotContains(self.client.get('/current_news/'), 'rounded active')
+        self.assertContains(self.client.get('/dashboard/'), 'href="/archive_news/"')
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            ThreatAlert.objects.create(
+                title=f'export {i}', content='line one\nline "two"', url=f'https://example.com/e/{i}',
+                severity='critical' if i % 2 else 'low', category='Scam',
+            )
+
+    def download(self, query):
+        response = self.client.get('/report_news/export/?' + query)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_and_ndjson_are_streamed_with_filters(self):
+        response, body = self.download('format=csv&severity=critical')
+        self.assertIn('attachment;', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(body.decode())))
+        self.assertEqual(rows[0][:3], ['id', 'timestamp', 'title'])
+        self.assertEqual([row[2] for row in rows[1:]], ['export 1', 'export 3'])
+        self.assertEqual(rows[1][7], 'line one\nline "two"')
+
+        response, body = self.download('format=ndjson&category=Scam&end=2000-01-01')
+        self.assertEqual(body, b'')
+        response, body = self.download('format=ndjson')
+        self.assertEqual([json.loads(line)['title'] for line in body.splitlines()], [f'export {i}' for i in range(5)])
+
+        self.assertEqual(self.client.get('/report_news/export/?start=yesterday').status_code, 400)
+
+    @skipUnless(parquet_available(), 'pyarrow is not installed')
+    def test_parquet_round_trip(self):
+        import pyarrow.parquet as pq
+        response, body = self.download('format=parquet&severity=low')
+        table = pq.read_table(io.BytesIO(body))
+        self.assertEqual(table.column('title').to_pylist(), ['export 0', 'export 2', 'export 4'])
+
+
+class LiveEventsTests(TestCase):
+
+    def test_broker_resume_and_resync(self):
+        hub = Broker(buffer_size=3)
+        start = hub.last_id
+        for i in range(5):
+            hub.publish('counts', {'total': 1})
+        self.assertEqual([event.id for event in hub.since(start + 2)], [start + 3, start + 4, start + 5])
+        self.assertIsNone(hub.since(start))  # fell out of the buffer
+        self.assertIsNone(hub.since(start + 99))  # id from before a restart
+        self.assertEqual(hub.since(hub.last_id), [])
+
+    def test_backlog_stream_carries_new_alerts_and_deltas(self):
+        since = broker.last_id
+        with self.captureOnCommitCallbacks(execute=True):
+            ThreatAlert.objects.create(title='Live', content='new', url='https://example.com/live', severity='high')
+        response = self.client.get(f'/live/events/?last_event_id={since}')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('event: alert', body)
+        self.assertIn('"title": "Live"', body)
+        self.assertIn('data: {"total": 1, "high": 1}', body)
+
+        resumed = self.client.get('/live/events/', HTTP_LAST_EVENT_ID=str(broker.last_id))
+        self.assertNotIn('event: alert', b''.join(resumed.streaming_content).decode())
+
+
+@override_settings(INGEST_API_TOKEN='s3cret')
+class IngestTests(TestCase):
+    URL = '/ingest/alerts/'
+
+    def post(self, body, content_type='application/json', **headers):
+        return self.client.post(self.URL, body, content_type=content_type, **headers)
+
+    def test_token_upserts_and_reports_each_row(self):
+        ThreatAlert.objects.create(title='Old title', content='c', url='https://ingest.example/1', severity='low')
+        records = [
+            {'title': 'New title', 'content': 'c', 'url': 'https://ingest.example/1', 'severity': 'high'},
+            {'title': 'Fresh', 'description': 'from a collector', 'url': 'https://ingest.example/2'},
+            {'title': 'No url', 'content': 'c'},
+            {'title': 'Repeated', 'content': 'first copy', 'url': 'https://ingest.example/3'},
+            {'title': 'Repeated', 'content': 'second copy', 'url': 'https://ingest.example/3'},
+        ]
+        self.assertEqual(self.post(json.dumps(records)).status_code, 403)
+
+        response = self.post(json.dumps(records), HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(
+            {key: report[key] for key in ('created', 'updated', 'duplicate', 'error')},
+            {'created': 2, 'updated': 1, 'duplicate': 1, 'error': 1},
+        )
+        statuses = {row['row']: row['status'] for row in report['results']}
+        self.assertEqual(statuses[1], 'updated')
+        self.assertEqual(statuses[3], 'error')
+        self.assertEqual(
+            ThreatAlert.objects.values_list('title', 'severity').get(url='https://ingest.example/1'),
+            ('New title', 'high'),
+        )
+        self.assertEqual(ThreatAlert.objects.get(url='https://ingest.example/3').content, 'second copy')
+        self.assertEqual(ThreatAlert.objects.get(url='https://ingest.example/2').content, 'from a collector')
+
+    def test_ndjson_stream(self):
+        body = '\n'.join([
+            json.dumps({'title': 'Line one', 'content': 'c', 'url': 'https://ingest.example/a'}),
+            '{not json',
+            '',
+            json.dumps({'title': 'Line two', 'content': 'c', 'url': 'https://ingest.example/b'}),
+        ])
+        report = self.post(body, 'application/x-ndjson', HTTP_AUTHORIZATION='Bearer s3cret').json()
+        self.assertEqual((report['created'], report['error']), (2, 1))
+        self.assertEqual([row['row'] for row in report['results'] if row['status'] == 'error'], [2])
+        self.assertEqual(self.post('{', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 400)
+
+    def test_staff_session_must_pass_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(User.objects.create_user('ingester', is_staff=True))
+        body = json.dumps([{'title': 'Via session', 'content': 'c', 'url': 'https://ingest.example/s'}])
+        self.assertEqual(client.post(self.URL, body, content_type='application/json').status_code, 403)
+        self.assertFalse(ThreatAlert.objects.exists())
+
+        client.get('/adding_new/')  # the form page sets the CSRF cookie
+        token = client.cookies['csrftoken'].value
+        response = client.post(self.URL, body, content_type='application/json', HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.json()['created'], 1)
+        # The token path stays exempt: collectors have no cookie to send
+        response = client.post(self.URL, body, content_type='application/json', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.json()['updated'], 1)
+
+    def test_management_command_reads_ndjson(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        source, report_path = Path(tmp.name) / 'alerts.ndjson', Path(tmp.name) / 'report.json'
+        source.write_text('\n'.join(
+            json.dumps({'title': f'Bulk {i}', 'content': f'item {i}', 'url': f'https://ingest.example/cmd/{i}'})
+            for i in range(30)
+        ) + '\n{"title": "broken"}\n')
+        out, err = io.StringIO(), io.StringIO()
+        call_command('ingest_alerts', str(source), batch_size=7, stdout=out, stderr=err)
+        self.assertIn('30 created, 0 updated, 0 duplicate, 1 errors', out.getvalue())
+        self.assertIn('row 31:', err.getvalue())
+
+        call_command('ingest_alerts', str(source), report=str(report_path), stdout=io.StringIO())
+        report = json.loads(report_path.read_text())
+        self.assertEqual((report['created'], report['updated']), (0, 30))
+        self.assertEqual(ThreatAlert.objects.count(), 30)
+
+
+class NearDuplicateTests(TestCase):
+    STORY = (
+        'Fraudsters are sending SMS messages that claim to come from the central bank and ask '
+        'recipients to confirm their account details through a link to a fake banking portal '
+        'which steals passwords and one time codes from victims across the country'
+    )
+
+    def test_reposts_join_the_first_alert_and_collapse_on_the_dashboard(self):
+        first = ThreatAlert.objects.create(title='Bank SMS scam', content=self.STORY, url='https://a.example/1')
+        repost = ThreatAlert.objects.create(
+            title='Bank SMS scam', content=self.STORY + ' again', url='https://b.example/1',
+        )
+        other = ThreatAlert.objects.create(title='Army recruitment hoax', content='unrelated story', url='https://c.example/1')
+        first.refresh_from_db()
+        self.assertEqual(len(first.minhash), 256)
+        self.assertEqual((first.cluster_id, first.is_duplicate), (first.pk, False))
+        self.assertEqual((repost.cluster_id, repost.is_duplicate), (first.pk, True))
+        self.assertEqual(other.cluster_id, other.pk)
+
+        report = ingest_alerts([
+            {'title': 'Bank SMS scam!', 'content': self.STORY, 'url': 'https://d.example/1'},
+            {'title': 'Bus fare protest', 'content': 'students block the ring road', 'url': 'https://e.example/1'},
+            {'title': 'Bus fare protest', 'content': 'students block the ring road', 'url': 'https://f.example/1'},
+        ])
+        ids = {row['url']: row['id'] for row in report.rows}
+        clusters = dict(ThreatAlert.objects.values_list('url', 'cluster_id'))
+        self.assertEqual(clusters['https://d.example/1'], first.pk)
+        self.assertEqual(clusters['https://f.example/1'], ids['https://e.example/1'])
+
+        response = self.client.get('/dashboard/')
+        self.assertContains(response, '+2 similar')
+        self.assertNotContains(response, 'https://f.example/1')
+        self.assertEqual(response.context['total_threats'], 6)
+
+        first.delete()  # the oldest copy takes over the story
+        repost.refresh_from_db()
+        self.assertEqual((repost.cluster_id, repost.is_duplicate), (repost.pk, False))
+        self.assertEqual(ThreatAlert.objects.get(url='https://d.example/1').cluster_id, repost.pk)
+
+    def test_large_batch_clusters_in_a_few_lookups(self):
+        first = ThreatAlert.objects.create(title='Bank SMS scam', content=self.STORY, url='https://a.example/big')
+        records = [
+            {'title': f'Report {i}', 'content': f'incident {i} district {i * 7} ward {i * 13} notes {i * 31}',
+             'url': f'https://bulk.example/{i}'}
+            for i in range(600)
+        ]
+        records.append({'title': 'Bank SMS scam', 'content': self.STORY + ' repost', 'url': 'https://bulk.example/copy'})
+
+        with CaptureQueriesContext(connection) as queries:
+            report = ingest_alerts(records, batch_size=1000)
+        self.assertEqual(report.counts['created'], 601)
+        lookups = [q for q in queries.captured_queries if 'collect_threatalertsignatureband' in q['sql']
+                   and q['sql'].startswith('SELECT')]
+        self.assertLessEqual(len(lookups), 3)
+        self.assertEqual(ThreatAlert.objects.get(url='https://bulk.example/copy').cluster_id, first.pk)
+        self.assertEqual(ThreatAlert.objects.filter(is_duplicate=True).count(), 1)
+
+    def test_backfill_is_independent_of_parallelism(self):
+        for i, content in enumerate([self.STORY, self.STORY + ' update', 'something else entirely', self.STORY]):
+            ThreatAlert.objects.create(title='Backfill', content=content, url=f'https://backfill.example/{i}')
+        ThreatAlert.objects.update(minhash=None, cluster_id=None, is_duplicate=False)
+
+        self.assertEqual(backfill_clusters(chunk_size=2, workers=0), (4, 2))
+        serial = list(ThreatAlert.objects.order_by('id').values_list('cluster_id', 'is_duplicate'))
+        self.assertEqual(backfill_clusters(chunk_size=1, workers=2), (4, 2))
+        self.assertEqual(list(ThreatAlert.objects.order_by('id').values_list('cluster_id', 'is_duplicate')), serial)
+
+
+class ClassifierTests(TestCase):
+    VOCABULARY = {
+        ('Scam', 'high'): 'lottery prize winner transfer fee esewa wallet fraud',
+        ('Malware', 'critical'): 'apk download infected link trojan device ransomware',
+        ('Protest', 'low'): 'rally students march road blocked maitighar slogans',
+    }
+
+    def test_train_save_and_score_new_and_existing_alerts(self):
+        words = ' '.join(text for text in self.VOCABULARY.values()).split()
+        for (category, severity), text in self.VOCABULARY.items():
+            for i in range(8):
+                ThreatAlert.objects.create(
+                    title=f'{category} report {i}', content=f'{text} {words[i]} {words[-i]}',
+                    url=f'https://train.example/{category}/{i}', category=category, severity=severity,
+                )
+        model, accuracy = train(holdout=0, max_iter=100)
+        self.assertEqual(model.meta['samples'], 24)
+        self.assertEqual(accuracy, {})
+
+        with tempfile.TemporaryDirectory() as tmp, override_settings(CLASSIFIER_PATH=Path(tmp) / 'model.npz'):
+            model.save(Path(tmp) / 'model.npz')
+            alert = ThreatAlert.objects.create(
+                title='Win a prize', content='claim the lottery prize, pay the transfer fee by esewa',
+                url='https://new.example/1',
+            )
+            self.assertEqual((alert.category, alert.predicted_category), ('Other', 'Scam'))
+            self.assertEqual(alert.predicted_severity, 'high')
+            self.assertGreater(alert.category_confidence, 0.5)
+
+            ingest_alerts([{'title': 'Road blocked', 'content': 'students rally and march', 'url': 'https://new.example/2'}])
+            self.assertEqual(ThreatAlert.objects.get(url='https://new.example/2').predicted_category, 'Protest')
+
+            ThreatAlert.objects.update(predicted_category='', category_confidence=None)
+            self.assertEqual(classify_archive(batch_size=7), 26)
+            self.assertEqual(ThreatAlert.objects.filter(predicted_category=F('category')).count(), 24)
+
+
+class FuzzySearchTests(TestCase):
+
+    def test_spelling_variants_rank_and_follow_writes(self):
+        kathmandu = CurrentInformation.objects.create(timing='09:00', location='Kathmandu', leader='Pushpa Kamal Dahal')
+        pokhara = CurrentInformation.objects.create(timing='10:00', location='Pokhara', leader='Ram Thapa', vehicle='Toyota Hilux')
+        CurrentInformation.objects.create(timing='11:00', location='काठमाडौं', leader='Sita Karki')
+        ids = lambda query: [pk for pk, score in rank(CurrentInformation, query)]
+
+        self.assertEqual(ids('Kathmandau'), [kathmandu.pk])
+        self.assertEqual(ids('pokhra hilux'), [pokhara.pk])
+        self.assertEqual(ids('dahal kathmandu')[0], kathmandu.pk)
+        self.assertEqual(len(ids('काठमाडौ')), 1)
+        self.assertEqual(ids('zzzz'), [])
+
+        pokhara.location = 'Kathmandu'
+        pokhara.save()
+        self.assertEqual(ids('kathmandu'), [pokhara.pk, kathmandu.pk])
+        kathmandu.delete()
+        self.assertEqual(ids('kathmandu'), [pokhara.pk])
+        self.assertEqual(rebuild_fuzzy_index(), 2)
+        self.assertEqual(ids('kathmandu'), [pokhara.pk])
+
+        response = self.client.get('/spy_news/', {'q': 'thapa'})
+        self.assertEqual([info.pk for info in response.context['matches']], [pokhara.pk])
+
+    def test_common_prefix_over_hundreds_of_terms(self):
+        CurrentInformation.objects.bulk_create([
+            CurrentInformation(timing='09:00', location='Pokhara', leader=f'Ram{n:02d} Thapa') for n in range(400)
+        ])
+        rebuild_fuzzy_index()
+        self.assertGreater(len(similar_terms(['ram'])), 100)
+        self.assertEqual(len(rank(CurrentInformation, 'ram')), 200)
+        self.assertTrue(rank(CurrentInformation, 'ram thapa pokhara'))
+        self.assertEqual(self.client.get('/spy_news/', {'q': 'ram'}).status_code, 200)
+
+    def test_news_source_search_is_typo_tolerant(self):
+        NewsSource.objects.create(name='Kantipur Daily', url='https://ekantipur.com')
+        NewsSource.objects.create(name='Setopati', url='https://setopati.com')
+        response = self.client.get('/source_news/', {'search': 'kantipr'})
+        self.assertEqual([source.name for source in response.context['sources']], ['Kantipur Daily'])
+
+
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        override = override_settings(ARCHIVE_ROOT=Path(root.name))
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_old_alerts_move_to_monthly_partitions_and_stay_searchable(self):
+        now = timezone.now()
+        text = 'Fake bank login pages are collecting card numbers from customers. ' * 20
+        old = ThreatAlert.objects.create(title='Bank phishing wave', content=text, url='https://example.com/a/1')
+        repost = ThreatAlert.objects.create(title='Bank phishing wave', content=text, url='https://example.com/a/2')
+        ancient = ThreatAlert.objects.create(title='Ancient malware', content='dropper', url='https://example.com/a/3')
+        recent = ThreatAlert.objects.create(title='Fresh phishing', content='sms lure', url='https://example.com/a/4')
+        self.assertTrue(ThreatAlert.objects.get(pk=repost.pk).is_duplicate)
+        ThreatAlert.objects.filter(pk=old.pk).update(timestamp=now - timedelta(days=400))
+        ThreatAlert.objects.filter(pk=ancient.pk).update(timestamp=now - timedelta(days=440))
+        rebuild_rollup()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            moved, raw, stored = archive_alerts(before=now - timedelta(days=180))
+        self.assertEqual(moved, 2)
+        self.assertLess(stored, raw / 5)
+        self.assertEqual(archive_alerts(before=now - timedelta(days=180)), (0, 0, 0))
+
+        # Live table, rollup and clusters only describe what is left
+        self.assertEqual(set(ThreatAlert.objects.values_list('id', flat=True)), {repost.pk, recent.pk})
+        self.assertEqual(rollup_totals()['total'], 2)
+        self.assertEqual(
+            ThreatAlert.objects.filter(pk=repost.pk).values_list('cluster_id', 'is_duplicate').get(), (repost.pk, False)
+        )
+        self.assertEqual(
+            [month for month, path in partitions()],
+            sorted({month_of(now - timedelta(days=400)), month_of(now - timedelta(days=440))}),
+        )
+        self.assertNotContains(self.client.get('/dashboard/'), 'Ancient malware')
+
+        # Historical search fans out, newest first, with keyset pages across live and archived rows
+        found, more = search_history('phishing')
+        self.assertEqual([alert.id for alert in found], [recent.pk, repost.pk, old.pk])
+        self.assertEqual((found[2].content, getattr(found[2], 'archived', False)), (text, True))
+        first, more = search_history(limit=2)
+        self.assertEqual(([alert.id for alert in first], more), ([recent.pk, repost.pk], True))
+        rest, more = search_history(before=(first[-1].timestamp, first[-1].id), limit=2)
+        self.assertEqual(([alert.id for alert in rest], more), ([old.pk, ancient.pk], False))
+        response = self.client.get('/archive_news/?q=malware')
+        self.assertContains(response, 'Ancient malware')
+        self.assertContains(response, 'Archived')
+
+        # Exports include the partitions on request, still oldest first
+        body = b''.join(self.client.get('/report_news/export/?format=ndjson&archive=1').streaming_content)
+        self.assertEqual([json.loads(line)['id'] for line in body.splitlines()], [ancient.pk, old.pk, repost.pk, recent.pk])
+        body = b''.join(self.client.get('/report_news/export/?format=ndjson&archive=1&q=phishing&end=2100-01-01').streaming_content)
+        self.assertEqual([json.loads(line)['id'] for line in body.splitlines()], [old.pk, repost.pk, recent.pk])
+        body = b''.join(self.client.get('/report_news/export/?format=ndjson').streaming_content)
+        self.assertEqual([json.loads(line)['id'] for line in body.splitlines()], [repost.pk, recent.pk])
+
+
+class LiveStreamAsgiTests(SimpleTestCase):
+
+    async def test_open_stream_receives_published_events(self):
+        response = await self.async_client.get('/live/events/')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        # The subscription is registered once the stream has started
+        await asyncio.to_thread(broker.publish, 'current', {'id': 7, 'location': 'Kathmandu'})
+        chunk = await asyncio.wait_for(anext(stream), 2)
+        self.assertIn(b'event: current', chunk)
+        self.assertIn(b'"location": "Kathmandu"', chunk)
+        await stream.aclose()
+
+
+class FeedPollerTests(TransactionTestCase):
+    """Polls fixture feeds served by a local HTTP server that honours ETags."""
+
+    FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'feeds'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        fixtures = cls.FIXTURES
+        cls.requests = requests = []
+
+        class FeedHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                name = self.path.strip('/')
+                requests.append((name, self.headers.get('If-None-Match')))
+                path = fixtures / name
+                if not path.is_file():
+                    self.send_error(503)
+                    return
+                body = path.read_bytes()
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+        cls.base = f'http://127.0.0.1:{cls.server.server_port}/'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.requests.clear()
+        for name in ('rss.xml', 'atom.xml', 'feed.json', 'missing.xml'):
+            NewsSource.objects.create(name=name, url=self.base, feed_url=self.base + name)
+
+    def test_poll_inserts_new_items_and_uses_conditional_get(self):
+        poller = FeedPoller(interval=0)
+        self.assertEqual(asyncio.run(poller.run_once()), 4)
+        self.assertEqual(ThreatAlert.objects.count(), 4)
+        alert = ThreatAlert.objects.get(url='https://desk.example.com/news/phishing-wave')
+        self.assertEqual(alert.content, 'Fake SMS messages ask for OTP codes.')
+        self.assertEqual(alert.source, 'rss.xml')
+        self.assertTrue(ThreatAlert.objects.filter(url=self.base + 'posts/deepfake-candidate').exists())
+
+        failed = NewsSourceFeedState.objects.get(source__name='missing.xml')
+        self.assertEqual(failed.failures, 1)
+        self.assertGreater(failed.next_poll_at, timezone.now())
+
+        self.requests.clear()
+        self.assertEqual(asyncio.run(FeedPoller(interval=0).run_once()), 0)
+        conditional = {name: etag for name, etag in self.requests}
+        self.assertIsNotNone(conditional['rss.xml'])
+        self.assertNotIn('missing.xml', conditional)  # still backing off
+        self.assertEqual(ThreatAlert.objects.count(), 4)
+
+    def test_failed_write_keeps_the_poll_state_and_stops_the_round(self):
+        class FailingPoller(FeedPoller):
+            def _write(self, records):
+                raise DatabaseError('disk full')
+
+        # One record per batch and a queue of four: producers would block on put() forever
+        with self.assertRaises(DatabaseError):
+            asyncio.run(asyncio.wait_for(FailingPoller(interval=0, batch_size=1).run_once(), 10))
+        self.assertFalse(
+            NewsSourceFeedState.objects.exclude(source__name='missing.xml').exclude(etag='').exists()
+        )
+
+        # Nothing was marked as seen, so the next round fetches and stores everything
+        self.assertEqual(asyncio.run(FeedPoller(interval=0).run_once()), 4)
+        self.assertEqual(ThreatAlert.objects.count(), 4)
+
+
+class MediaPipelineTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_uploaded_image_gets_thumbnail_and_variants(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (900, 600), (200, 30, 30)).save(buffer, 'PNG')
+        alert = ThreatAlert.objects.create(
+            title='Defaced portal', content='Screenshot attached', url='https://example.com/defaced',
+            image=SimpleUploadedFile('shot.png', buffer.getvalue(), content_type='image/png'),
+        )
+        self.assertEqual(alert.media_status, 'pending')
+
+        self.assertEqual(run_pending(), (1, 0))
+        alert.refresh_from_db()
+        self.assertEqual(alert.media_status, 'ready')
+        self.assertEqual(Image.open(alert.thumbnail.path).size, (160, 160))
+        self.assertEqual(sorted(alert.image_variants['webp'], key=int), ['320', '640'])
+        self.assertTrue(alert.thumbnail_webp_url.endswith('thumb.webp'))
+        self.assertRegex(alert.webp_srcset, r'^\S+/320\.webp 320w, \S+/640\.webp 640w$')
+
+        alert.title = 'Defaced portal (updated)'
+        alert.save()
+        self.assertEqual(alert.media_status, 'ready')  # metadata edits don't requeue
+
+        # The table and the trending card offer the variants to the browser
+        response = self.client.get('/search_news/')
+        self.assertContains(response, f'{alert.thumbnail_webp_url} 160w, {alert.webp_srcset}')
+        self.assertContains(response, f'{alert.thumbnail.url} 160w, {alert.jpeg_srcset}')
+        ThreatAlert.objects.filter(pk=alert.pk).update(
+            severity='critical', video='threat_alerts/videos/clip.mp4', updated_at=timezone.now(),
+        )
+        self.assertContains(self.client.get('/trending_news/'), f'srcset="{alert.webp_srcset}"')
+
+
+class ContentAddressedStorageTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def upload(self, url, data=b'same evidence bytes'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ThreatAlert.objects.create(
+                title='Leak', content='Dump attached', url=url,
+                video=SimpleUploadedFile('dump.MP4', data, content_type='video/mp4'),
+            )
+
+    def test_identical_uploads_share_one_refcounted_blob(self):
+        first = self.upload('https://example.com/a')
+        second = self.upload('https://example.com/b')
+        self.assertEqual(first.video.name, second.video.name)
+        self.assertRegex(first.video.name, r'^blobs/[0-9a-f]{2}/[0-9a-f]{64}\.mp4$')
+        self.assertEqual(MediaBlob.objects.get(name=first.video.name).refcount, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(media_storage.exists(second.video.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.video = SimpleUploadedFile('other.mp4', b'replacement', content_type='video/mp4')
+            second.save()
+        self.assertFalse(media_storage.exists(first.video.name))
+        self.assertFalse(MediaBlob.objects.filter(name=first.video.name).exists())
+
+    def test_dedupe_media_moves_legacy_copies_into_blobs(self):
+        for name in ('threat_alerts/videos/dump.mp4', 'threat_alerts/videos/dump_LmKdrbM.mp4'):
+            Path(media_storage.path(name)).parent.mkdir(parents=True, exist_ok=True)
+            Path(media_storage.path(name)).write_bytes(b'legacy bytes')
+            ThreatAlert.objects.create(title='Old', content='Old', url=f'https://example.com/{name}', video=name)
+
+        stats = dedupe_media()
+        self.assertEqual((stats['files'], stats['blobs_created'], stats['rows']), (2, 1, 2))
+        names = set(ThreatAlert.objects.values_list('video', flat=True))
+        self.assertEqual(len(names), 1)
+        blob = MediaBlob.objects.get()
+        self.assertEqual((blob.name, blob.refcount), (names.pop(), 2))
+        self.assertFalse(media_storage.exists('threat_alerts/videos/dump.mp4'))
+
+
+class MediaReferenceRollbackTests(TransactionTestCase):
+    """Views save in autocommit mode: a failed row write must give back the blob reference it counted."""
+
+    setUp = ContentAddressedStorageTests.setUp
+
+    def test_failed_insert_releases_its_reference(self):
+        video = lambda: SimpleUploadedFile('dump.MP4', b'same evidence bytes', content_type='video/mp4')
+        first = ThreatAlert.objects.create(title='Leak', content='Dump attached', url='https://example.com/a', video=video())
+        with self.assertRaises(IntegrityError):  # duplicate url, uploaded again
+            ThreatAlert.objects.create(title='Leak', content='Dump attached', url='https://example.com/a', video=video())
+        with self.assertRaises(IntegrityError):  # duplicate url, blob assigned by name
+            ThreatAlert.objects.create(title='Leak', content='c', url='https://example.com/a', video=first.video.name)
+        self.assertEqual(MediaBlob.objects.get(name=first.video.name).refcount, 1)
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 30), (10, 120, 200)).save(buffer, 'PNG')
+        for url in ('https://example.com/b', 'https://example.com/b'):
+            response = self.client.post('/adding_new/', {
+                'title': 'Shot', 'description': 'Screenshot', 'url': url, 'severity': 'low',
+                'image': SimpleUploadedFile('shot.png', buffer.getvalue(), content_type='image/png'),
+            })
+        self.assertContains(response, 'already exists')
+        image = ThreatAlert.objects.get(url='https://example.com/b').image.name
+        self.assertEqual(MediaBlob.objects.get(name=image).refcount, 1)
+
+        first.delete()
+        self.assertFalse(MediaBlob.objects.filter(name=first.video.name).exists())
+        self.assertFalse(media_storage.exists(first.video.name))
+
+
+class ServeMediaTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.name = media_storage.save('clip.mp4', SimpleUploadedFile('clip.mp4', b'0123456789'))
+        self.url = '/media/' + self.name
+
+    def test_full_and_conditional_responses(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertIn('immutable', response['Cache-Control'])
+
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], response['ETag'])
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+
+        suffix = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(suffix.streaming_content), b'789')
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=20-').status_code, 416)
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(stale.status_code, 200)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect')
+    def test_accel_redirect_offload(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.name)
+        self.assertEqual(response.content, b'')
+
+
+class StaticAssetTests(TestCase):
+    """Bundles built from the extracted page CSS/JS (the vendored libraries need network to fetch)."""
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        self.local = {name: sources for name, sources in BUNDLES.items()
+                      if not any(source.startswith('vendor/') for source in sources)}
+
+    def test_pages_fall_back_to_cdn_and_sources_before_a_build(self):
+        with override_settings(STATIC_ROOT=self.root):
+            response = self.client.get('/dashboard/')
+        self.assertContains(response, 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css')
+        self.assertContains(response, '<script src="/static/collect/js/dashboard.js" defer></script>', html=True)
+        self.assertNotContains(response, 'function showAlert')  # moved out of the page
+
+    def test_build_fingerprints_precompresses_and_serves(self):
+        manifest = build(bundles=self.local, root=self.root, fetch=False)
+        dashboard = manifest['bundles']['dashboard.js']
+        self.assertRegex(dashboard, r'^bundles/dashboard\.[0-9a-f]{12}\.js$')
+        self.assertTrue(os.path.exists(os.path.join(self.root, dashboard + '.gz')))
+        self.assertEqual(build(bundles=self.local, root=self.root, fetch=False)['bundles'], manifest['bundles'])
+
+        with override_settings(STATIC_ROOT=self.root):
+            self.assertContains(self.client.get('/dashboard/'), f'/static/{dashboard}')
+            url = f'/static/{manifest["bundles"]["layout.js"]}'
+            plain = self.client.get(url)
+            self.assertIn(b'function showAlert', b''.join(plain.streaming_content))
+            self.assertEqual(plain['Cache-Control'], 'public, max-age=31536000, immutable')
+            self.assertEqual(plain['Vary'], 'Accept-Encoding')
+
+            packed = self.client.get(url, HTTP_ACCEPT_ENCODING='br;q=0, gzip, deflate')
+            self.assertEqual(packed['Content-Encoding'], 'gzip')
+            self.assertLess(int(packed['Content-Length']), int(plain['Content-Length']))
+            self.assertNotEqual(packed['ETag'], plain['ETag'])
+            again = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=packed['ETag'])
+            self.assertEqual(again.status_code, 304)
+
+            # Unbuilt sources come from the app static dir with a short lifetime
+            source = self.client.get('/static/collect/css/layout.css')
+            self.assertEqual(source['Cache-Control'], 'public, max-age=3600')
+            self.assertEqual(self.client.get('/static/../settings.py').status_code, 404)
+
+        Path(self.root, 'bundles', 'layout.000000000000.css').write_text('old')
+        self.assertEqual(prune(root=self.root), 1)
+
+
+class ChunkedUploadTests(TestCase):
+
+    def setUp(self):
+        media, sessions = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.addCleanup(sessions.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name, UPLOAD_SESSION_ROOT=sessions.name, UPLOAD_CHUNK_SIZE=4)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.sessions = sessions.name
+
+    def start(self, filename='clip.mp4', size=10):
+        return self.client.post('/uploads/videos/', json.dumps({'filename': filename, 'size': size}),
+                                content_type='application/json')
+
+    def put(self, upload_id, index, data, checksum=None):
+        headers = {'HTTP_UPLOAD_CHECKSUM': checksum or 'sha256 ' + base64.b64encode(hashlib.sha256(data).digest()).decode()}
+        return self.client.put(f'/uploads/videos/{upload_id}/{index}/', data,
+                               content_type='application/octet-stream', **headers)
+
+    def test_validated_before_any_bytes_are_sent(self):
+        created = self.start()
+        self.assertEqual(created.status_code, 201)
+        upload = created.json()
+        self.assertEqual((upload['chunks'], upload['missing']), (3, [0, 1, 2]))
+        self.assertEqual(created['Location'], f'/uploads/videos/{upload["id"]}/')
+        self.assertEqual(self.start(filename='clip.exe').status_code, 400)
+        self.assertEqual(self.start(size=101 * 1024 * 1024).status_code, 413)
+        self.assertEqual(self.client.get('/uploads/videos/../').status_code, 404)
+
+    def test_out_of_order_chunks_resume_and_attach_to_the_alert(self):
+        data = b'\x00\x00\x00\x18ftypmp'  # MP4 magic bytes
+        upload_id = self.start().json()['id']
+        self.assertEqual(self.put(upload_id, 2, data[8:]).status_code, 204)
+        self.assertEqual(self.put(upload_id, 0, data[:4], checksum='sha256 AAAA').status_code, 460)
+        self.assertEqual(self.put(upload_id, 1, data[4:7]).status_code, 400)  # short chunk
+        self.assertEqual(self.client.get(f'/uploads/videos/{upload_id}/').json()['missing'], [0, 1])
+
+        post = {'title': 'Leaked clip', 'description': 'Video attached', 'url': 'https://example.com/clip',
+                'video_upload': upload_id}
+        response = self.client.post('/adding_new/', post)
+        self.assertContains(response, 'Video upload is incomplete (2 of 3 chunks missing)')
+
+        self.put(upload_id, 0, data[:4])
+        self.put(upload_id, 1, data[4:8])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/adding_new/', post)
+        self.assertContains(response, 'saved successfully')
+        alert = ThreatAlert.objects.get(url='https://example.com/clip')
+        self.assertRegex(alert.video.name, r'^blobs/[0-9a-f]{2}/[0-9a-f]{64}\.mp4$')
+        with alert.video.open('rb') as fh:
+            self.assertEqual(fh.read(), data)
+        self.assertEqual(MediaBlob.objects.get(name=alert.video.name).refcount, 1)
+        self.assertEqual(self.client.get(f'/uploads/videos/{upload_id}/').status_code, 404)
+        self.assertEqual(os.listdir(self.sessions), [])
+
+    def test_stale_sessions_are_purged(self):
+        upload_id = self.start().json()['id']
+        self.assertEqual(purge_stale_uploads(ttl=3600), 0)
+        self.assertEqual(purge_stale_uploads(ttl=-1), 1)
+        self.assertEqual(self.client.get(f'/uploads/videos/{upload_id}/').status_code, 404)
+
+
+class MediaUploadHandlerTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 30), (10, 120, 200)).save(buffer, 'PNG')
+        self.png = buffer.getvalue()
+
+    def post(self, url, **files):
+        return self.client.post('/adding_new/', {'title': 'Leak', 'description': 'Evidence attached', 'url': url, **files})
+
+    def leftovers(self):
+        return list(Path(media_storage.path('blobs')).glob('.upload-*'))
+
+    def test_hashed_on_arrival_and_moved_into_its_blob(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post('https://example.com/png', image=SimpleUploadedFile('shot.png', self.png))
+        self.assertContains(response, 'saved successfully')
+        alert = ThreatAlert.objects.get(url='https://example.com/png')
+        digest = hashlib.sha256(self.png).hexdigest()
+        self.assertEqual(alert.image.name, f'blobs/{digest[:2]}/{digest}.png')
+        with alert.image.open('rb') as fh:
+            self.assertEqual(fh.read(), self.png)
+        self.assertEqual(self.leftovers(), [])
+
+    def test_mismatched_and_oversized_files_are_dropped_while_streaming(self):
+        response = self.post('https://example.com/exe', image=SimpleUploadedFile('shot.png', self.png),
+                             video=SimpleUploadedFile('clip.mp4', b'MZ\x90\x00' + b'\x00' * 64))
+        self.assertContains(response, 'Video content does not match its .mp4 extension')
+        self.assertContains(self.post('https://example.com/tiny', image=SimpleUploadedFile('dot.gif', b'GIF8')),
+                            'Image content does not match its .gif extension')
+
+        with mock.patch.dict(MEDIA_RULES, image=replace(IMAGE_RULE, max_bytes=1024 * 1024)):
+            response = self.post('https://example.com/big', image=SimpleUploadedFile('big.png', self.png + bytes(2 * 1024 * 1024)))
+        self.assertContains(response, 'Image size must be less than 1MB')
+        self.assertContains(self.post('https://example.com/txt', image=SimpleUploadedFile('notes.txt', b'hello')),
+                            'Invalid image format')
+        self.assertFalse(ThreatAlert.objects.exists())
+        self.assertEqual(self.leftovers(), [])
@@ -0,0 +1,211 @@
+# collect/upload_handlers.py
+"""
+Upload handler for the ThreatAlert and NewsSource media fields.
+
+``MediaUploadHandler`` comes first in ``FILE_UPLOAD_HANDLERS`` and takes over
+the file parts named in ``MEDIA_RULES`` (``image`` and ``video``, from the
+news form and the admin). Other parts go to Django's default handlers. Each
+file is checked while it arrives:
+
+* the extension is checked before any bytes are stored;
+* the magic bytes at the start of the content must match the extension;
+* the size limit is enforced chunk by chunk rather than after buffering.
+
+A file that fails is dropped right away with ``SkipFile``. Its temp file is
+deleted, and the parser discards the rest of that part instead of storing it.
+The reason is kept in ``request.upload_errors[field]`` for the view or admin
+form to report.
+
+A file that passes has been written only once, into the blob directory of
+the content-addressed storage. It was SHA-256 hashed in the same pass, so
+``ContentAddressedStorage`` just renames it to its blob name
+(collect/storage.py) without copying or re-reading it.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopFutureHandlers
+
+from .storage import BLOB_PREFIX, get_media_storage
+
+SNIFF_BYTES = 16
+
+
+@dataclass(frozen=True)
+class MediaRule:
+    label: str
+    max_bytes: int
+    formats: dict      # extension -> content formats it may hold (see sniff())
+    supported: str     # for error messages
+
+    def check_name(self, name):
+        ext = os.path.splitext(name)[1].lower()
+        if ext not in self.formats:
+            return f"Invalid {self.label.lower()} format. Supported: {self.supported}"
+        return None
+
+    def check_size(self, size):
+        if size > self.max_bytes:
+            return f"{self.label} size must be less than {self.max_bytes // (1024 * 1024)}MB"
+        return None
+
+    def check_content(self, name, head):
+        ext = os.path.splitext(name)[1].lower()
+        if sniff(head) not in self.formats.get(ext, ()):
+            return f"{self.label} content does not match its {ext or 'missing'} extension"
+        return None
+
+
+_MP4 = ('mp4', 'quicktime')
+
+IMAGE_RULE = MediaRule(
+    label='Image', max_bytes=10 * 1024 * 1024, supported='JPG, JPEG, PNG, GIF, WebP',
+    formats={'.jpg': ('jpeg',), '.jpeg': ('jpeg',), '.png': ('png',), '.gif': ('gif',), '.webp': ('webp',)},
+)
+VIDEO_RULE = MediaRule(
+    label='Video', max_bytes=100 * 1024 * 1024, supported='MP4, MOV, AVI, WebM, MKV',
+    formats={'.mp4': _MP4, '.mov': _MP4, '.avi': ('avi',), '.webm': ('matroska',), '.mkv': ('matroska',)},
+)
+
+# Form field name -> rule
+MEDIA_RULES = {'image': IMAGE_RULE, 'video': VIDEO_RULE}
+
+
+def sniff(head):
+    """Container format from the first bytes of a file, or None."""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[:4] == b'RIFF':
+        return {b'WEBP': 'webp', b'AVI ': 'avi'}.get(head[8:12])
+    if head.startswith(b'\x1a\x45\xdf\xa3'):  # EBML: Matroska and WebM
+        return 'matroska'
+    if head[4:8] == b'ftyp':
+        return 'quicktime' if head[8:12] == b'qt  ' else 'mp4'
+    if head[4:8] in (b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot'):  # QuickTime without ftyp
+        return 'quicktime'
+    return None
+
+
+def check_upload(rule, upload):
+    """Error message for an upload that did not come through MediaUploadHandler, or None."""
+    error = rule.check_name(upload.name) or rule.check_size(upload.size)
+    if error:
+        return error
+    upload.seek(0)
+    head = upload.read(SNIFF_BYTES)
+    upload.seek(0)
+    return rule.check_content(upload.name, head)
+
+
+def upload_errors(request, files):
+    """Messages for ``{field: upload}``: rejected while streaming, or failing the same rules now."""
+    rejected = getattr(request, 'upload_errors', {})
+    errors = list(rejected.values())
+    for field_name, upload in files.items():
+        if upload is not None and field_name not in rejected and getattr(upload, 'sha256', None) is None:
+            errors.append(check_upload(MEDIA_RULES[field_name], upload))
+    return [error for error in errors if error]
+
+
+class HashedUploadedFile(UploadedFile):
+    """An upload written to the blob directory, with its SHA-256 already known."""
+
+    def __init__(self, name, content_type, charset, content_type_extra, directory):
+        os.makedirs(directory, exist_ok=True)
+        file = tempfile.NamedTemporaryFile(dir=directory, prefix='.upload-')
+        super().__init__(file, name, content_type, 0, charset, content_type_extra)
+        self.sha256 = None
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            pass  # moved into place by the storage
+
+
+class MediaUploadHandler(FileUploadHandler):
+
+    def __init__(self, request=None, rules=None):
+        super().__init__(request)
+        self.rules = MEDIA_RULES if rules is None else rules
+        self.rule = None
+        if request is not None and not hasattr(request, 'upload_errors'):
+            request.upload_errors = {}
+
+    def record(self, message):
+        if self.request is not None:
+            self.request.upload_errors[self.field_name] = message
+
+    def reject(self, message):
+        self.record(message)
+        self.rule = None
+        raise SkipFile(message)  # the parser closes (and so deletes) self.file
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.rule = self.rules.get(field_name)
+        if self.rule is None:
+            return  # not a media field: leave it to the default handlers
+        error = self.rule.check_name(file_name) or (self.content_length and self.rule.check_size(self.content_length))
+        if error:
+            self.reject(error)
+        self.file = HashedUploadedFile(
+            file_name, self.content_type, self.charset, self.content_type_extra,
+            get_media_storage().path(BLOB_PREFIX),
+        )
+        self.digest = hashlib.sha256()
+        self.head = b''
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.rule is None:
+            return raw_data
+        if self.head is not None:
+            self.head += raw_data[:SNIFF_BYTES]
+            if len(self.head) >= SNIFF_BYTES:
+                self.check_head()
+        error = self.rule.check_size(start + len(raw_data))
+        if error:
+            self.reject(error)
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def check_head(self):
+        error = self.rule.check_content(self.file_name, self.head)
+        if error:
+            self.reject(error)
+        self.head = None
+
+    def file_complete(self, file_size):
+        if self.rule is None:
+            return None
+        upload, rule = self.file, self.rule
+        del self.file  # completed: the parser must not close it if a later part is skipped
+        self.rule = None
+        upload.size = file_size
+        error = rule.check_content(self.file_name, self.head) if self.head is not None else None
+        if error:
+            # Shorter than SNIFF_BYTES. SkipFile is no longer possible, so the part
+            # is returned closed (its temp file deleted) and reported instead.
+            self.record(error)
+            upload.close()
+            return upload
+        upload.flush()
+        upload.seek(0)
+        upload.sha256 = self.digest.hexdigest()
+        return upload
+
+    def upload_interrupted(self):
+        if self.rule is not None and hasattr(self, 'file'):
+            self.file.close()
@@ -0,0 +1,232 @@
+# collect/uploads.py
+"""
+Resumable, chunked video uploads (tus-like) for the news form.
+
+The browser first announces the file (name and size). The extension and the
+100 MB limit are checked at that point, before any bytes move, and the reply
+carries an upload id and the chunk size. Chunks are then PUT independently,
+several at a time, each with an ``Upload-Checksum: sha256 <base64>`` header
+(the tus checksum extension). Each one is streamed straight to its offset in
+a single preallocated file, so there is no assembly pass at the end. A chunk
+that arrived intact leaves a marker, so after a dropped connection ``GET``
+lists what is missing and only that is sent again.
+
+Chunk 0 is refused (415) unless its magic bytes match the extension, using
+the same rules as the form upload handler (collect/upload_handlers.py).
+Submitting the form with ``video_upload=<id>`` finalizes the upload. Every
+chunk must be present; the assembled file is then handed to the
+content-addressed media storage, which moves it into ``blobs/`` rather than
+copying it (collect/storage.py). Sessions live in ``UPLOAD_SESSION_ROOT``,
+outside MEDIA_ROOT so nothing half-uploaded is ever served, and are purged
+after ``UPLOAD_SESSION_TTL`` seconds.
+"""
+import base64
+import binascii
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+
+from .upload_handlers import SNIFF_BYTES, VIDEO_RULE
+
+READ_SIZE = 64 * 1024
+CHECKSUM_MISMATCH = 460  # tus: "Checksum Mismatch"
+
+_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadError(Exception):
+    """Rejected request; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class AssembledVideo(File):
+    """A finished upload, exposed like Django's on-disk uploads so storage can move it."""
+
+    def __init__(self, path, name):
+        super().__init__(open(path, 'rb'), name=name)
+        self._path = str(path)
+
+    def temporary_file_path(self):
+        return self._path
+
+
+def upload_root():
+    return Path(settings.UPLOAD_SESSION_ROOT)
+
+
+def _session(upload_id):
+    if not _ID_RE.match(upload_id or ''):
+        raise UploadError('Unknown upload', status=404)
+    path = upload_root() / upload_id
+    if not (path / 'meta.json').is_file():
+        raise UploadError('Unknown or expired upload', status=404)
+    return path
+
+
+def validate_video(filename, size):
+    error = VIDEO_RULE.check_name(filename)
+    if error:
+        raise UploadError(error)
+    if size <= 0:
+        raise UploadError("Video is empty")
+    error = VIDEO_RULE.check_size(size)
+    if error:
+        raise UploadError(error, status=413)
+
+
+def check_head(path, filename):
+    with open(path / 'data', 'rb') as fh:
+        error = VIDEO_RULE.check_content(filename, fh.read(SNIFF_BYTES))
+    if error:
+        raise UploadError(error, status=415)
+
+
+def create_upload(filename, size):
+    """Validate and open a session with a preallocated (sparse) data file. Returns its status."""
+    filename = os.path.basename(filename or '')
+    validate_video(filename, size)
+    purge_stale_uploads()
+    upload_id = uuid.uuid4().hex
+    path = upload_root() / upload_id
+    (path / 'parts').mkdir(parents=True)
+    with open(path / 'data', 'wb') as fh:
+        fh.truncate(size)
+    meta = {
+        'id': upload_id, 'filename': filename, 'size': size,
+        'chunk_size': settings.UPLOAD_CHUNK_SIZE, 'created': time.time(),
+    }
+    (path / 'meta.json').write_text(json.dumps(meta))
+    return upload_status(upload_id)
+
+
+def _meta(path):
+    meta = json.loads((path / 'meta.json').read_text())
+    meta['chunks'] = max(1, -(-meta['size'] // meta['chunk_size']))
+    return meta
+
+
+def upload_status(upload_id):
+    """Session metadata plus the chunk indexes received and still missing."""
+    path = _session(upload_id)
+    meta = _meta(path)
+    received = sorted(int(name) for name in os.listdir(path / 'parts') if name.isdigit())
+    done = set(received)
+    return {
+        **meta,
+        'received': received,
+        'missing': [index for index in range(meta['chunks']) if index not in done],
+        'complete': len(done) == meta['chunks'],
+    }
+
+
+def parse_checksum(header):
+    """Digest bytes from ``sha256 <base64>``; None without a header."""
+    if not header:
+        return None
+    algorithm, _, value = header.strip().partition(' ')
+    if algorithm.lower() != 'sha256':
+        raise UploadError('Upload-Checksum must use sha256')
+    try:
+        return base64.b64decode(value.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        raise UploadError('Upload-Checksum is not valid base64')
+
+
+def write_chunk(upload_id, index, stream, length, checksum=None):
+    """
+    Stream chunk ``index`` (``length`` bytes) from ``stream`` to its offset.
+    Parallel calls for different chunks write disjoint ranges of the file.
+    The marker is only written once the bytes and checksum are verified, so
+    a failed chunk is simply sent again.
+    """
+    path = _session(upload_id)
+    meta = _meta(path)
+    if not 0 <= index < meta['chunks']:
+        raise UploadError(f'Chunk {index} is out of range (0-{meta["chunks"] - 1})')
+    offset = index * meta['chunk_size']
+    expected = min(meta['chunk_size'], meta['size'] - offset)
+    if length != expected:
+        raise UploadError(f'Chunk {index} must be {expected} bytes, not {length}')
+    wanted = parse_checksum(checksum)
+
+    digest = hashlib.sha256()
+    head = b''
+    fd = os.open(path / 'data', os.O_WRONLY)
+    try:
+        written = 0
+        while written < expected:
+            data = stream.read(min(READ_SIZE, expected - written))
+            if not data:
+                raise UploadError(f'Chunk {index} ended after {written} of {expected} bytes')
+            if index == 0 and len(head) < SNIFF_BYTES:
+                # Sniff the magic bytes before writing the rest of the first chunk
+                head += data[:SNIFF_BYTES]
+                if len(head) >= SNIFF_BYTES:
+                    error = VIDEO_RULE.check_content(meta['filename'], head)
+                    if error:
+                        raise UploadError(error, status=415)
+            digest.update(data)
+            os.pwrite(fd, data, offset + written)
+            written += len(data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    if wanted is not None and digest.digest() != wanted:
+        raise UploadError(f'Chunk {index} checksum mismatch', status=CHECKSUM_MISMATCH)
+
+    marker = path / 'parts' / str(index)
+    tmp = marker.with_name(f'.{index}.{uuid.uuid4().hex}')
+    tmp.write_text(digest.hexdigest())
+    os.replace(tmp, marker)
+
+
+def finish_upload(upload_id):
+    """The assembled file for the form to attach; every chunk must have arrived."""
+    status = upload_status(upload_id)
+    if not status['complete']:
+        raise UploadError(
+            f"Video upload is incomplete ({len(status['missing'])} of {status['chunks']} chunks missing)",
+            status=409,
+        )
+    path = _session(upload_id)
+    check_head(path, status['filename'])  # chunk 0 may have been shorter than SNIFF_BYTES
+    return AssembledVideo(path / 'data', status['filename'])
+
+
+def discard_upload(upload_id):
+    try:
+        shutil.rmtree(_session(upload_id))
+    except (UploadError, FileNotFoundError):
+        pass
+
+
+def purge_stale_uploads(ttl=None):
+    """Remove sessions idle for longer than ``ttl`` seconds. Returns how many were removed."""
+    ttl = settings.UPLOAD_SESSION_TTL if ttl is None else ttl
+    root = upload_root()
+    if not root.is_dir():
+        return 0
+    cutoff = time.time() - ttl
+    removed = 0
+    for path in root.iterdir():
+        if not _ID_RE.match(path.name):
+            continue
+        try:
+            touched = max(path.stat().st_mtime, (path / 'parts').stat().st_mtime)
+        except FileNotFoundError:
+            touched = 0
+        if touched < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
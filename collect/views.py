@@ -1,56 +1,109 @@
 # collect/views.py
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.db import IntegrityError
 from urllib.parse import quote
 from django.db.models import Q  # 🔸 You were using Q but didn't import it!
 from .models import ThreatAlert, CurrentInformation, NewsSource
+from .ingest import ingest_alerts, iter_ndjson, load_json_records
+from .pagination import NEXT, CursorPaginator, cursor_values, decode_cursor, encode_cursor, paginate
+from .search import filter_matches, highlight_snippet, search_ordering, search_threats
+from .fuzzy import fuzzy_search, rank, ranked_queryset
+from .instrumentation import query_budget
+from .cache import cached
+from .conditional import conditional_page
+from .archive import partitions, search_history
+from .export import FORMATS, ExportError, export_stream, parquet_available, parse_bound
+from .upload_handlers import upload_errors
+from .uploads import UploadError, create_upload, discard_upload, finish_upload, upload_status, write_chunk
+from .live import backlog_stream, broker, event_stream, parse_last_event_id
+from django.core.handlers.asgi import ASGIRequest
+from .aggregates import compute_rollup_stats, rollup_category_counts, rollup_totals, severity_counts
 from collections import Counter
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.db.models import Count
 import json
 from django.db.models.functions import TruncDate
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_POST
+from django.conf import settings
+import hmac
 from django.core.files.storage import FileSystemStorage
-import os
 
+CURRENT_INFO_ORDERING = ('-created_at', '-id')
+SPY_LOOKUP_LIMIT = 25
+ARCHIVE_PAGE_SIZE = 20
+
+
+def duplicate_counts(alerts):
+    """{alert id: number of near-duplicate copies} for the cluster leaders in ``alerts`` (one query)."""
+    ids = [alert.id for alert in alerts]
+    if not ids:
+        return {}
+    return dict(
+        ThreatAlert.objects.filter(is_duplicate=True, cluster_id__in=ids)
+        .order_by().values('cluster_id').annotate(n=Count('id')).values_list('cluster_id', 'n')
+    )
+
+
+@query_budget(7)  # staff search, first request of a process: session, user, FTS check, generations, totals, page, copies
 def dashboard(request):
     user = request.user
     role_map = {2: 'Admin', 1: 'Analyst', 0: 'Viewer'}
     role_display = role_map.get(getattr(user, 'role', 0), 'Unknown')
 
     query = request.GET.get('q', '').strip()
-    threats = ThreatAlert.objects.all().order_by('-timestamp')  # 🔸 Usually newest first
+    # 🔸 Usually newest first; near-duplicate reposts collapse into their first alert
+    threats = ThreatAlert.objects.filter(ThreatAlert.CANONICAL).order_by('-timestamp')
+    live_since = broker.last_id  # live deltas resume from here, read before the counts
 
     if query:
-        threats = threats.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query) |
-            Q(source__icontains=query)
-        )
+        threats = search_threats(threats, query)  # 🔍 FTS5 + BM25 when available
 
-    total_threats = threats.count()
-    high_severity = threats.filter(severity='high').count()
-    medium_severity = threats.filter(severity='medium').count()
-    low_severity = threats.filter(severity='low').count()
+    # Stat cards: pre-aggregated rollup for the full archive, one conditional count for searches
+    # (cached per generation of ThreatAlert, so repeat visits skip the aggregate)
+    if query:
+        matches = filter_matches(ThreatAlert.objects.all(), query)  # counts need no bm25 or snippets
+        totals = cached(
+            'search_totals',
+            lambda: matches.aggregate(
+                total=Count('id'), stories=Count('id', filter=ThreatAlert.CANONICAL), **severity_counts()
+            ),
+            depends_on=[ThreatAlert], parts=(query,),
+        )
+        stories = totals['stories']
+    else:
+        totals = cached('threat_totals', rollup_totals, depends_on=[ThreatAlert])
+        # Copies are few and covered by a partial index; counting leaders directly would scan the table
+        stories = lambda: totals['total'] - cached(
+            'duplicate_count', ThreatAlert.objects.filter(is_duplicate=True).count, depends_on=[ThreatAlert],
+        )
 
-    paginator = Paginator(threats, 5)
-    page_number = request.GET.get('page')
-    threats_page = paginator.get_page(page_number)
+    ordering = search_ordering(threats)
+    threats_page = paginate(request, threats, 5, ordering, count=stories)
+    similar = duplicate_counts(threats_page)
+    for threat in threats_page:
+        threat.snippet_html = highlight_snippet(getattr(threat, 'search_snippet', ''))
+        threat.similar_count = similar.get(threat.id, 0)
 
     return render(request, 'dashboard.html', {
         'threats': threats_page,
-        'total_threats': total_threats,
-        'high_severity': high_severity,
-        'medium_severity': medium_severity,
-        'low_severity': low_severity,
+        'total_threats': totals['total'],
+        'high_severity': totals['high'],
+        'medium_severity': totals['medium'],
+        'low_severity': totals['low'],
         'role_display': role_display,
+        'live_since': live_since,
+        'live_counts': not query,  # search totals are not what the deltas describe
+        'live_rows': not query and 'cursor' not in request.GET,
     })
 
 
+@query_budget(11)  # first report of the day with an upload: its blob reference and a new rollup bucket
 def newsfeeding(request):
     if request.method == 'POST':
         title = request.POST.get('title', '').strip()
@@ -61,6 +114,7 @@ def newsfeeding(request):
         severity = request.POST.get('severity', 'medium').lower()
         image = request.FILES.get('image')
         video = request.FILES.get('video')
+        upload_id = request.POST.get('video_upload', '').strip()
 
         # Validation
         if not title or not description:
@@ -78,30 +132,15 @@ def newsfeeding(request):
         if not url:
             url = "https://example.com/placeholder"
 
-        # File validation
-        errors = []
-        
-        if image:
-            # Validate image size (10MB max)
-            if image.size > 10 * 1024 * 1024:
-                errors.append("Image size must be less than 10MB")
-            
-            # Validate image extension
-            valid_image_extensions = ['.jpg', '.jpeg', '.png', '.gif']
-            ext = os.path.splitext(image.name)[1].lower()
-            if ext not in valid_image_extensions:
-                errors.append("Invalid image format. Supported: JPG, JPEG, PNG, GIF")
-
-        if video:
-            # Validate video size (100MB max)
-            if video.size > 100 * 1024 * 1024:
-                errors.append("Video size must be less than 100MB")
-            
-            # Validate video extension
-            valid_video_extensions = ['.mp4', '.mov', '.avi', '.webm', '.mkv']
-            ext = os.path.splitext(video.name)[1].lower()
-            if ext not in valid_video_extensions:
-                errors.append("Invalid video format. Supported: MP4, MOV, AVI, WebM, MKV")
+        # File validation (rejected files were already dropped while streaming in)
+        errors = upload_errors(request, {'image': image, 'video': video})
+
+        if upload_id and not video:
+            # Sent earlier in chunks (validated when the upload was created)
+            try:
+                video = finish_upload(upload_id)
+            except UploadError as e:
+                errors.append(str(e))
 
         # if image and video:
         #     errors.append("Please upload either an image OR a video, not both.")
@@ -125,12 +164,22 @@ def newsfeeding(request):
                 image=image,
                 video=video
             )
+            if upload_id and video:
+                video.close()
+                discard_upload(upload_id)
 
             return render(request, 'news_add.html', {
                 'alert_type': 'success',
                 'alert_message': f'✅ Threat report #{threat_alert.id} saved successfully!',
             })
 
+        except IntegrityError:
+            return render(request, 'news_add.html', {
+                'alert_type': 'error',
+                'alert_message': '⚠️ A threat report with this URL already exists.',
+                'form_data': request.POST
+            })
+
         except Exception as e:
             return render(request, 'news_add.html', {
                 'alert_type': 'error',
@@ -142,6 +191,8 @@ def newsfeeding(request):
     return render(request, 'news_add.html')
 
 
+@query_budget(5)
+@conditional_page(ThreatAlert)
 def newsSearching(request):
     selected = request.GET.getlist('category')
     threats = ThreatAlert.objects.all()
@@ -149,8 +200,11 @@ def newsSearching(request):
         threats = threats.filter(category__in=selected)
     threats = threats.order_by('-timestamp')
 
-    # 🔢 Chart data (use full queryset, not paginated)
-    category_counts = Counter(threats.values_list('category', flat=True))
+    # 🔢 Chart data (from the daily rollup, not the alert rows)
+    category_counts = cached(
+        'category_counts', lambda: rollup_category_counts(selected),
+        depends_on=[ThreatAlert], parts=tuple(sorted(selected)),
+    )
     chart_data = []
     for value, label in ThreatAlert.CATEGORY_CHOICES:
         if not selected or value in selected:
@@ -159,10 +213,8 @@ def newsSearching(request):
                 'count': category_counts.get(value, 0)
             })
 
-    # 📄 Paginate (10 items per page)
-    paginator = Paginator(threats, 3)
-    page_number = request.GET.get('page')
-    threats_page = paginator.get_page(page_number)
+    # 📄 Keyset pagination; the total comes from the chart counts above
+    threats_page = paginate(request, threats, 3, count=sum(category_counts.values()))
 
     return render(request, 'searchNews.html', {
         'threats': threats_page,  # ← paginated object
@@ -171,161 +223,165 @@ def newsSearching(request):
         'chart_data': chart_data,
     })
 
+@query_budget(6)
+@conditional_page(ThreatAlert, parts=lambda request: (timezone.localdate(),))
 def newsVisualization(request):
-    # Get all threats
     threats = ThreatAlert.objects.all().order_by('-timestamp')
 
-    # Total counts
-    total_threats = threats.count()
-    high_severity = threats.filter(severity='high').count()
-    medium_severity = threats.filter(severity='medium').count()
-    low_severity = threats.filter(severity='low').count()
-
-    # Category distribution for chart
-    category_data = threats.values('category').annotate(
-        count=Count('id')
-    ).order_by('-count')
-
-    # Prepare chart data
-    category_labels = []
-    category_counts = []
-    for item in category_data:
-        label = dict(ThreatAlert.CATEGORY_CHOICES).get(item['category'], item['category'])
-        category_labels.append(label)
-        category_counts.append(item['count'])
-
-    # Severity distribution for chart
-    severity_data = threats.values('severity').annotate(
-        count=Count('id')
-    ).order_by('severity')
-
-    severity_labels = []
-    severity_counts = []
-    for item in severity_data:
-        label = dict(ThreatAlert.SEVERITY_CHOICES).get(item['severity'], item['severity'])
-        severity_labels.append(label)
-        severity_counts.append(item['count'])
-
-    # Timeline data (last 30 days)
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    
-    # Simple manual approach for timeline data
-    date_counts = {}
-    for i in range(30):
-        date = (timezone.now() - timedelta(days=i)).date()
-        date_counts[date] = 0
-    
-    # Count threats for each date
-    for threat in threats.filter(timestamp__gte=thirty_days_ago):
-        threat_date = threat.timestamp.date()
-        if threat_date in date_counts:
-            date_counts[threat_date] += 1
-    
-    # Convert to sorted lists
-    sorted_dates = sorted(date_counts.keys())
-    timeline_labels = [date.strftime('%m/%d') for date in sorted_dates]
-    timeline_counts = [date_counts[date] for date in sorted_dates]
-
-    # Threat sources from the source field (much simpler!)
-    sources_data = threats.values('source').annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]  # Top 10 sources
-
-    sources_labels = []
-    sources_counts = []
-    for item in sources_data:
-        source_name = item['source'] if item['source'] else 'Unknown'
-        sources_labels.append(source_name)
-        sources_counts.append(item['count'])
-
-    # Trend data (last 7 days by severity)
-    seven_days_ago = timezone.now() - timedelta(days=7)
-    
-    # Get dates for last 7 days
-    dates = [(timezone.now() - timedelta(days=i)).date() for i in range(6, -1, -1)]
-    trend_labels = [date.strftime('%m/%d') for date in dates]
-    
-    # Initialize trend data structure
-    trend_data = {
-        'high': [0] * 7,
-        'medium': [0] * 7,
-        'low': [0] * 7
-    }
-    
-    # Get threat counts for each severity for last 7 days
-    for i, date in enumerate(dates):
-        day_start = timezone.make_aware(datetime.combine(date, datetime.min.time()))
-        day_end = timezone.make_aware(datetime.combine(date, datetime.max.time()))
-        
-        day_threats = threats.filter(timestamp__range=(day_start, day_end))
-        
-        trend_data['high'][i] = day_threats.filter(severity='high').count()
-        trend_data['medium'][i] = day_threats.filter(severity='medium').count()
-        trend_data['low'][i] = day_threats.filter(severity='low').count()
+    # All chart series come from the pre-aggregated daily rollup
+    # (cached per generation of ThreatAlert and per day, since the windows end today)
+    stats = cached(
+        'rollup_stats', lambda: compute_rollup_stats(days=30),
+        depends_on=[ThreatAlert], parts=(timezone.localdate(),),
+    )
+
+    trend_dates, trend_data = stats.trend(days=7)
+    severity_items = stats.severity_items
 
     return render(request, 'newsVisualization.html', {
         'threats': threats[:10],
-        'total_threats': total_threats,
-        'high_severity': high_severity,
-        'medium_severity': medium_severity,
-        'low_severity': low_severity,
-        'chart_labels': category_labels,
-        'chart_data': category_counts,
-        'severity_labels': severity_labels,
-        'severity_data': severity_counts,
-        'timeline_labels': timeline_labels,
-        'timeline_data': timeline_counts,
-        'trend_labels': trend_labels,
+        'total_threats': stats.total,
+        'high_severity': stats.severity['high'],
+        'medium_severity': stats.severity['medium'],
+        'low_severity': stats.severity['low'],
+        'chart_labels': [label for label, count in stats.category],
+        'chart_data': [count for label, count in stats.category],
+        'severity_labels': [label for label, count in severity_items],
+        'severity_data': [count for label, count in severity_items],
+        'timeline_labels': [day.strftime('%m/%d') for day in stats.timeline_days],
+        'timeline_data': stats.timeline,
+        'trend_labels': [day.strftime('%m/%d') for day in trend_dates],
         'trend_data': trend_data,
-        'sources_labels': sources_labels,
-        'sources_data': sources_counts,
+        'sources_labels': [label for label, count in stats.sources],
+        'sources_data': [count for label, count in stats.sources],
     })
 
 
+@query_budget(5)
 def newsTrending(request):
     # Get critical threats with videos
+    # (matches the partial indexes on ThreatAlert exactly)
     critical_threats_with_videos = ThreatAlert.objects.filter(
-        severity='critical'
-    ).exclude(
-        video__isnull=True
-    ).exclude(
-        video=''
+        ThreatAlert.HAS_VIDEO, severity='critical'
     ).order_by('-timestamp')
     
+    live_since = broker.last_id
+
     # Get all threats with videos for statistics
-    all_threats_with_videos = ThreatAlert.objects.exclude(
-        video__isnull=True
-    ).exclude(
-        video=''
-    )
+    all_threats_with_videos = ThreatAlert.objects.filter(ThreatAlert.HAS_VIDEO)
     
+    total_critical_with_videos = critical_threats_with_videos.count()
+
     # Add pagination for critical threats with videos
-    paginator = Paginator(critical_threats_with_videos, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, critical_threats_with_videos, 12, count=total_critical_with_videos)
     
     return render(request, 'newsTrending.html', {
         'threats': page_obj,
-        'critical_threats': critical_threats_with_videos,
-        'total_critical_with_videos': critical_threats_with_videos.count(),
+        'total_critical_with_videos': total_critical_with_videos,
         'total_all_videos': all_threats_with_videos.count(),
         'page_obj': page_obj,
+        'live_since': live_since,
+    })
+
+
+@query_budget(4)
+def newsArchive(request):
+    """Historical search: the live table plus every monthly archive partition, newest first."""
+    query = request.GET.get('q', '').strip()
+    selected = request.GET.getlist('category')
+    error = ''
+    try:
+        start = parse_bound(request.GET.get('start'))
+        end = parse_bound(request.GET.get('end'), end=True)
+    except ExportError as e:
+        error, start, end = str(e), None, None
+
+    # Keyset cursor: (timestamp, id) of the last row shown
+    direction, values, number = decode_cursor(request.GET.get('cursor'))
+    before = None
+    if direction == NEXT:
+        before = cursor_values(ThreatAlert.objects.all(), ('timestamp', 'id'), values)
+
+    threats, has_more = search_history(
+        query, categories=selected, start=start, end=end, before=before, limit=ARCHIVE_PAGE_SIZE,
+    )
+    next_url = None
+    if has_more and threats:
+        params = request.GET.copy()
+        params['cursor'] = encode_cursor(NEXT, [threats[-1].timestamp.isoformat(), threats[-1].id], number + 1)
+        next_url = f'?{params.urlencode()}'
+    first_params = request.GET.copy()
+    first_params.pop('cursor', None)
+
+    return render(request, 'newsArchive.html', {
+        'threats': threats,
+        'query': query,
+        'all_categories': ThreatAlert.CATEGORY_CHOICES,
+        'selected_categories': selected,
+        'start': request.GET.get('start', ''),
+        'end': request.GET.get('end', ''),
+        'months': [month for month, path in reversed(partitions())],
+        'page_number': number if before else 1,
+        'next_url': next_url,
+        'first_url': f'?{first_params.urlencode()}' if before else None,
+        'alert_type': 'error' if error else None,
+        'alert_message': error,
     })
 
 
+@query_budget(2)
 def newsReport(request):
     return render(request, 'news_report.html', {
+        'all_categories': ThreatAlert.CATEGORY_CHOICES,
+        'all_severities': ThreatAlert.SEVERITY_CHOICES,
+        'formats': [fmt for fmt in FORMATS if fmt != 'parquet' or parquet_available()],
     })
 
 
+@query_budget(0)
+async def liveEvents(request):
+    """
+    Server-Sent Events: new alerts / current information and counter deltas.
+    Under ASGI the connection stays open; under WSGI it returns the backlog
+    and the browser reconnects after the advertised retry delay.
+    """
+    last_event_id = parse_last_event_id(request)
+    if isinstance(request, ASGIRequest):
+        stream = event_stream(last_event_id)
+    else:
+        stream = backlog_stream(last_event_id)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: don't buffer the stream
+    return response
+
+
+@query_budget(2)
+def newsExport(request):
+    """Stream the filtered alerts (or current information) as CSV, NDJSON or Parquet."""
+    dataset = request.GET.get('dataset', 'alerts')
+    fmt = request.GET.get('format', 'csv')
+    try:
+        stream, content_type, extension = export_stream(dataset, fmt, request.GET)
+    except ExportError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    filename = f"{dataset}-{timezone.localtime():%Y%m%d-%H%M%S}.{extension}"
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@query_budget(5)
+@conditional_page(CurrentInformation)
 def newsCurrent(request):
-    current_info_list = CurrentInformation.objects.all().order_by('-created_at')
-    paginator = Paginator(current_info_list, 7)  # 10 items per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    current_info_list = CurrentInformation.objects.all()
+    page_obj = paginate(request, current_info_list, 7, CURRENT_INFO_ORDERING)
     return render(request, 'newsCurrent.html', {'page_obj': page_obj})
 
 
+@query_budget(11)  # posting a report with words new to the fuzzy index (collect/fuzzy.py) also adds their terms
 def newsSpy(request):
     """Combined view: list + manual form submission with alert context"""
     if request.method == 'POST':
@@ -340,9 +396,7 @@ def newsSpy(request):
 
         # 🔒 Validation: Required fields
         if not timing or not location or not leader:
-            current_info_list = CurrentInformation.objects.all().order_by('-created_at')
-            paginator = Paginator(current_info_list, 7)
-            page_obj = paginator.get_page(request.GET.get('page'))
+            page_obj = paginate(request, CurrentInformation.objects.all(), 7, CURRENT_INFO_ORDERING)
             return render(request, 'newsSpy.html', {
                 'alert_type': 'error',
                 'alert_message': 'Timestamp, Location, and Field Leader are required.',
@@ -375,9 +429,9 @@ def newsSpy(request):
                 status=status
             )
             # On success: redirect to avoid resubmission + show success
-            current_info_list = CurrentInformation.objects.all().order_by('-created_at')
-            paginator = Paginator(current_info_list, 7)
-            page_obj = paginator.get_page(1)  # Go to page 1 to show new entry
+            page_obj = CursorPaginator(
+                CurrentInformation.objects.all(), 7, CURRENT_INFO_ORDERING
+            ).get_page()  # Go to page 1 to show new entry
             return render(request, 'newsSpy.html', {
                 'alert_type': 'success',
                 'alert_message': '✅ Intel report submitted successfully!',
@@ -385,9 +439,7 @@ def newsSpy(request):
             })
 
         except Exception as e:
-            current_info_list = CurrentInformation.objects.all().order_by('-created_at')
-            paginator = Paginator(current_info_list, 7)
-            page_obj = paginator.get_page(request.GET.get('page'))
+            page_obj = paginate(request, CurrentInformation.objects.all(), 7, CURRENT_INFO_ORDERING)
             return render(request, 'newsSpy.html', {
                 'alert_type': 'error',
                 'alert_message': f'⚠️ Failed to save: {str(e)}',
@@ -404,39 +456,123 @@ def newsSpy(request):
             })
 
     # GET request
-    current_info_list = CurrentInformation.objects.all().order_by('-created_at')
-    paginator = Paginator(current_info_list, 7)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj = paginate(request, CurrentInformation.objects.all(), 7, CURRENT_INFO_ORDERING)
+    # 🔍 Typo-tolerant lookup of people, places and vehicles (trigram index)
+    lookup = request.GET.get('q', '').strip()
+    matches = list(fuzzy_search(CurrentInformation.objects.all(), lookup)[:SPY_LOOKUP_LIMIT]) if lookup else []
     return render(request, 'newsSpy.html', {
         'page_obj': page_obj,
+        'lookup': lookup,
+        'matches': matches,
     })
 
 
+@query_budget(2)
 def loginPage(request):
     return render(request, 'login.html', {
     })
 
 
+@query_budget(6)
+@conditional_page(NewsSource)
 def newsSource(request):
     search_query = request.GET.get('search', '').strip()
     
     sources = NewsSource.objects.all()
+    ordering, count = ('name', 'id'), None
     
     if search_query:
-        sources = sources.filter(
-            name__icontains=search_query
-        ) | sources.filter(
-            url__icontains=search_query
-        )
-    
-    sources = sources.order_by('name')
+        # 🔍 Typo-tolerant, best match first (trigram index); the ranking also gives the total
+        ranked = rank(NewsSource, search_query)
+        sources = ranked_queryset(sources, ranked)
+        ordering, count = ('-search_rank', 'id'), len(ranked)
     
-    # Pagination (12 per page – adjust as needed)
-    paginator = Paginator(sources,12 )
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination, 12 per page
+    page_obj = paginate(request, sources, 12, ordering, count=count)
     
     return render(request, 'newsSource.html', {
         'sources': page_obj,
         'search_query': search_query,
-    })
\ No newline at end of file
+    })
+
+
+@query_budget(0)
+@require_POST
+def videoUploads(request):
+    """Start a resumable video upload: JSON ``{"filename", "size"}`` -> 201 with the upload id and chunk size."""
+    try:
+        payload = json.loads(request.body or b'{}')
+        upload = create_upload(str(payload.get('filename', '')), int(payload.get('size', 0)))
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Expected JSON with filename and size'}, status=400)
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    response = JsonResponse(upload, status=201)
+    response['Location'] = reverse('video_upload', args=[upload['id']])
+    return response
+
+
+@query_budget(0)
+def videoUpload(request, upload_id):
+    """GET/HEAD: received and missing chunks (to resume). DELETE: abandon the upload."""
+    if request.method == 'DELETE':
+        discard_upload(upload_id)
+        return HttpResponse(status=204)
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD', 'DELETE'])
+    try:
+        response = JsonResponse(upload_status(upload_id))
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@query_budget(0)
+def videoUploadChunk(request, upload_id, index):
+    """PUT one chunk; the body is streamed to disk, never buffered whole."""
+    if request.method != 'PUT':
+        return HttpResponseNotAllowed(['PUT'])
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        write_chunk(upload_id, index, request, length, request.headers.get('Upload-Checksum'))
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid Content-Length'}, status=400)
+    return HttpResponse(status=204)
+
+
+def _bearer_authorized(request):
+    token = getattr(settings, 'INGEST_API_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(header, f'Bearer {token}')
+
+
+@csrf_exempt
+@require_POST
+def ingestAlerts(request):
+    """
+    Bulk upsert of alerts from collectors: JSON list or NDJSON stream, keyed on url.
+    Collectors send the bearer token; a staff session is accepted too, but then
+    the request must pass the CSRF check like any other form post.
+    """
+    if _bearer_authorized(request):
+        return _ingest(request)
+    if request.user.is_authenticated and request.user.is_staff:
+        return csrf_protect(_ingest)(request)
+    return JsonResponse({'error': 'Not authorized'}, status=403)
+
+
+def _ingest(request):
+    content_type = request.content_type or ''
+    try:
+        if 'ndjson' in content_type or 'jsonlines' in content_type:
+            records = iter_ndjson(request)  # streamed line by line, never fully buffered
+        else:
+            records = load_json_records(request.body)
+    except ValueError as e:
+        return JsonResponse({'error': f'Invalid payload: {e}'}, status=400)
+
+    report = ingest_alerts(records)
+    return JsonResponse(report.as_dict())
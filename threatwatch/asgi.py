@@ -2,6 +2,9 @@
 ASGI config for threatwatch project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn threatwatch.asgi:application``)
+so ``/live/events/`` can hold Server-Sent Events connections open; under WSGI
+that endpoint falls back to short backlog responses.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'collect.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,18 +53,29 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Over-budget views (@query_budget) raise instead of logging a warning; the test runner turns DEBUG off
+QUERY_BUDGET_STRICT = DEBUG or sys.argv[1:2] == ['test']
+
 ROOT_URLCONF = 'threatwatch.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'collect.instrumentation.TimedDjangoTemplates',  # DjangoTemplates + render time per request
+        'NAME': 'django',
         'DIRS': [BASE_DIR / 'templates'],  # 👈 This tells Django where to look for templates
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'collect.context_processors.fragments',
+            ],
+            # Compiled templates are kept per process (the runserver autoreloader resets them on change)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
@@ -74,6 +87,21 @@ WSGI_APPLICATION = 'threatwatch.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# 'tuned' (default): WAL, IMMEDIATE write transactions, persistent connections and a
+# query-only 'read' alias picked by collect.routers.ReadWriteRouter.
+# 'plain': Django's stock sqlite3 connection.
+DB_PROFILE = os.environ.get('DB_PROFILE', 'tuned')
+
+# Applied to every new SQLite connection of the tuned profile
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',        # readers and the writer stop blocking each other (persistent)
+    'synchronous': 'NORMAL',      # fsync at checkpoints only; with WAL a crash can't corrupt
+    'busy_timeout': 5000,         # ms to wait for the write lock before "database is locked"
+    'cache_size': -65536,         # page cache per connection; negative means KiB (64 MiB)
+    'mmap_size': 268435456,       # read the first 256 MiB through the page cache mapping
+    'temp_store': 'MEMORY',       # sorts and temp B-trees stay off disk
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -81,6 +109,47 @@ DATABASES = {
     }
 }
 
+if DB_PROFILE == 'tuned':
+    _pragmas = '; '.join(f'PRAGMA {name} = {value}' for name, value in SQLITE_PRAGMAS.items())
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',  # take the write lock at BEGIN: writers queue, never deadlock
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            'init_command': _pragmas,
+        },
+    })
+    DATABASES['read'] = {
+        **DATABASES['default'],
+        'OPTIONS': {**DATABASES['default']['OPTIONS'], 'init_command': f'{_pragmas}; PRAGMA query_only = ON'},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['collect.routers.ReadWriteRouter']
+
+
+# Cache backend for collect.cache (generation-versioned aggregates) and {% cache %} fragments.
+# The generation counters themselves are in the database, so invalidation reaches every
+# process with any backend: 'locmem' (per process), 'file' (shared by the processes of one host) or
+# 'redis' (shared; CACHE_LOCATION=redis://host:port/db, needs redis-py)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'locmem': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'cyberpulse',
+        },
+        'file': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, '.cache')),
+        },
+        'redis': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+        },
+    }[CACHE_BACKEND],
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -117,6 +186,9 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+# Output of `manage.py build_assets` (fingerprinted, precompressed bundles; collect/assets.py).
+# Run it at deploy time: it downloads the vendored libraries, so it needs network access.
+STATIC_ROOT = Path(os.environ.get('STATIC_ROOT', BASE_DIR / 'staticfiles'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -126,5 +198,34 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Hand media downloads to the front-end server once Django has resolved the file:
+# '' streams from Django, 'x-accel-redirect' for nginx (with an `internal`
+# location at MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT), 'x-sendfile' for Apache/lighttpd
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Media parts (image/video) are sniffed, size-checked and hashed as they stream in,
+# straight into the blob directory (collect/upload_handlers.py); other parts use the defaults
+FILE_UPLOAD_HANDLERS = [
+    'collect.upload_handlers.MediaUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Resumable video uploads in progress (collect/uploads.py); kept outside MEDIA_ROOT
+UPLOAD_SESSION_ROOT = Path(os.environ.get('UPLOAD_SESSION_ROOT', BASE_DIR / 'uploads'))
+UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', 24 * 60 * 60))
+UPLOAD_CHUNK_SIZE = 2 * 1024 * 1024
+
+# Category/severity classifier written by `manage.py train_classifier` (collect/classify.py)
+CLASSIFIER_PATH = Path(os.environ.get('CLASSIFIER_PATH', BASE_DIR / 'classifier.npz'))
+
+# Monthly archive of old alerts written by `manage.py archive_alerts` (collect/archive.py)
+ARCHIVE_ROOT = Path(os.environ.get('ARCHIVE_ROOT', BASE_DIR / 'archive'))
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 180))
+
 TIME_ZONE = 'Asia/Kathmandu'
 USE_TZ = True
+
+# Bearer token accepted by the bulk ingestion endpoint (/ingest/alerts/)
+INGEST_API_TOKEN = os.environ.get('INGEST_API_TOKEN', '')
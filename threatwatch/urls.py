@@ -1,8 +1,9 @@
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from collect import views
+from collect.instrumentation import request_stats
+from collect.serving import serve_media, serve_static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -11,15 +12,23 @@ urlpatterns = [
     path('search_news/', views.newsSearching, name='news_search'),
     path('visualize_news/', views.newsVisualization, name='news_visualization'),
     path('trending_news/', views.newsTrending, name='news_trending'),
+    path('archive_news/', views.newsArchive, name='news_archive'),
     path('report_news/', views.newsReport, name='news_report'),
+    path('report_news/export/', views.newsExport, name='news_export'),
     path('current_news/', views.newsCurrent, name='news_current'),
     path('spy_news/', views.newsSpy, name='news_spy'),
     path('login/', views.loginPage, name='login_page'),
     path('source_news/', views.newsSource, name='news_source'),
+    path('ingest/alerts/', views.ingestAlerts, name='ingest_alerts'),
+    path('uploads/videos/', views.videoUploads, name='video_uploads'),
+    path('uploads/videos/<str:upload_id>/', views.videoUpload, name='video_upload'),
+    path('uploads/videos/<str:upload_id>/<int:index>/', views.videoUploadChunk, name='video_upload_chunk'),
+    path('live/events/', views.liveEvents, name='live_events'),
+    path('_stats/requests/', request_stats, name='request_stats'),
+    # Media in every environment: conditional GET, Range and optional X-Accel-Redirect/X-Sendfile
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.+)$', serve_media, name='media'),
+    # Built CSS/JS bundles: far-future caching and precompressed .br/.gz variants
+    re_path(rf'^{settings.STATIC_URL.lstrip("/")}(?P<path>.+)$', serve_static, name='static'),
 ]
 
-# Serve media files during development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-
     